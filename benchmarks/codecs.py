@@ -0,0 +1,119 @@
+"""
+Compares the column codecs of the OHLCV table on realistic minute candles in an embedded chdb
+session: the default LZ4 of schema v1, ZSTD alone, Gorilla for prices and the Delta prices of
+schema v2 (create_table.sql as shipped). Every layout gets the same rows, is merged into one part
+per partition, and is reported with its compressed bytes per column group and the best-of-three
+time of a full scan (scan_table.sql).
+
+Usage:
+    python -m benchmarks.codecs --tickers 50 --days 120
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fakes import ChdbClickhouseClient, session_candles
+
+QUERY_DIR = 'src/ingestion/query'
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+# Layout -> codecs of (timestamp, prices, volume); None means the server default (LZ4)
+LAYOUTS = {
+    'lz4 (v1)': (None, None, None),
+    'zstd': ('ZSTD(1)', 'ZSTD(1)', 'ZSTD(1)'),
+    'gorilla': ('DoubleDelta, ZSTD(1)', 'Gorilla, ZSTD(1)', 'T64, ZSTD(1)'),
+}
+
+
+def layout_sql(table_name, codecs):
+    timestamp, prices, volume = (f" CODEC({codec})" if codec else '' for codec in codecs)
+    columns = ["ticker LowCardinality(String)", f"timestamp DateTime('UTC'){timestamp}"]
+    columns += [f"{name} Float64{prices}" for name in PRICE_COLUMNS]
+    columns.append(f"volume UInt64{volume}")
+    return (f"CREATE TABLE {table_name} ({', '.join(columns)}) ENGINE = MergeTree "
+            f"PARTITION BY toYYYYMM(timestamp) ORDER BY (ticker, timestamp)")
+
+
+def make_candles(tickers, days):
+    """
+    Returns `days` calendar days of one-minute candles per ticker, weekdays only, sorted as stored.
+    """
+    end = date(2024, 12, 31)
+    frames = []
+    for i in range(tickers):
+        token = str(10000 + i)
+        stamps, values = [], []
+        for offset in range(days, 0, -1):
+            day = end - timedelta(days=offset)
+            if day.weekday() < 5:
+                timestamps, candles = session_candles(token, day)
+                stamps.append(timestamps)
+                values.append(candles)
+        candles = np.concatenate(values)
+        frames.append(pd.DataFrame({
+            'ticker': f'tkr{i:04d}',
+            'timestamp': np.concatenate(stamps).astype('datetime64[s]'),
+            **{name: candles[:, j] for j, name in enumerate(PRICE_COLUMNS)},
+            'volume': candles[:, 4].astype('uint64'),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def measure(client, table_name, data, repeats=3):
+    client.insert_df(table_name, data)
+    client.command(f"OPTIMIZE TABLE {table_name} FINAL")
+    rows = client.query(
+        "SELECT name, sum(data_compressed_bytes) FROM system.columns "
+        "WHERE database = currentDatabase() AND table = {table:String} GROUP BY name",
+        parameters={'table': table_name}
+    ).result_rows
+    compressed = dict(rows)
+    with open(f'{QUERY_DIR}/scan_table.sql') as f:
+        scan = f.read()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        client.query(scan, parameters={'table_name': table_name})
+        timings.append(time.perf_counter() - start)
+    return {
+        'timestamp': compressed['timestamp'],
+        'prices': sum(compressed[name] for name in PRICE_COLUMNS),
+        'volume': compressed['volume'],
+        'total': sum(compressed.values()),
+        'scan_seconds': min(timings),
+    }
+
+
+def main(args):
+    data = make_candles(args.tickers, args.days)
+    raw_bytes = int(data.drop(columns='ticker').memory_usage(index=False).sum())
+    client = ChdbClickhouseClient(database='codecs')
+    with open(f'{QUERY_DIR}/create_table.sql') as f:
+        v2_sql = f.read().format(table_name='layout_delta_v2')
+
+    layouts = {name: (f"layout_{i}", layout_sql(f"layout_{i}", codecs)) for i, (name, codecs) in enumerate(LAYOUTS.items())}
+    layouts['delta (v2)'] = ('layout_delta_v2', v2_sql)
+    results = {}
+    for name, (table_name, sql) in layouts.items():
+        client.command(f"DROP TABLE IF EXISTS {table_name}")
+        client.command(sql)
+        results[name] = measure(client, table_name, data)
+        client.command(f"DROP TABLE IF EXISTS {table_name}")
+
+    print(f"{len(data):,} candles ({args.tickers} tickers x {args.days} days), "
+          f"{raw_bytes / 2**20:.1f} MiB uncompressed without the ticker column")
+    baseline = results['lz4 (v1)']['total']
+    print(f"{'layout':<14}{'timestamp':>12}{'prices':>12}{'volume':>12}{'total':>12}{'vs lz4':>9}{'scan s':>9}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['timestamp']:>12,}{r['prices']:>12,}{r['volume']:>12,}{r['total']:>12,}"
+              f"{baseline / r['total']:>8.2f}x{r['scan_seconds']:>9.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=120, help="calendar days of history per ticker")
+    main(parser.parse_args())
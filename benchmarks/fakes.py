@@ -0,0 +1,350 @@
+"""
+Offline stand-ins for the two external systems the pipeline talks to, used by the benchmarks:
+
+- FakeSmartConnect generates deterministic one-minute (or coarser) candle payloads in the shape
+  SmartAPI's getCandleData returns, with configurable latency and rate-limit errors.
+- ChdbClickhouseClient runs the pipeline's SQL in an embedded ClickHouse (chdb) when it is
+  installed; MemoryClickhouseClient only counts inserted rows and tracks watermarks, which
+  isolates the pipeline's own overhead.
+
+Both ClickHouse stand-ins implement the subset of the clickhouse_connect client API that
+ClickhouseConnect uses (command, query, insert_df, insert_arrow, query_arrow_stream).
+"""
+import glob
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# SmartAPI's response to a throttled request
+RATE_LIMIT_RESPONSE = {'status': False, 'message': 'Access denied because of exceeding access rate',
+                       'errorcode': 'AB1004', 'data': None}
+# Candle spacing of each interval, in minutes
+INTERVAL_MINUTES = {
+    "ONE_MINUTE": 1, "THREE_MINUTE": 3, "FIVE_MINUTE": 5, "TEN_MINUTE": 10,
+    "FIFTEEN_MINUTE": 15, "THIRTY_MINUTE": 30, "ONE_HOUR": 60, "ONE_DAY": None,
+}
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+SESSION_MINUTES = 375
+QUERY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'ingestion', 'query')
+
+
+def session_candles(token, day, interval="ONE_MINUTE"):
+    """
+    Returns the candles of one trading day of a token as (timestamps datetime64[m], ohlcv float
+    array of shape (n, 5)). Prices follow a random walk seeded by (token, day), so repeated
+    requests for the same range return identical data.
+    """
+    rng = np.random.default_rng([zlib.crc32(str(token).encode()), day.toordinal()])
+    base = 50 + zlib.crc32(str(token).encode()) % 2000
+    step = INTERVAL_MINUTES[interval]
+    if step is None:
+        timestamps = np.array([np.datetime64(day, 'm')])
+        count = 1
+    else:
+        offsets = np.arange(SESSION_OPEN_MINUTE, SESSION_OPEN_MINUTE + SESSION_MINUTES, step)
+        timestamps = np.datetime64(day, 'm') + offsets.astype('timedelta64[m]')
+        count = len(offsets)
+
+    # Prices move in 0.05 ticks around a per-day level
+    close = np.round(base * (1 + rng.normal(0, 0.02)) + np.cumsum(rng.integers(-3, 4, count)) * 0.05, 2)
+    open_ = np.round(np.concatenate(([close[0]], close[:-1])), 2)
+    high = np.round(np.maximum(open_, close) + rng.integers(0, 4, count) * 0.05, 2)
+    low = np.round(np.minimum(open_, close) - rng.integers(0, 4, count) * 0.05, 2)
+    volume = rng.integers(1, 500, count) * 10
+    return timestamps, np.column_stack([open_, high, low, close, volume])
+
+
+class FakeBrokerStats:
+    """
+    Counters shared by every FakeSmartConnect of a benchmark run.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.rate_limited = 0
+        self.candles = 0
+        self.fetch_seconds = 0.0
+        self.calls_per_token = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, token, candles, seconds, rate_limited=False):
+        with self._lock:
+            self.calls += 1
+            self.calls_per_token[token] += 1
+            self.candles += candles
+            self.fetch_seconds += seconds
+            self.rate_limited += int(rate_limited)
+
+
+class FakeSmartConnect:
+    """
+    Stands in for SmartApi.SmartConnect. Every token is listed `history_days` before today and
+    trades on weekdays; requests outside that range return an empty candle list, so the daily
+    lookup finds the listing date like it does against the broker.
+    """
+
+    def __init__(self, api_key, stats=None, history_days=60, latency_seconds=0.0, rate_limit_probability=0.0,
+                 seed=0):
+        self.api_key = api_key
+        self.stats = stats or FakeBrokerStats()
+        self.latency_seconds = latency_seconds
+        self.rate_limit_probability = rate_limit_probability
+        self.listed_on = datetime.today().date() - timedelta(days=history_days)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def generateSession(self, client_code, password, totp):
+        return {'status': True, 'data': {'jwtToken': 'fake-jwt-token', 'refreshToken': 'fake-refresh-token'}}
+
+    def generateToken(self, refresh_token):
+        return {'status': True, 'data': {'jwtToken': 'fake-jwt-token', 'refreshToken': refresh_token,
+                                         'feedToken': 'fake-feed-token'}}
+
+    def getfeedToken(self):
+        return 'fake-feed-token'
+
+    def getCandleData(self, params):
+        start = time.perf_counter()
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._random_lock:
+            throttled = self._random.random() < self.rate_limit_probability
+        if throttled:
+            self.stats.record(params['symboltoken'], 0, time.perf_counter() - start, rate_limited=True)
+            return dict(RATE_LIMIT_RESPONSE)
+
+        from_time = datetime.strptime(params['fromdate'], '%Y-%m-%d %H:%M')
+        to_time = datetime.strptime(params['todate'], '%Y-%m-%d %H:%M')
+        day = max(from_time.date(), self.listed_on)
+        candles = []
+        while day <= to_time.date():
+            if day.weekday() < 5:
+                timestamps, values = session_candles(params['symboltoken'], day, params['interval'])
+                keep = (timestamps >= np.datetime64(from_time, 'm')) & (timestamps <= np.datetime64(to_time, 'm'))
+                stamps = np.char.add(np.datetime_as_string(timestamps[keep], unit='s'), '+05:30')
+                candles.extend([stamp, *row[:4], int(row[4])] for stamp, row in zip(stamps.tolist(), values[keep].tolist()))
+            day += timedelta(days=1)
+
+        self.stats.record(params['symboltoken'], len(candles), time.perf_counter() - start)
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': candles}
+
+
+class FakeScripCache:
+    """
+    Stands in for ScripMasterCache with a fixed universe of `tickers` NSE equities.
+    """
+
+    def __init__(self, tickers):
+        self.scrip = pd.DataFrame({
+            'token': [str(10000 + i) for i in range(tickers)],
+            'symbol': [f'BENCH{i:04d}-EQ' for i in range(tickers)],
+            'name': [f'BENCH{i:04d}' for i in range(tickers)],
+            'exch_seg': 'NSE',
+            'instrumenttype': '',
+            'lotsize': '1',
+        })
+        self.added = self.scrip.iloc[0:0]
+        self.removed = self.scrip.iloc[0:0]
+
+    def load(self, exchanges=("NSE",), nfo_instrument_types=()):
+        return self.scrip[self.scrip['exch_seg'].isin(exchanges)].reset_index(drop=True)
+
+
+class _QueryResult:
+    def __init__(self, rows):
+        self.result_rows = rows
+
+
+class _ArrowStream:
+    def __init__(self, data):
+        self._reader = pa.ipc.open_stream(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._reader.close()
+
+    def __iter__(self):
+        return iter(self._reader)
+
+
+def _literal(value):
+    """
+    Formats a bound parameter the way ClickHouse's query parameters expect it.
+    """
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_literal_element(v) for v in value) + ']'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def _literal_element(value):
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + _literal(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+class ChdbClickhouseClient:
+    """
+    Runs queries and inserts against an embedded chdb session. chdb sessions are not
+    thread-safe, so calls are serialized, much like a single-node server under one client.
+    """
+
+    def __init__(self, database='bench', path=None):
+        from chdb.session import Session
+
+        self.database = database
+        self.session = Session(path) if path else Session()
+        self.session.query(f"CREATE DATABASE IF NOT EXISTS {database} ENGINE = Atomic")
+        self.session.query(f"USE {database}")
+        self.insert_seconds = 0.0
+        self.inserts = 0
+        self._lock = threading.Lock()
+
+    def command(self, sql, parameters=None, settings=None):
+        with self._lock:
+            self.session.query(self._with_settings(sql, settings), params=self._params(parameters))
+
+    def query(self, sql, parameters=None, settings=None):
+        with self._lock:
+            frame = self.session.query(self._with_settings(sql, settings), 'DataFrame', params=self._params(parameters))
+        return _QueryResult(list(frame.itertuples(index=False, name=None)))
+
+    def query_arrow_stream(self, sql, parameters=None, settings=None, use_strings=None):
+        with self._lock:
+            result = self.session.query(self._with_settings(sql, settings), 'ArrowStream', params=self._params(parameters))
+        return _ArrowStream(result.bytes())
+
+    def insert_df(self, table, df, settings=None):
+        self._insert(table, df, settings)
+
+    def insert_arrow(self, table, arrow_table, settings=None):
+        self._insert(table, arrow_table, settings)
+
+    def _insert(self, table, data, settings):
+        start = time.perf_counter()
+        # chdb resolves Python(data) against the caller's local variables
+        sql = f"INSERT INTO {table} {self._settings_clause(settings)} SELECT * FROM Python(data)"
+        with self._lock:
+            self.session.query(sql)
+            self.insert_seconds += time.perf_counter() - start
+            self.inserts += 1
+
+    def count_rows(self, table):
+        return self.query(f"SELECT count() FROM {table}").result_rows[0][0]
+
+    def count_parts(self, table):
+        return self.query("SELECT count() FROM system.parts WHERE database = currentDatabase() AND table = {table:String} "
+                          "AND active", parameters={'table': table}).result_rows[0][0]
+
+    @staticmethod
+    def _params(parameters):
+        return {key: _literal(value) for key, value in (parameters or {}).items()}
+
+    @staticmethod
+    def _settings_clause(settings):
+        if not settings:
+            return ''
+        # Async inserts are a server-side batching feature without effect in an embedded session
+        settings = {k: v for k, v in settings.items() if not k.startswith(('async_insert', 'wait_for_async'))}
+        if not settings:
+            return ''
+        return 'SETTINGS ' + ', '.join(f"{k} = {_literal_element(v)}" for k, v in settings.items())
+
+    def _with_settings(self, sql, settings):
+        return f"{sql} {self._settings_clause(settings)}" if settings else sql
+
+
+class MemoryClickhouseClient:
+    """
+    Accepts inserts without storing them: it keeps row counts and the latest timestamp of every
+    ticker per table, and answers the handful of queries the ingestion path issues (table
+    existence, columns and watermarks). Every other query returns no rows.
+    """
+
+    COLUMNS = ['ticker', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, database='bench'):
+        self.database = database
+        self.insert_seconds = 0.0
+        self.inserts = 0
+        self.tables = {}
+        self._tokens = set()
+        self._templates = {}
+        for path in glob.glob(os.path.join(QUERY_DIR, '*.sql')):
+            with open(path, 'r') as file:
+                self._templates[file.read()] = os.path.splitext(os.path.basename(path))[0]
+        self._lock = threading.Lock()
+
+    def command(self, sql, parameters=None, settings=None):
+        match = re.search(r"CREATE TABLE IF NOT EXISTS (\w+)", sql)
+        if match:
+            with self._lock:
+                self.tables.setdefault(match.group(1), {'rows': 0, 'watermarks': {}})
+
+    def query(self, sql, parameters=None, settings=None):
+        parameters = parameters or {}
+        if 'system.tables' in sql:
+            match = re.search(r"name = '(\w+)'", sql)
+            return _QueryResult([[int(bool(match) and match.group(1) in self.tables)]])
+        if 'system.columns' in sql:
+            return _QueryResult([[name] for name in self.COLUMNS])
+
+        name = self._templates.get(sql)
+        table = self.tables.get(parameters.get('table_name'), {'watermarks': {}})
+        watermarks = table['watermarks']
+        if name == 'latest_timestamps':
+            return _QueryResult(list(watermarks.items()))
+        if name == 'ticker_watermarks':
+            return _QueryResult([(t, watermarks[t]) for t in parameters['tickers'] if t in watermarks])
+        if name == 'latest_timestamp':
+            return _QueryResult([[watermarks.get(parameters['ticker'])]])
+        return _QueryResult([])
+
+    def insert_df(self, table, df, settings=None):
+        start = time.perf_counter()
+        if 'timestamp' not in df.columns:
+            return self._insert(table, len(df), {}, settings, start)
+        latest = df.groupby('ticker', observed=True)['timestamp'].max()
+        self._insert(table, len(df), latest.to_dict(), settings, start)
+
+    def insert_arrow(self, table, arrow_table, settings=None):
+        start = time.perf_counter()
+        # Quality statistics have no timestamp column, so there is no watermark to keep
+        if 'timestamp' not in arrow_table.column_names:
+            return self._insert(table, arrow_table.num_rows, {}, settings, start)
+        latest = arrow_table.group_by('ticker').aggregate([('timestamp', 'max')]).to_pydict()
+        timestamps = [ts.replace(tzinfo=None) for ts in latest['timestamp_max']]
+        self._insert(table, arrow_table.num_rows, dict(zip(map(str, latest['ticker']), timestamps)), settings, start)
+
+    def _insert(self, table, rows, latest, settings, start):
+        token = (settings or {}).get('insert_deduplication_token')
+        with self._lock:
+            state = self.tables.setdefault(table, {'rows': 0, 'watermarks': {}})
+            # Mirrors the server dropping a repeated deduplication token
+            if token is None or token not in self._tokens:
+                self._tokens.add(token)
+                state['rows'] += rows
+                for ticker, latest_ts in latest.items():
+                    latest_ts = pd.Timestamp(latest_ts).to_pydatetime()
+                    if ticker not in state['watermarks'] or latest_ts > state['watermarks'][ticker]:
+                        state['watermarks'][ticker] = latest_ts
+            self.insert_seconds += time.perf_counter() - start
+            self.inserts += 1
+
+    def count_rows(self, table):
+        return self.tables.get(table, {}).get('rows', 0)
+
+    def count_parts(self, table):
+        # Nothing is stored, so there are no parts to count
+        return None
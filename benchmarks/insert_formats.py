@@ -0,0 +1,143 @@
+"""
+Compares the two insert payloads offline: pandas insert_df (ClickHouse Native) vs typed Arrow
+batches, each with every wire compression setting. No server is needed.
+
+Each payload is serialised the way clickhouse_connect builds the request body: insert_df encodes
+Native blocks for the table's column types and compresses the whole body (Content-Encoding), while
+insert_arrow writes an Arrow file with compressed IPC buffers. Reported per combination:
+- encode rows/sec: building the body on the client, including dataframe_to_arrow for Arrow
+- bytes on the wire: the size of the request body
+- load rows/sec: parsing the body into a create_table.sql table in an embedded chdb session,
+  i.e. the server side of the insert (skipped when chdb is not installed)
+
+Usage:
+    python -m benchmarks.insert_formats --tickers 50 --days 120
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from clickhouse_connect.datatypes.registry import get_from_name
+from clickhouse_connect.driver.compression import get_compressor
+from clickhouse_connect.driver.insert import InsertContext
+from clickhouse_connect.driver.query import arrow_buffer
+from clickhouse_connect.driver.transform import NativeTransform
+
+from benchmarks.codecs import QUERY_DIR, make_candles
+from src.ingestion.clickhouse import ClickhouseConnect
+
+COLUMN_TYPES = {
+    'ticker': "LowCardinality(String)",
+    'timestamp': "DateTime('UTC')",
+    'open': 'Float64',
+    'high': 'Float64',
+    'low': 'Float64',
+    'close': 'Float64',
+    'volume': 'UInt64',
+}
+COMPRESSIONS = ('none', 'lz4', 'zstd')
+# File extensions from which ClickHouse infers a Native body's compression when loading it back
+EXTENSIONS = {'none': '', 'lz4': '.lz4', 'zstd': '.zst'}
+
+
+def encode_pandas(dataframe, compression):
+    """
+    Returns the body insert_df sends: Native blocks, compressed as a whole.
+    """
+    context = InsertContext('bench', list(COLUMN_TYPES), [get_from_name(t) for t in COLUMN_TYPES.values()],
+                            data=dataframe, compression=None if compression == 'none' else compression)
+    return b''.join(NativeTransform().build_insert(context))
+
+
+def encode_arrow(dataframe, compression):
+    """
+    Returns the body insert_arrow sends: an Arrow file whose buffers carry the compression.
+    """
+    _, body = arrow_buffer(ClickhouseConnect.dataframe_to_arrow(dataframe),
+                           None if compression == 'none' else compression)
+    return body.to_pybytes()
+
+
+ENCODERS = {'pandas': encode_pandas, 'arrow': encode_arrow}
+
+
+def server_input(insert_format, compression, dataframe, body):
+    """
+    Returns (file name, bytes) of what the server parses for an insert: the Arrow body as sent,
+    or the Native blocks that follow insert_df's query line, compressed like the request.
+    """
+    if insert_format == 'arrow':
+        return 'body.arrow', body
+    native = encode_pandas(dataframe, 'none').split(b'\n', 1)[1]
+    compressor = get_compressor(None if compression == 'none' else compression)
+    return f'body.native{EXTENSIONS[compression]}', compressor.compress_block(native) + (compressor.flush() or b'')
+
+
+def best_of(repeats, action):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = action()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def make_loader(directory, repeats):
+    """
+    Returns a function that loads a server input (see `server_input`) into a fresh
+    create_table.sql table and returns the best time in seconds, or None when chdb is not installed.
+    """
+    try:
+        from benchmarks.fakes import ChdbClickhouseClient
+        client = ChdbClickhouseClient(database='insert_formats')
+    except ImportError:
+        return None
+    with open(f'{QUERY_DIR}/create_table.sql') as f:
+        create_sql = f.read().format(table_name='candles')
+
+    def load(file_name, body):
+        path = os.path.join(directory, file_name)
+        with open(path, 'wb') as f:
+            f.write(body)
+        input_format = 'Arrow' if file_name.startswith('body.arrow') else 'Native'
+        timings = []
+        for _ in range(repeats):
+            client.command("DROP TABLE IF EXISTS candles")
+            client.command(create_sql)
+            start = time.perf_counter()
+            client.command(f"INSERT INTO candles SELECT * FROM file('{path}', {input_format})")
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    return load
+
+
+def main(args):
+    data = make_candles(args.tickers, args.days)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        load = make_loader(directory, args.repeats)
+        for insert_format, encode in ENCODERS.items():
+            for compression in COMPRESSIONS:
+                encode_seconds, body = best_of(args.repeats, lambda: encode(data, compression))
+                load_seconds = None
+                if load is not None:
+                    load_seconds = load(*server_input(insert_format, compression, data, body))
+                results.append((insert_format, compression, encode_seconds, len(body), load_seconds))
+
+    print(f"{len(data):,} candles ({args.tickers} tickers x {args.days} days)")
+    print(f"{'format':<8}{'compression':<13}{'encode rows/s':>15}{'bytes on wire':>15}{'bytes/row':>11}{'load rows/s':>13}")
+    for insert_format, compression, encode_seconds, wire_bytes, load_seconds in results:
+        load_rate = f"{len(data) / load_seconds:>13,.0f}" if load_seconds else f"{'-':>13}"
+        print(f"{insert_format:<8}{compression:<13}{len(data) / encode_seconds:>15,.0f}{wire_bytes:>15,}"
+              f"{wire_bytes / len(data):>11.1f}{load_rate}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=120, help="calendar days of history per ticker")
+    parser.add_argument('--repeats', type=int, default=3)
+    main(parser.parse_args())
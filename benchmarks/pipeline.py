@@ -0,0 +1,316 @@
+"""
+Runs PipelineRunner end to end without broker credentials or a ClickHouse server, and reports
+rows/sec, API calls per ticker, peak RSS and the time spent in each stage. SmartConnect is
+replaced by FakeSmartConnect and ClickHouse by an embedded chdb session (or an in-memory sink
+with --clickhouse memory / when chdb is not installed). Every run is appended to
+benchmarks/results/pipeline.jsonl so that runs can be compared.
+
+Usage:
+    python -m benchmarks.pipeline api --tickers 50 --days 60 --latency-ms 20 --rate-limit 0.01
+    python -m benchmarks.pipeline local --tickers 50 --days 60 --format parquet
+    python -m benchmarks.pipeline local --tickers 50 --days 365 --bulk attach
+    python -m benchmarks.pipeline compare --last 10
+
+Stage times are summed over threads, so with several workers they can exceed the wall time.
+Local parsing happens in worker processes and shows up as 'read' (time the inserting thread
+waited for parsed data); the children's peak RSS is reported separately.
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.fakes import (ChdbClickhouseClient, FakeBrokerStats, FakeScripCache, FakeSmartConnect,
+                              MemoryClickhouseClient, session_candles)
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'pipeline.jsonl')
+BENCH_TABLE = 'bench_ohlcv'
+# A syntactically valid TOTP secret; the fake broker accepts any code
+FAKE_TOTP_SECRET = 'JBSWY3DPEHPK3PXP'
+
+
+class StageTimer:
+    """
+    Accumulates wall time per stage across threads.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] += seconds
+
+    def wrap(self, stage, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_iterator(self, stage, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            iterator = iter(function(*args, **kwargs))
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.add(stage, time.perf_counter() - start)
+                yield item
+        return timed
+
+
+def make_clickhouse(kind):
+    if kind in ('auto', 'chdb'):
+        try:
+            return ChdbClickhouseClient(), 'chdb'
+        except ImportError:
+            if kind == 'chdb':
+                raise
+    return MemoryClickhouseClient(), 'memory'
+
+
+def write_local_files(directory, tickers, days, file_format):
+    """
+    Writes one file per ticker with `days` of one-minute candles in the layout local mode reads.
+
+    Returns:
+        int: The number of candles written.
+    """
+    end = datetime.today().date()
+    rows = 0
+    for i in range(tickers):
+        token = str(10000 + i)
+        stamps, values = [], []
+        for offset in range(days, 0, -1):
+            day = end - timedelta(days=offset)
+            if day.weekday() < 5:
+                timestamps, candles = session_candles(token, day)
+                stamps.append(timestamps)
+                values.append(candles)
+        timestamps, candles = np.concatenate(stamps), np.concatenate(values)
+        rows += len(timestamps)
+        path = os.path.join(directory, f'bench{i:04d}.{file_format}')
+        if file_format == 'parquet':
+            pq.write_table(pa.table({
+                'timestamp': pa.array(timestamps.astype('datetime64[s]')),
+                **{name: candles[:, j] for j, name in enumerate(('open', 'high', 'low', 'close'))},
+                'volume': candles[:, 4],
+            }), path)
+        else:
+            with open(path, 'w') as f:
+                f.write('timestamp,open,high,low,close,volume\n')
+                text = np.datetime_as_string(timestamps, unit='s')
+                f.writelines(f"{t},{o},{h},{l},{c},{int(v)}\n" for t, (o, h, l, c, v) in zip(text, candles.tolist()))
+    return rows
+
+
+def bench_config(args, data_dir=None):
+    """
+    Returns a Config subclass pointing the pipeline at the stand-ins. Everything not set here
+    (worker counts, buffer sizes, insert format...) still comes from the environment, so a
+    benchmark measures the configuration under test.
+    """
+    from config.settings import Config
+
+    class BenchConfig(Config):
+        def __init__(self):
+            super().__init__()
+            self.DATA_SOURCE_MODE = args.mode
+            self.ANGELONE_API = 'bench'
+            self.ANGEL_ONE_USER_ID = 'bench'
+            self.ANGEL_ONE_PIN = '0000'
+            self.ANGEL_ONE_TOKEN = FAKE_TOTP_SECRET
+            self.ANGEL_ONE_MAX_RPS = args.rps
+            self.EXCHANGES = ['NSE']
+            self.INTERVALS = ['ONE_MINUTE']
+            self.BACKFILL_MODE = 'watermark'
+            self.SCRIP_CACHE_DIR = ''
+            self.SPOOL_DIR = ''
+            self.CLICKHOUSE_TABLE = BENCH_TABLE
+            self.CLICKHOUSE_DATABASE = 'bench'
+            self.CLICKHOUSE_ROLLUPS = args.rollups
+            # Every run starts from an empty database
+            self.CLICKHOUSE_BOOTSTRAP = 'always'
+            self.LOCAL_DATA_FOLDER = data_dir
+            self.LOCAL_INCREMENTAL = False
+            self.LOCAL_BULK_LOAD = args.bulk or ''
+
+    return BenchConfig
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from src.downloader.fetch_local_data import ReadLocalData
+    from src.pipeline_runner import PipelineRunner
+    from src.preprocess.preprocess import PreprocessData
+    from src.utils.rate_limiter import AdaptiveRateLimiter
+
+    clickhouse, clickhouse_kind = make_clickhouse(args.clickhouse)
+    if args.bulk in ('attach', 'replace') and clickhouse_kind != 'chdb':
+        raise SystemExit(f"--bulk {args.bulk} moves partitions between tables, which needs chdb.")
+    stats = FakeBrokerStats()
+    timer = StageTimer()
+
+    with contextlib.ExitStack() as stack:
+        data_dir = None
+        if args.mode == 'local':
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='bench-local-'))
+            print(f"Writing {args.tickers} {args.format} files with {args.days} days each...")
+            write_local_files(data_dir, args.tickers, args.days, args.format)
+
+        def smart_connect(api_key):
+            return FakeSmartConnect(api_key, stats, history_days=args.days, latency_seconds=args.latency_ms / 1000,
+                                    rate_limit_probability=args.rate_limit, seed=args.seed)
+
+        patches = [
+            mock.patch('src.ingestion.clickhouse.get_client', lambda **kwargs: clickhouse),
+            mock.patch('src.downloader.angelone_api_client.SmartConnect', smart_connect),
+            mock.patch('src.downloader.scrip_master.ScripMasterCache', lambda *a, **kw: FakeScripCache(args.tickers)),
+            mock.patch.object(AdaptiveRateLimiter, 'acquire', timer.wrap('rate_limit_wait', AdaptiveRateLimiter.acquire)),
+            mock.patch.object(PreprocessData, 'preprocess_batch',
+                              staticmethod(timer.wrap('preprocess', PreprocessData.preprocess_batch))),
+            mock.patch.object(ReadLocalData, 'stream_local_data',
+                              staticmethod(timer.wrap_iterator('read', ReadLocalData.stream_local_data))),
+        ]
+        for patch in patches:
+            stack.enter_context(patch)
+        if not args.verbose:
+            # The pipeline prints a line per window; keep the benchmark output readable
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+
+        start = time.perf_counter()
+        runner = PipelineRunner(bench_config(args, data_dir))
+        runner.run()
+        seconds = time.perf_counter() - start
+
+    # Read before any further subprocess is forked from this (large) process
+    peak_rss = peak_rss_mb(resource.RUSAGE_SELF), peak_rss_mb(resource.RUSAGE_CHILDREN)
+    rows = clickhouse.count_rows(BENCH_TABLE)
+    parts = clickhouse.count_parts(BENCH_TABLE)
+    stage_seconds = dict(timer.seconds)
+    stage_seconds['fetch'] = stats.fetch_seconds
+    stage_seconds['insert'] = clickhouse.insert_seconds
+    result = {
+        'mode': args.mode,
+        'label': args.label,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'clickhouse': clickhouse_kind,
+        'params': {key: getattr(args, key) for key in ('tickers', 'days', 'latency_ms', 'rate_limit', 'rps', 'format', 'bulk')},
+        'pipeline': {key: getattr(runner.config, key) for key in (
+            'API_PIPELINE', 'INGEST_WORKERS', 'PREPROCESS_WORKERS', 'INSERT_WORKERS', 'CLICKHOUSE_INSERT_FORMAT',
+            'INSERT_BUFFER_ROWS', 'LOCAL_PARSE_WORKERS', 'LOCAL_CSV_ENGINE')},
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'inserts': clickhouse.inserts,
+        'parts': parts,
+        'api_calls': stats.calls,
+        'api_calls_per_ticker': round(stats.calls / args.tickers, 2) if args.mode == 'api' else None,
+        'rate_limited_calls': stats.rate_limited,
+        'peak_rss_mb': round(peak_rss[0], 1),
+        'peak_rss_children_mb': round(peak_rss[1], 1),
+        'stage_seconds': {stage: round(value, 3) for stage, value in sorted(stage_seconds.items()) if value},
+    }
+    return result
+
+
+def save(result, path=RESULTS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+def print_result(result):
+    print(f"{result['mode']} run on {result['clickhouse']}: {result['rows']:,} rows in {result['seconds']:.2f}s "
+          f"= {result['rows_per_sec']:,.0f} rows/sec")
+    if result['mode'] == 'api':
+        print(f"API calls: {result['api_calls']} ({result['api_calls_per_ticker']} per ticker, "
+              f"{result['rate_limited_calls']} rate limited)")
+    parts = '' if result['parts'] is None else f", {result['parts']} active parts at the end"
+    print(f"Inserts: {result['inserts']}{parts}")
+    print(f"Peak RSS: {result['peak_rss_mb']:.0f} MB (children {result['peak_rss_children_mb']:.0f} MB)")
+    print("Stage seconds: " + ', '.join(f"{k}={v:.2f}" for k, v in result['stage_seconds'].items()))
+
+
+def compare(last, path=RESULTS_FILE):
+    if not os.path.exists(path):
+        raise SystemExit(f"No benchmark results in {path} yet.")
+    with open(path, 'r', encoding='utf-8') as f:
+        results = [json.loads(line) for line in f if line.strip()][-last:]
+
+    print(f"{'started_at':<26}{'commit':<10}{'mode':<7}{'label':<14}{'db':<8}{'rows':>11}{'rows/sec':>12}"
+          f"{'calls/tkr':>10}{'rss MB':>8}  stages")
+    for r in results:
+        calls = '' if r['api_calls_per_ticker'] is None else f"{r['api_calls_per_ticker']:.1f}"
+        stages = ' '.join(f"{k}={v:.1f}" for k, v in r['stage_seconds'].items())
+        print(f"{r['started_at']:<26}{r['commit'] or '-':<10}{r['mode']:<7}{(r['label'] or '-'):<14}{r['clickhouse']:<8}"
+              f"{r['rows']:>11,}{r['rows_per_sec']:>12,.0f}{calls:>10}{r['peak_rss_mb']:>8.0f}  {stages}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['api', 'local', 'compare'])
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--days', type=int, default=60, help="calendar days of history per ticker")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="simulated latency of every API call")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="probability that an API call is throttled")
+    parser.add_argument('--rps', type=float, default=1000.0, help="ANGEL_ONE_MAX_RPS for the run")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="local mode input files")
+    parser.add_argument('--bulk', choices=['direct', 'attach', 'replace'], default=None,
+                        help="local mode: partition-aligned bulk load (LOCAL_BULK_LOAD)")
+    parser.add_argument('--clickhouse', choices=['auto', 'chdb', 'memory'], default='auto')
+    parser.add_argument('--rollups', nargs='*', default=[], help="rollups to maintain during the run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', default=None, help="free-form tag stored with the result")
+    parser.add_argument('--last', type=int, default=20, help="compare: number of runs shown")
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help="keep the pipeline's own output")
+    args = parser.parse_args()
+
+    if args.mode == 'compare':
+        compare(args.last)
+    else:
+        result = run(args)
+        print_result(result)
+        if not args.no_save:
+            save(result)
+            print(f"Saved to {RESULTS_FILE}")
@@ -0,0 +1,144 @@
+"""
+Measures how long the CLI takes before it ingests anything: the imports of each command, timed in
+fresh interpreters against the import set main.py used to load for every command, and the
+ClickHouse round trips of table bootstrap with CLICKHOUSE_BOOTSTRAP=always versus a cold and a
+warm bootstrap cache. ClickHouse is replaced by an in-memory sink that waits --rtt-ms per query.
+
+Usage:
+    python -m benchmarks.startup imports --repeat 7
+    python -m benchmarks.startup bootstrap --rtt-ms 20 --rollups 5m 1h 1d
+    python -m benchmarks.startup all
+
+Import times include interpreter startup and are the median of --repeat runs; the first run of
+each set is discarded so that every measurement reads warm .pyc files. SmartApi looks up the
+public IP address when it is imported, so commands that load the broker client also wait on the
+network (or its timeout when offline).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What `python main.py` imported for every command before the CLI imported modes lazily
+EAGER_MODULES = [
+    'config.settings', 'src.downloader.fetch_local_data', 'src.downloader.angelone_api_client',
+    'src.downloader.response_spool', 'src.downloader.scrip_master', 'src.preprocess.preprocess',
+    'src.preprocess.quality', 'src.ingestion.clickhouse', 'src.ingestion.ingest_single',
+    'src.ingestion.backfill_planner', 'src.ingestion.ingest_concurrent', 'src.ingestion.insert_buffer',
+    'src.ingestion.quarantine', 'src.ingestion.staged_pipeline', 'src.ingestion.shard_coordinator',
+    'src.ingestion.tail', 'src.utils.rate_limiter',
+]
+BROKER_MODULES = [
+    'src.downloader.angelone_api_client', 'src.downloader.scrip_master', 'src.utils.rate_limiter',
+    'src.ingestion.backfill_planner', 'src.ingestion.ingest_concurrent', 'src.ingestion.staged_pipeline',
+]
+# What each command imports now, up to the point where it starts ingesting
+COMMAND_MODULES = {
+    '--help': [],
+    'status': ['src.ingestion.clickhouse'],
+    'local': ['src.pipeline_runner', 'src.downloader.fetch_local_data'],
+    'replay': ['src.pipeline_runner', 'src.downloader.response_spool', 'src.ingestion.ingest_concurrent',
+               'src.ingestion.staged_pipeline'],
+    'api': ['src.pipeline_runner', *BROKER_MODULES],
+    'tail': ['src.pipeline_runner', 'src.downloader.angelone_api_client', 'src.downloader.scrip_master',
+             'src.utils.rate_limiter', 'src.ingestion.backfill_planner', 'src.ingestion.tail'],
+}
+
+
+def time_imports(modules, repeat):
+    """
+    Returns the median wall seconds of a fresh interpreter that imports main.py and `modules`.
+    """
+    code = '; '.join(f'import {name}' for name in ['main', *modules])
+    samples = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, check=True, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples[1:])
+
+
+def bench_imports(args):
+    print(f"Startup imports, median of {args.repeat} fresh interpreters:")
+    eager = time_imports(EAGER_MODULES, args.repeat)
+    print(f"  {'before (every command)':<26}{eager:>8.3f}s")
+    for command, modules in COMMAND_MODULES.items():
+        seconds = time_imports(modules, args.repeat)
+        print(f"  {'main.py ' + command:<26}{seconds:>8.3f}s  ({seconds / eager:.0%} of before)")
+
+
+class RoundTripClient:
+    """
+    Wraps a clickhouse_connect-like client, counting queries and commands and delaying each
+    by a fixed round-trip time.
+    """
+
+    def __init__(self, client, rtt_seconds):
+        self.client = client
+        self.rtt_seconds = rtt_seconds
+        self.round_trips = 0
+
+    def command(self, *args, **kwargs):
+        self._wait()
+        return self.client.command(*args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        self._wait()
+        return self.client.query(*args, **kwargs)
+
+    def _wait(self):
+        self.round_trips += 1
+        time.sleep(self.rtt_seconds)
+
+
+def bench_bootstrap(args):
+    from benchmarks.fakes import MemoryClickhouseClient
+    from config.settings import Config
+    from src.pipeline_runner import PipelineRunner
+
+    client = RoundTripClient(MemoryClickhouseClient(), args.rtt_ms / 1000)
+
+    with tempfile.TemporaryDirectory(prefix='bench-startup-') as directory:
+        class StartupConfig(Config):
+            def __init__(self, bootstrap):
+                super().__init__()
+                self.DATA_SOURCE_MODE = 'local'
+                self.LOCAL_DATA_FOLDER = directory
+                self.SPOOL_DIR = ''
+                self.CLICKHOUSE_DATABASE = 'bench'
+                self.CLICKHOUSE_ROLLUPS = args.rollups
+                self.CLICKHOUSE_BOOTSTRAP = bootstrap
+                self.BOOTSTRAP_CACHE_DIR = os.path.join(directory, 'cache')
+                self.LOG_CONSOLE = args.verbose
+
+        print(f"Runner construction with {args.rtt_ms:g} ms per ClickHouse round trip, "
+              f"rollups {args.rollups or 'none'}:")
+        runs = [('always', 'always'), ('auto, cold cache', 'auto'), ('auto, warm cache', 'auto')]
+        with mock.patch('src.ingestion.clickhouse.get_client', lambda **kwargs: client):
+            for label, bootstrap in runs:
+                client.round_trips = 0
+                start = time.perf_counter()
+                PipelineRunner(StartupConfig(bootstrap))
+                seconds = time.perf_counter() - start
+                print(f"  {label:<26}{seconds:>8.3f}s  {client.round_trips:>4} round trips")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['imports', 'bootstrap', 'all'])
+    parser.add_argument('--repeat', type=int, default=5, help="imports: interpreters timed per command")
+    parser.add_argument('--rtt-ms', type=float, default=10.0, help="bootstrap: simulated ClickHouse round trip")
+    parser.add_argument('--rollups', nargs='*', default=['5m', '1h', '1d'], help="bootstrap: rollups to create")
+    parser.add_argument('--verbose', action='store_true', help="keep the pipeline's own output")
+    args = parser.parse_args()
+
+    if args.mode in ('imports', 'all'):
+        bench_imports(args)
+    if args.mode in ('bootstrap', 'all'):
+        bench_bootstrap(args)
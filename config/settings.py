@@ -1,6 +1,19 @@
 import os
 from dotenv import load_dotenv
 
+# Settings a shard can override with a '_SHARD<k>' suffix, e.g. ANGELONE_API_SHARD3,
+# so that every shard logs in with its own broker account and request budget
+SHARD_SCOPED_SETTINGS = {
+    "ANGELONE_API": str,
+    "ANGELONE_SECRET_KEY": str,
+    "ANGEL_ONE_PASSWORD": str,
+    "ANGEL_ONE_TOKEN": str,
+    "ANGEL_ONE_USER_ID": str,
+    "ANGEL_ONE_PIN": str,
+    "ANGEL_ONE_MAX_RPS": float,
+}
+
+
 class Config:
     def __init__(self):
         load_dotenv()
@@ -13,9 +26,55 @@ class Config:
         self.ANGEL_ONE_USER_ID = os.getenv("ANGEL_ONE_USER_ID")
         self.ANGEL_ONE_PIN = os.getenv("ANGEL_ONE_PIN")
         self.ANGEL_ONE_API_SCRIP_LINK = os.getenv("ANGEL_ONE_API_SCRIP_LINK")
+        # Filtered scrip master cache (disabled when empty) and how long a download stays fresh
+        self.SCRIP_CACHE_DIR = os.getenv("SCRIP_CACHE_DIR", ".cache/scrip")
+        self.SCRIP_CACHE_TTL_SECONDS = float(os.getenv("SCRIP_CACHE_TTL_SECONDS", str(12 * 3600)))
+        self.ANGEL_ONE_MAX_RPS = float(os.getenv("ANGEL_ONE_MAX_RPS", "3"))
+
+        # Comma-separated exchange segments (NSE, BSE, NFO) and candle intervals ingested in API mode
+        self.EXCHANGES = [e.strip().upper() for e in os.getenv("EXCHANGES", "NSE").split(",") if e.strip()]
+        self.INTERVALS = [i.strip().upper() for i in os.getenv("INTERVALS", "ONE_MINUTE").split(",") if i.strip()]
+        # NFO instrument types kept from the scrip master (futures only by default)
+        self.NFO_INSTRUMENT_TYPES = tuple(
+            t.strip().upper() for t in os.getenv("NFO_INSTRUMENT_TYPES", "FUTIDX,FUTSTK").split(",") if t.strip()
+        )
+
+        # Number of tickers ingested concurrently in API mode
+        self.INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+        # 'staged' runs fetch / preprocess / insert as separate stages; 'pool' runs one ticker per worker
+        self.API_PIPELINE = os.getenv("API_PIPELINE", "staged").lower()
+        self.PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
+        self.INSERT_WORKERS = int(os.getenv("INSERT_WORKERS", "1"))
+        self.PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+        # 'watermark' fetches from the latest stored timestamp; 'gaps' also repairs holes in the history
+        self.BACKFILL_MODE = os.getenv("BACKFILL_MODE", "watermark").lower()
+        self.NSE_HOLIDAYS_FILE = os.getenv("NSE_HOLIDAYS_FILE", "config/nse_holidays.txt")
+        # Store each API window as it arrives instead of a ticker's whole history at once
+        self.STREAM_WINDOWS = os.getenv("STREAM_WINDOWS", "true").lower() == "true"
+
+        # Cross-ticker insert buffer thresholds
+        self.INSERT_BUFFER_ROWS = int(os.getenv("INSERT_BUFFER_ROWS", "500000"))
+        self.INSERT_BUFFER_BYTES = int(os.getenv("INSERT_BUFFER_BYTES", str(256 * 1024 * 1024)))
+        self.INSERT_BUFFER_SECONDS = float(os.getenv("INSERT_BUFFER_SECONDS", "30"))
+
+        # Sharded API ingestion: coordination table, heartbeat interval and when a silent shard counts as dead
+        self.CLICKHOUSE_SHARD_TABLE = os.getenv("CLICKHOUSE_SHARD_TABLE", "ingest_shards")
+        self.SHARD_HEARTBEAT_SECONDS = float(os.getenv("SHARD_HEARTBEAT_SECONDS", "30"))
+        self.SHARD_STALE_SECONDS = float(os.getenv("SHARD_STALE_SECONDS", "300"))
+
+        # Tail mode: time between sweeps, longest wait before fetched candles are inserted,
+        # and the session age at which the broker JWT is renewed with the refresh token
+        self.TAIL_CADENCE_SECONDS = float(os.getenv("TAIL_CADENCE_SECONDS", "60"))
+        self.TAIL_FLUSH_SECONDS = float(os.getenv("TAIL_FLUSH_SECONDS", "5"))
+        self.SESSION_REFRESH_SECONDS = float(os.getenv("SESSION_REFRESH_SECONDS", str(6 * 3600)))
 
-        # Local / API Mode
+        # Local / API / Replay / Tail Mode
         self.DATA_SOURCE_MODE = os.getenv("DATA_SOURCE_MODE", "api").lower()
+        # Comma-separated tickers as stored (e.g. 'reliance,bse:tcs'); empty ingests every ticker
+        self.TICKERS = [t.strip().lower() for t in os.getenv("TICKERS", "").split(",") if t.strip()]
+
+        # Directory for the raw API response spool (disabled when empty)
+        self.SPOOL_DIR = os.getenv("SPOOL_DIR", "")
 
         # ClickHouse Config
         self.CLICKHOUSE_TABLE = os.getenv("CLICKHOUSE_TABLE")
@@ -23,6 +82,68 @@ class Config:
         self.CLICKHOUSE_USERNAME = os.getenv("CLICKHOUSE_USERNAME")
         self.CLICKHOUSE_PASSWORD = os.getenv("CLICKHOUSE_PASSWORD")
         self.CLICKHOUSE_DATABASE = os.getenv("CLICKHOUSE_DATABASE")
+        self.CLICKHOUSE_COMPRESSION = os.getenv("CLICKHOUSE_COMPRESSION", "lz4").lower()
+        self.CLICKHOUSE_INSERT_FORMAT = os.getenv("CLICKHOUSE_INSERT_FORMAT", "arrow").lower()
+        # 'replacing' creates new tables as ReplacingMergeTree, collapsing re-ingested candles
+        self.CLICKHOUSE_TABLE_ENGINE = os.getenv("CLICKHOUSE_TABLE_ENGINE", "mergetree").lower()
+        # Materialized-view rollups maintained for the one-minute table (5m, 15m, 1h, 1d; empty disables)
+        self.CLICKHOUSE_ROLLUPS = [r.strip() for r in os.getenv("CLICKHOUSE_ROLLUPS", "5m,15m,1h,1d").split(",") if r.strip()]
+        # Failed inserts are retried with exponential backoff (safe thanks to deduplication tokens)
+        self.CLICKHOUSE_INSERT_RETRIES = int(os.getenv("CLICKHOUSE_INSERT_RETRIES", "3"))
+        self.CLICKHOUSE_RETRY_BACKOFF_SECONDS = float(os.getenv("CLICKHOUSE_RETRY_BACKOFF_SECONDS", "0.5"))
+        # Table DDL at startup: 'always', 'auto' (skip tables recorded in the bootstrap cache) or 'never'
+        self.CLICKHOUSE_BOOTSTRAP = os.getenv("CLICKHOUSE_BOOTSTRAP", "auto").lower()
+        self.BOOTSTRAP_CACHE_DIR = os.getenv("BOOTSTRAP_CACHE_DIR", ".cache/bootstrap")
+        self.BOOTSTRAP_CACHE_TTL_SECONDS = float(os.getenv("BOOTSTRAP_CACHE_TTL_SECONDS", str(24 * 3600)))
 
         # Local Data Path
         self.LOCAL_DATA_FOLDER = os.getenv("LOCAL_DATA_FOLDER")
+
+        # Local parsing: worker processes (default: all CPUs), byte range per task and memory cap
+        self.LOCAL_PARSE_WORKERS = int(os.getenv("LOCAL_PARSE_WORKERS", "0")) or None
+        self.LOCAL_CHUNK_BYTES = int(os.getenv("LOCAL_CHUNK_BYTES", str(64 * 1024 * 1024)))
+        self.LOCAL_MAX_INFLIGHT_BYTES = int(os.getenv("LOCAL_MAX_INFLIGHT_BYTES", str(1024 * 1024 * 1024)))
+        self.LOCAL_CSV_ENGINE = os.getenv("LOCAL_CSV_ENGINE", "pyarrow").lower()
+        # Skip local rows at or before each ticker's latest stored timestamp
+        self.LOCAL_INCREMENTAL = os.getenv("LOCAL_INCREMENTAL", "false").lower() == "true"
+        # Partition-aligned bulk load of local archives: '' (per-ticker inserts) | direct | attach | replace
+        self.LOCAL_BULK_LOAD = os.getenv("LOCAL_BULK_LOAD", "").lower()
+        self.LOCAL_BULK_WORKERS = int(os.getenv("LOCAL_BULK_WORKERS", "2"))
+        self.LOCAL_BULK_SPILL_DIR = os.getenv("LOCAL_BULK_SPILL_DIR", "")
+
+        # Quality gate between preprocessing and insert; rejected rows go to <table>_quarantine and
+        # per-ticker counters of each run to <table>_quality
+        self.QUALITY_GATE = os.getenv("QUALITY_GATE", "true").lower() == "true"
+        # Trading session (exchange wall time) that intraday candles must fall in
+        self.QUALITY_SESSION = os.getenv("QUALITY_SESSION", "09:15-15:30")
+        # Checks that reject a row (the others are only counted); empty keeps every row
+        self.QUALITY_REJECT = [r.strip() for r in os.getenv(
+            "QUALITY_REJECT",
+            "duplicate,out_of_session,misaligned,ohlc_inconsistent,non_positive_price,zero_volume_padding"
+        ).split(",") if r.strip()]
+        self.QUARANTINE_BUFFER_ROWS = int(os.getenv("QUARANTINE_BUFFER_ROWS", "100000"))
+
+        # Logging: records are written by a background thread as JSON lines (or 'text') to logs/AppLogger.log,
+        # rotated at LOG_MAX_BYTES; INFO messages are sampled to LOG_SAMPLE_PER_SECOND per call site (0 keeps all)
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+        self.LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+        self.LOG_SAMPLE_PER_SECOND = float(os.getenv("LOG_SAMPLE_PER_SECOND", "20"))
+        # Progress messages on stdout
+        self.LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+
+        # Prometheus metrics: HTTP port (0 disables), textfile-collector path (empty disables),
+        # and the number of slowest tickers listed in the end-of-run summary
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+        self.METRICS_FILE = os.getenv("METRICS_FILE", "")
+        self.METRICS_SUMMARY_TICKERS = int(os.getenv("METRICS_SUMMARY_TICKERS", "10"))
+
+    def apply_shard(self, index):
+        """
+        Replaces shard-scoped settings with their '_SHARD<index>' variants where those are set.
+        """
+        for key, cast in SHARD_SCOPED_SETTINGS.items():
+            value = os.getenv(f"{key}_SHARD{index}")
+            if value is not None:
+                setattr(self, key, cast(value))
@@ -1,5 +1,123 @@
-from src.pipeline_runner import PipelineRunner
+"""
+Ingest OHLCV data into ClickHouse.
+
+Usage:
+    python main.py api [--tickers reliance,tcs] [--shard 2/4] [--run-id 20240601]
+    python main.py backfill [--tickers reliance]          # API ingestion that also repairs gaps in the history
+    python main.py local --data-dir data/ [--tickers reliance] [--bulk replace]
+    python main.py replay --spool-dir .spool/
+    python main.py tail
+    python main.py status [--tickers reliance,tcs]        # latest stored candle per table (and ticker)
+    python main.py                                        # the mode set by DATA_SOURCE_MODE
+
+Only the modules of the chosen command are imported, and with --bootstrap auto (the default)
+tables created by an earlier run are not checked again.
+"""
+import argparse
 from config.settings import Config
-if __name__ == "__main__":
-    runner = PipelineRunner(Config)
+
+# Subcommand -> DATA_SOURCE_MODE it runs the pipeline in
+MODES = {'api': 'api', 'backfill': 'api', 'local': 'local', 'replay': 'replay', 'tail': 'tail'}
+
+
+def shard_spec(value):
+    from src.ingestion.shard_coordinator import ShardSpec
+    return ShardSpec.parse(value)
+
+
+def ticker_list(value):
+    return [t.strip().lower() for t in value.split(',') if t.strip()]
+
+
+def build_parser():
+    # Options every command accepts, before or after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--tickers", type=ticker_list, default=argparse.SUPPRESS,
+                        help="comma-separated tickers as stored, e.g. 'reliance,bse:tcs' (default: TICKERS)")
+    common.add_argument("--bootstrap", choices=['always', 'auto', 'never'], default=argparse.SUPPRESS,
+                        help="table DDL at startup: always, auto (skip tables created before) or never "
+                             "(default: CLICKHOUSE_BOOTSTRAP)")
+
+    sharding = argparse.ArgumentParser(add_help=False)
+    sharding.add_argument("--shard", type=shard_spec, default=argparse.SUPPRESS,
+                          help="ingest only shard k of n ('k/n', 1-based), or claim a free one ('auto/n')")
+    sharding.add_argument("--run-id", default=argparse.SUPPRESS,
+                          help="groups the shards of one run in the coordination table (default: today's UTC date)")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     parents=[common, sharding])
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("api", parents=[common, sharding], help="ingest from the Angel One API")
+    commands.add_parser("backfill", parents=[common, sharding],
+                        help="ingest from the API, refetching windows with missing trading days")
+    local = commands.add_parser("local", parents=[common], help="ingest CSV/Parquet/Arrow files")
+    local.add_argument("--data-dir", default=argparse.SUPPRESS, help="input directory (default: LOCAL_DATA_FOLDER)")
+    local.add_argument("--bulk", choices=['direct', 'attach', 'replace'], default=argparse.SUPPRESS,
+                       help="load partition by partition: one sorted insert per month, directly or through a "
+                            "staging table attached to (or replacing) the month (default: LOCAL_BULK_LOAD)")
+    replay = commands.add_parser("replay", parents=[common], help="re-ingest spooled API responses")
+    replay.add_argument("--spool-dir", default=argparse.SUPPRESS, help="spool directory (default: SPOOL_DIR)")
+    commands.add_parser("tail", parents=[common], help="keep the one-minute table current during market hours")
+    commands.add_parser("status", parents=[common], help="show the latest stored candle per table")
+    return parser
+
+
+def apply_arguments(config, args):
+    """
+    Overrides the settings loaded from the environment with the command line.
+    """
+    if args.command in MODES:
+        config.DATA_SOURCE_MODE = MODES[args.command]
+    if args.command == "backfill":
+        config.BACKFILL_MODE = "gaps"
+    if "tickers" in args:
+        config.TICKERS = args.tickers
+    if "bootstrap" in args:
+        config.CLICKHOUSE_BOOTSTRAP = args.bootstrap
+    if "data_dir" in args:
+        config.LOCAL_DATA_FOLDER = args.data_dir
+    if "bulk" in args:
+        config.LOCAL_BULK_LOAD = args.bulk
+    if "spool_dir" in args:
+        config.SPOOL_DIR = args.spool_dir
+    return config
+
+
+def show_status(config):
+    """
+    Prints the number of tickers and the latest stored candle of every interval table, and the
+    watermark of each ticker when --tickers is given. No table is created.
+    """
+    from src.ingestion.clickhouse import ClickhouseConnect, interval_table_name
+
+    for interval in config.INTERVALS:
+        table_name = interval_table_name(config.CLICKHOUSE_TABLE, interval)
+        clickhouse = ClickhouseConnect(config.CLICKHOUSE_HOST, config.CLICKHOUSE_USERNAME, config.CLICKHOUSE_PASSWORD,
+                                       config.CLICKHOUSE_DATABASE, table_name, bootstrap='never')
+        if not clickhouse.table_exists(table_name):
+            print(f"{table_name} ({interval}): absent")
+            continue
+        watermarks = clickhouse.get_latest_timestamps(tickers=config.TICKERS or None, table_name=table_name)
+        latest = max(watermarks.values()) if watermarks else None
+        oldest = min(watermarks.values()) if watermarks else None
+        print(f"{table_name} ({interval}): {len(watermarks)} tickers, "
+              f"latest candle {latest or '-'}, most stale ticker at {oldest or '-'}")
+        for ticker in config.TICKERS:
+            print(f"  {ticker:<24}{watermarks.get(ticker) or 'no data'}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = apply_arguments(Config(), args)
+
+    if args.command == "status":
+        show_status(config)
+        return
+
+    from src.pipeline_runner import PipelineRunner
+    runner = PipelineRunner(config, shard=getattr(args, "shard", None), run_id=getattr(args, "run_id", None))
     runner.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,36 @@
-import pandas as pd
-import requests
 from SmartApi import SmartConnect
 import pyotp
+import threading
+import time
 
 
+from src.downloader.intervals import INTERVAL_MAX_DAYS
+from src.downloader.scrip_master import ScripMasterCache, NFO_INSTRUMENT_TYPES
 from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
+from src.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = AppLogger.get_logger()
 
+# SmartAPI's documented ceiling for getCandleData is 3 requests per second.
+DEFAULT_HISTORICAL_RPS = 3
+
+# Error codes / message fragments SmartAPI uses when a request is throttled.
+RATE_LIMIT_ERROR_CODES = {"AB1004", "AB1019"}
+RATE_LIMIT_MESSAGES = ("exceeding access rate", "too many requests")
+
+# Error codes SmartAPI returns for an invalid or expired JWT
+AUTH_ERROR_CODES = {"AG8001", "AG8002", "AG8003", "AB1010"}
+# Age after which long-running processes renew the JWT with the refresh token
+SESSION_REFRESH_SECONDS = 6 * 3600
+
+# Exchange segments supported for historical candles
+EXCHANGES = ("NSE", "BSE", "NFO")
+
+# Intraday requests span the cash-market session; daily candles are stamped at midnight
+SESSION_TIMES = ("09:15", "15:29")
+DAILY_SESSION_TIMES = ("00:00", "23:59")
+
 
 class AngelOneApiClient:
     """
@@ -15,7 +38,11 @@ class AngelOneApiClient:
     It handles authentication, historical data fetching, and scrip master data retrieval.
     """
 
-    def __init__(self, api_key, username, pin, token, scrip_url):
+    # Default candle interval requested from getCandleData
+    interval = "ONE_MINUTE"
+
+    def __init__(self, api_key, username, pin, token, scrip_url, rate_limiter=None, max_retries=5,
+                 scrip_cache=None):
         """
         Initializes the AngelOneApiClient and establishes a session with SmartAPI.
 
@@ -26,13 +53,28 @@ class AngelOneApiClient:
             secret_key (str): The base32-encoded secret key obtained from SmartAPI portal
                                 for generating TOTPs.
             scrip_url (str): The URL to fetch the latest scrip master data from Angel One.
+            rate_limiter (AdaptiveRateLimiter): Limiter shared by all workers using this client.
+                                                A limiter at the documented rate is created if omitted.
+            max_retries (int): How many times a throttled historical request is retried.
+            scrip_cache (ScripMasterCache): Cache serving `get_latest_scrip`. An uncached one
+                                            (download on every call) is created if omitted.
         """
         self.api_key = api_key
         self.token = token
         self.username = username
         self.pin = pin
         self.scrip_url = scrip_url 
+        self.scrip_cache = scrip_cache or ScripMasterCache(scrip_url)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(DEFAULT_HISTORICAL_RPS)
+        self.max_retries = max_retries
 
+        self._session_lock = threading.Lock()
+        self.login()
+
+    def login(self):
+        """
+        Creates a new SmartAPI session with a fresh TOTP and stores its JWT, refresh and feed tokens.
+        """
         try:
             # Generate the current Time-Based One-Time Password (TOTP)
             self._totp = pyotp.TOTP(self.token).now()
@@ -41,8 +83,9 @@ class AngelOneApiClient:
             logger.error(f"Error generating TOTP: {e}. Please check your TOTP secret key.")
             raise
 
-        # Initialize SmartConnect with the API key
-        self.smartApi = SmartConnect(self.api_key)
+        # Initialize SmartConnect with the API key (kept across re-logins)
+        if getattr(self, 'smartApi', None) is None:
+            self.smartApi = SmartConnect(self.api_key)
 
         try:
             # Generate a session using client ID, MPIN, and TOTP
@@ -53,6 +96,7 @@ class AngelOneApiClient:
                 self.auth_token = response['data']['jwtToken']
                 self.refresh_token = response['data']['refreshToken']
                 self.feed_token = self.smartApi.getfeedToken() # Get feed token for market data
+                self.session_started_at = time.monotonic()
                 logger.info("SmartAPI session generated successfully.")
                 logger.info(f"Auth Token: {self.auth_token[:10]}...") # Log partial token for security
             else:
@@ -65,7 +109,42 @@ class AngelOneApiClient:
             logger.error(f"An unexpected error occurred during SmartAPI session setup: {e}")
             raise
 
-    def get_historical_data(self, from_date, to_date, symbol_token):
+
+    def refresh_session(self, session_started_at=None):
+        """
+        Renews the JWT of the current session with its refresh token, without a new TOTP login.
+        Falls back to a full login if the refresh is rejected.
+
+        Args:
+            session_started_at (float): The session a caller saw failing. If another thread has
+                                        renewed the session since, nothing is done.
+        """
+        with self._session_lock:
+            if session_started_at is not None and self.session_started_at != session_started_at:
+                return
+            try:
+                response = self.smartApi.generateToken(self.refresh_token)
+                if not response or not response.get('status'):
+                    raise Exception(f"{(response or {}).get('message')} (Code: {(response or {}).get('errorcode')})")
+                self.auth_token = response['data']['jwtToken']
+                self.refresh_token = response['data'].get('refreshToken', self.refresh_token)
+                self.feed_token = response['data'].get('feedToken', self.feed_token)
+                self.session_started_at = time.monotonic()
+                logger.info("SmartAPI session refreshed.")
+            except Exception as e:
+                logger.warning(f"Refreshing the SmartAPI session failed, logging in again: {e}")
+                self.login()
+
+    def ensure_session(self, max_age_seconds=SESSION_REFRESH_SECONDS):
+        """
+        Refreshes the session once it is older than `max_age_seconds`, so long-running
+        processes never hit an expired JWT.
+        """
+        session_started_at = self.session_started_at
+        if time.monotonic() - session_started_at >= max_age_seconds:
+            self.refresh_session(session_started_at)
+
+    def get_historical_data(self, from_date, to_date, symbol_token, exchange="NSE", interval=None, exact_times=False):
         """
         Fetches historical candle data for a given symbol token.
 
@@ -75,71 +154,121 @@ class AngelOneApiClient:
             to_date (datetime.datetime): The end date and time for the historical data.
                                          Format will be adjusted to 'YYYY-MM-DD HH:MM'.
             symbol_token (str): The unique token for the symbol (e.g., from scrip master).
+            exchange (str): The exchange segment of the token ('NSE', 'BSE' or 'NFO').
+            interval (str): A key of INTERVAL_MAX_DAYS. Defaults to the client's interval.
+            exact_times (bool): Request from_date / to_date to the minute instead of whole sessions.
 
         Returns:
             dict: A dictionary containing the historical candle data.
                   Returns None if there's an API error or no data.
         """
+        interval = interval or self.interval
+        if interval not in INTERVAL_MAX_DAYS:
+            raise ValueError(f"Invalid interval: {interval}. Expected one of {list(INTERVAL_MAX_DAYS)}")
+        if exchange not in EXCHANGES:
+            raise ValueError(f"Invalid exchange: {exchange}. Expected one of {EXCHANGES}")
+
+        session_start, session_end = DAILY_SESSION_TIMES if interval == "ONE_DAY" else SESSION_TIMES
         historicParam = {
-            "exchange": "NSE",  # The exchange being queried (fixed to NSE)
+            "exchange": exchange,  # The exchange segment being queried
             "symboltoken": symbol_token,  # The unique token for the instrument
-            "interval": "ONE_MINUTE",  # The interval for the data (e.g., 'ONE_MINUTE', 'FIFTEEN_MINUTE', 'DAY')
+            "interval": interval,  # The interval for the data (e.g., 'ONE_MINUTE', 'FIFTEEN_MINUTE', 'ONE_DAY')
             # Format dates to 'YYYY-MM-DD HH:MM' strings as required by the API
-            "fromdate": from_date.strftime('%Y-%m-%d 09:15'),
-            "todate": to_date.strftime('%Y-%m-%d 15:29')
+            "fromdate": from_date.strftime('%Y-%m-%d %H:%M' if exact_times else f'%Y-%m-%d {session_start}'),
+            "todate": to_date.strftime('%Y-%m-%d %H:%M' if exact_times else f'%Y-%m-%d {session_end}')
         }
         
         logger.info(f"Fetching historical data for token {symbol_token} from {historicParam['fromdate']} to {historicParam['todate']}.")
-        
-        try:
-            # Use the initialized smartApi object to call getCandleData
-            res = self.smartApi.getCandleData(historicParam)
+
+        session_renewed = False
+        for _ in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            session_started_at = self.session_started_at
+            start = time.perf_counter()
+            try:
+                # Use the initialized smartApi object to call getCandleData
+                res = self.smartApi.getCandleData(historicParam)
+            except Exception as e:
+                metrics.observe('angelone_api_latency_seconds', time.perf_counter() - start, interval=interval)
+                if self._is_rate_limited(message=str(e)):
+                    self._count_call(interval, 'rate_limited', retry='rate_limit')
+                    self.rate_limiter.on_rate_limited()
+                    continue
+                self._count_call(interval, 'error')
+                logger.error(f"An error occurred while fetching historical data: {e}")
+                return None
+            metrics.observe('angelone_api_latency_seconds', time.perf_counter() - start, interval=interval)
+
             if res and res.get('status'):
+                self.rate_limiter.on_success()
+                rows = len(res.get('data') or [])
+                self._count_call(interval, 'ok' if rows else 'empty')
+                metrics.inc('angelone_rows_fetched_total', rows, interval=interval)
                 logger.info(f"Successfully fetched historical data for {symbol_token}.")
                 return res
-            else:
-                error_message = res.get('message', 'Unknown error fetching historical data.')
-                error_code = res.get('errorcode', 'N/A')
-                logger.warning(f"Failed to fetch historical data for {symbol_token}. Error: {error_message} (Code: {error_code})")
-                return None
-        except Exception as e:
-            logger.error(f"An error occurred while fetching historical data: {e}")
+
+            error_message = (res or {}).get('message', 'Unknown error fetching historical data.')
+            error_code = (res or {}).get('errorcode', 'N/A')
+            if self._is_rate_limited(error_code, error_message):
+                self._count_call(interval, 'rate_limited', retry='rate_limit')
+                self.rate_limiter.on_rate_limited()
+                continue
+            if error_code in AUTH_ERROR_CODES and not session_renewed:
+                # The JWT expired mid-run: renew it once and retry the request
+                self._count_call(interval, 'auth_error', retry='session_expired')
+                self.refresh_session(session_started_at)
+                session_renewed = True
+                continue
+
+            self._count_call(interval, 'error')
+            logger.warning(f"Failed to fetch historical data for {symbol_token}. Error: {error_message} (Code: {error_code})")
             return None
 
-    def get_latest_scrip(self):
+        logger.error(f"Giving up on {symbol_token} after {self.max_retries} rate-limited retries.")
+        return None
+
+    @staticmethod
+    def _count_call(interval, outcome, retry=None):
+        metrics.inc('angelone_api_calls_total', interval=interval, outcome=outcome)
+        if retry is not None:
+            metrics.inc('angelone_api_retries_total', reason=retry)
+
+    @staticmethod
+    def _is_rate_limited(error_code=None, message=None):
+        """
+        Returns True if a SmartAPI error code or message indicates throttling.
         """
-        Fetches the latest scrip master data from the configured URL, filters it
-        for tradable NSE Equity instruments, and saves it to a CSV file.
+        if error_code in RATE_LIMIT_ERROR_CODES:
+            return True
+        message = (message or "").lower()
+        return any(fragment in message for fragment in RATE_LIMIT_MESSAGES)
+
+    @staticmethod
+    def ticker_name(symbol, exchange="NSE"):
+        """
+        Returns the ticker name stored in ClickHouse for a scrip master symbol.
+        NSE equities keep their bare lowercase name ('RELIANCE-EQ' -> 'reliance'); other
+        segments are prefixed with the exchange so tokens listed on several segments do
+        not collide ('bse:reliance', 'nfo:nifty24janfut').
+        """
+        name = symbol.replace("-EQ", "").lower()
+        return name if exchange == "NSE" else f"{exchange.lower()}:{name}"
+
+    def get_latest_scrip(self, exchanges=("NSE",), nfo_instrument_types=NFO_INSTRUMENT_TYPES):
+        """
+        Returns the tradable instruments of the requested exchanges from the scrip master,
+        served by the client's ScripMasterCache (downloaded only when the cached copy is stale
+        or has changed on the server). Instruments added or removed since the previous
+        snapshot are available as `scrip_cache.added` / `scrip_cache.removed`.
+
+        Args:
+            exchanges (tuple): Exchange segments to keep ('NSE', 'BSE', 'NFO').
+            nfo_instrument_types (tuple): Instrument types kept for NFO.
 
         Returns:
             pandas.DataFrame: A DataFrame containing the filtered tradable scrip instruments.
-                              Returns an empty DataFrame if fetching or filtering fails.
         """
-        logger.info(f"Attempting to fetch scrip master data from: {self.scrip_url}")
-        
-        
-        # Make an HTTP GET request to the scrip URL
-        response = requests.get(self.scrip_url)
-        data = response.json() 
-        scrip = pd.DataFrame(data)
-        logger.info(f"Successfully fetched {len(scrip)} entries from scrip master.")
-
-        # Filter for NSE Equity data only based on specified criteria
-        filtered_scrip = scrip[
-            (scrip["exch_seg"] == "NSE") &  # Exchange segment must be NSE
-            (scrip["lotsize"].astype(str) == "1") &  # Lot size should be exactly 1 for equity
-            (scrip["symbol"].str.endswith("-EQ")) &  # Symbol should end with '-EQ' to identify equity
-            (~scrip["symbol"].str.contains("NSETEST", na=False)) &  # Exclude test symbols
-            # Instrument type should be null, empty, OR if it's not null/empty,
-            # the 'name' should not end with "ETF" to filter out ETFs
-            (scrip["instrumenttype"].isna() | 
-                (scrip["instrumenttype"] == "") | 
-                (~scrip["name"].str.endswith("ETF", na=False)))
-        ].sort_values(by='symbol') # Sort by symbol for consistency
-
-        # Save the filtered scrip data to a CSV file
-        output_filename = "tradable_instrument.csv"
-        filtered_scrip.to_csv(output_filename, index=False)
-        logger.info(f"Filtered {len(filtered_scrip)} tradable instruments and saved to {output_filename}.")
-        
-        return filtered_scrip
+        for exchange in exchanges:
+            if exchange not in EXCHANGES:
+                raise ValueError(f"Invalid exchange: {exchange}. Expected one of {EXCHANGES}")
+        return self.scrip_cache.load(exchanges, nfo_instrument_types)
@@ -0,0 +1,110 @@
+"""
+One-time conversion of a local CSV archive into monthly Parquet files.
+
+Usage:
+    python -m src.downloader.convert_local_data ./data/csv/ ./data/parquet/
+
+Every CSV is written to '<output>/ticker=<symbol>/<YYYYMM>.parquet', which ReadLocalData
+picks up directly, so later loads skip text parsing entirely.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.downloader.fetch_local_data import ReadLocalData, TICKER_DIRECTORY_PREFIX, _parse_csv_range
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+PARQUET_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('s')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.uint64()),
+])
+
+
+def _convert_csv_file(file_path, ticker, output_directory, chunk_bytes, engine):
+    """
+    Streams one CSV file range by range and appends each month's rows to its own Parquet file.
+    Runs inside a worker process.
+
+    Returns:
+        int: The number of rows written.
+    """
+    ticker_directory = os.path.join(output_directory, f'{TICKER_DIRECTORY_PREFIX}{ticker}')
+    os.makedirs(ticker_directory, exist_ok=True)
+
+    writers = {}
+    rows = 0
+    try:
+        for start, end in ReadLocalData.plan_csv_ranges(file_path, chunk_bytes):
+            df, _ = _parse_csv_range(file_path, start, end, ticker, engine)
+            months = df['timestamp'].dt.year * 100 + df['timestamp'].dt.month
+            for month, month_df in df.groupby(months.to_numpy()):
+                if month not in writers:
+                    month_path = os.path.join(ticker_directory, f'{month}.parquet')
+                    writers[month] = pq.ParquetWriter(month_path, PARQUET_SCHEMA, compression='zstd')
+                table = pa.Table.from_pandas(month_df[PARQUET_SCHEMA.names], schema=PARQUET_SCHEMA,
+                                             preserve_index=False)
+                writers[month].write_table(table)
+                rows += len(month_df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return rows
+
+
+def convert_csv_to_parquet(input_directory, output_directory, workers=None,
+                           chunk_bytes=64 * 1024 * 1024, engine='pyarrow'):
+    """
+    Converts every CSV in `input_directory` into per-ticker, per-month Parquet files,
+    one CSV file per worker process.
+
+    Args:
+        input_directory (str): Directory holding the CSV archive.
+        output_directory (str): Root of the partitioned Parquet archive.
+        workers (int): Worker processes. Defaults to the number of CPUs.
+        chunk_bytes (int): Size of the byte ranges each CSV is streamed in.
+        engine (str): CSV engine, 'pyarrow' or 'pandas'.
+
+    Returns:
+        int: The total number of rows written.
+    """
+    input_path = ReadLocalData._resolve_directory(input_directory)
+    csv_files = [(path, ticker) for path, ticker in ReadLocalData.discover_files(input_path)
+                 if path.lower().endswith('.csv')]
+    logger.info(f'Converting {len(csv_files)} CSV files from {input_path} to Parquet in {output_directory}')
+
+    total_rows = 0
+    initializer, initargs = AppLogger.worker_initializer()
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        futures = {
+            executor.submit(_convert_csv_file, path, ticker, output_directory, chunk_bytes, engine): path
+            for path, ticker in csv_files
+        }
+        for future in as_completed(futures):
+            try:
+                rows = future.result()
+                total_rows += rows
+                logger.info(f'Converted {futures[future]} ({rows} rows).')
+            except Exception as e:
+                logger.error(f'Failed to convert {futures[future]}: {e}')
+
+    console.info(f'Converted {len(csv_files)} files, {total_rows} rows written to {output_directory}')
+    return total_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_directory')
+    parser.add_argument('output_directory')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--engine', choices=('pyarrow', 'pandas'), default='pyarrow')
+    args = parser.parse_args()
+    convert_csv_to_parquet(args.input_directory, args.output_directory, args.workers, engine=args.engine)
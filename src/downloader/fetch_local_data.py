@@ -1,12 +1,261 @@
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from pyarrow import dataset as pa_ds
+from pyarrow import fs as pa_fs
+from src.preprocess.preprocess import PreprocessData
 from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
 
 logger = AppLogger.get_logger()
 
+# Local files are expected in the same (timestamp, open, high, low, close, volume) order as the API
+CSV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+CSV_ENGINES = ('pyarrow', 'pandas')
+
+# Columnar inputs and the pyarrow.dataset format used to read them
+COLUMNAR_FORMATS = {'.parquet': 'parquet', '.feather': 'ipc', '.arrow': 'ipc', '.ipc': 'ipc'}
+
+# Directories named 'ticker=<symbol>' hold files of that ticker (e.g. the monthly Parquet archive)
+TICKER_DIRECTORY_PREFIX = 'ticker='
+
+
+def _init_parse_worker(log_initializer, log_initargs):
+    # A forked worker starts with a copy of the parent's metrics, which must not be sent back
+    metrics.reset()
+    log_initializer(*log_initargs)
+
+
+def _parse_csv_range(file_path, start, end, ticker, engine, since=None):
+    """
+    Parses and preprocesses the rows between two newline-aligned byte offsets of a CSV file.
+    Runs inside a worker process, so it only takes and returns picklable values: the rows and
+    the metrics recorded for them, which the parent merges. Rows at or before `since` are dropped.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    skip_rows = 1 if start == 0 else 0  # Only the first range carries the header
+    if engine == 'pyarrow':
+        table = pa_csv.read_csv(
+            pa.py_buffer(data),
+            read_options=pa_csv.ReadOptions(column_names=CSV_COLUMNS, skip_rows=skip_rows, use_threads=False),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={'timestamp': pa.string(), **{name: pa.float64() for name in CSV_COLUMNS[1:]}}
+            )
+        )
+        df = table.to_pandas()
+    else:
+        df = pd.read_csv(
+            io.BytesIO(data), header=None, names=CSV_COLUMNS, skiprows=skip_rows,
+            dtype={'timestamp': str, **{name: 'float64' for name in CSV_COLUMNS[1:]}}
+        )
+
+    processed = PreprocessData.preprocess_data(df, ticker)
+    if since is not None:
+        processed = processed[processed['timestamp'] > since]
+    return processed, metrics.drain()
 
 
 class ReadLocalData:
+    @staticmethod
+    def _resolve_directory(directory_name):
+        """
+        Returns the absolute path of a data directory, creating it if needed.
+        Returns None if the directory could not be created.
+        """
+        directory_path = os.path.join(os.getcwd(), directory_name)
+        if not os.path.exists(directory_path):
+            try:
+                os.makedirs(directory_path)
+                logger.info(f"Directory created at: {directory_path}")
+            except Exception as e:
+                logger.error(f"Failed to create directory: {directory_path}, Error: {e}")
+                return None
+        return directory_path
+
+    @staticmethod
+    def discover_files(directory_path):
+        """
+        Lists the supported input files of a directory together with their ticker.
+        Top-level files are keyed by their file name; files inside a 'ticker=<symbol>'
+        subdirectory belong to that symbol.
+
+        Returns:
+            list: Sorted (file_path, ticker) tuples for '.csv' and columnar files.
+        """
+        supported = ('.csv', *COLUMNAR_FORMATS)
+        files = []
+        for entry in sorted(os.listdir(directory_path)):
+            path = os.path.join(directory_path, entry)
+            if os.path.isdir(path) and entry.startswith(TICKER_DIRECTORY_PREFIX):
+                ticker = entry[len(TICKER_DIRECTORY_PREFIX):].lower()
+                files.extend(
+                    (os.path.join(path, name), ticker) for name in sorted(os.listdir(path))
+                    if name.lower().endswith(supported)
+                )
+            elif entry.lower().endswith(supported):
+                files.append((path, os.path.splitext(entry)[0].lower()))
+        return files
+
+    @staticmethod
+    def iter_columnar_file(file_path, ticker, since=None, batch_rows=1_000_000):
+        """
+        Streams a Parquet, Feather or Arrow IPC file in bounded record batches.
+        Arrow/Feather files are memory-mapped, so batches reference the page cache instead of
+        being copied. Only the six OHLCV columns are read, and when `since` is given the
+        timestamp filter is pushed down so Parquet row groups whose statistics lie entirely at
+        or before it are never decoded.
+
+        Args:
+            file_path (str): Path of the columnar file.
+            ticker (str): The ticker the rows belong to.
+            since (datetime): Skip rows at or before this timestamp.
+            batch_rows (int): Upper bound on rows per yielded frame.
+
+        Yields:
+            pandas.DataFrame: Preprocessed rows.
+        """
+        file_format = COLUMNAR_FORMATS[os.path.splitext(file_path)[1].lower()]
+        dataset = pa_ds.dataset(file_path, format=file_format,
+                                filesystem=pa_fs.LocalFileSystem(use_mmap=True))
+
+        names = dataset.schema.names
+        columns = CSV_COLUMNS if all(name in names for name in CSV_COLUMNS) else names[:len(CSV_COLUMNS)]
+        timestamp_type = dataset.schema.field(columns[0]).type
+
+        row_filter = None
+        if since is not None and pa.types.is_timestamp(timestamp_type):
+            row_filter = pa_ds.field(columns[0]) > pa.scalar(since, type=timestamp_type)
+
+        for batch in dataset.to_batches(columns=columns, filter=row_filter, batch_size=batch_rows):
+            if batch.num_rows:
+                yield PreprocessData.preprocess_data(batch.to_pandas(), ticker)
+
+    @staticmethod
+    def plan_csv_ranges(file_path, chunk_bytes):
+        """
+        Splits a CSV file into newline-aligned byte ranges of roughly `chunk_bytes` each,
+        without reading the file contents.
+
+        Args:
+            file_path (str): Path of the CSV file.
+            chunk_bytes (int): Target size of each range.
+
+        Returns:
+            list: (start, end) byte offsets covering the whole file.
+        """
+        size = os.path.getsize(file_path)
+        ranges = []
+        start = 0
+        with open(file_path, 'rb') as f:
+            while start < size:
+                f.seek(min(start + chunk_bytes, size))
+                if f.tell() < size:
+                    f.readline()  # Move to the end of the current line
+                end = f.tell()
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    @staticmethod
+    def stream_local_data(directory_name, workers=None, chunk_bytes=64 * 1024 * 1024,
+                          max_inflight_bytes=1024 * 1024 * 1024, engine='pyarrow', watermarks=None, tickers=None):
+        """
+        Parses and preprocesses every supported file in a directory and yields the results as
+        they complete.
+
+        CSV files are split into bounded byte ranges and parsed across a process pool, so no
+        file is ever loaded whole, and at most `max_inflight_bytes` of input is parsed or waiting
+        to be consumed at any time. Parquet, Feather and Arrow IPC files are streamed in this
+        process from memory-mapped batches while the pool works on CSV ranges. The caller's
+        inserts therefore overlap with parsing.
+
+        Rows are forward-filled within each range only; a range starting with missing values
+        drops them instead of filling from the previous range.
+
+        Args:
+            directory_name (str): The name of the directory (relative to current working directory).
+            workers (int): Parser processes. Defaults to the number of CPUs.
+            chunk_bytes (int): Target size of each parsed byte range.
+            max_inflight_bytes (int): Cap on input bytes submitted but not yet yielded.
+            engine (str): 'pyarrow' for Arrow's multi-format CSV reader or 'pandas' for pd.read_csv.
+            watermarks (dict): Optional {ticker: datetime}; rows at or before a ticker's
+                               watermark are skipped.
+            tickers (iterable): Optionally restrict the load to the files of these tickers.
+
+        Yields:
+            tuple: (ticker, pandas.DataFrame) with preprocessed rows from one range or batch.
+        """
+        if engine not in CSV_ENGINES:
+            raise ValueError(f"Invalid CSV engine: {engine}. Expected one of {CSV_ENGINES}")
+
+        directory_path = ReadLocalData._resolve_directory(directory_name)
+        if directory_path is None:
+            return
+
+        watermarks = watermarks or {}
+        files = ReadLocalData.discover_files(directory_path)
+        if tickers is not None:
+            tickers = set(tickers)
+            files = [(path, ticker) for path, ticker in files if ticker in tickers]
+        columnar_files = [(path, ticker) for path, ticker in files if not path.lower().endswith('.csv')]
+        logger.info(f'Found {len(files) - len(columnar_files)} CSV and {len(columnar_files)} columnar files in {directory_path}')
+
+        tasks = []
+        for file_path, ticker in files:
+            if file_path.lower().endswith('.csv'):
+                for start, end in ReadLocalData.plan_csv_ranges(file_path, chunk_bytes):
+                    tasks.append((file_path, start, end, ticker))
+        tasks.reverse()  # Pop from the end in file order
+        columnar_files.reverse()
+        logger.info(f'Planned {len(tasks)} CSV parse tasks of up to {chunk_bytes} bytes each.')
+
+        inflight = {}
+        inflight_bytes = 0
+        executor = None
+        if tasks:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                                           initargs=AppLogger.worker_initializer())
+        try:
+            while tasks or inflight or columnar_files:
+                # Keep submitting while under the memory cap (always allow at least one task)
+                while tasks and (not inflight or inflight_bytes + tasks[-1][2] - tasks[-1][1] <= max_inflight_bytes):
+                    file_path, start, end, ticker = tasks.pop()
+                    future = executor.submit(_parse_csv_range, file_path, start, end, ticker, engine,
+                                             watermarks.get(ticker))
+                    inflight[future] = (file_path, end - start, ticker)
+                    inflight_bytes += end - start
+
+                # Columnar files are read here while the pool parses CSV ranges
+                if columnar_files:
+                    file_path, ticker = columnar_files.pop()
+                    try:
+                        for df in ReadLocalData.iter_columnar_file(file_path, ticker, watermarks.get(ticker)):
+                            yield ticker, df
+                    except Exception as e:
+                        logger.error(f"Error reading {file_path}: {e}")
+                    continue
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, size, ticker = inflight.pop(future)
+                    inflight_bytes -= size
+                    try:
+                        df, worker_metrics = future.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing {file_path}: {e}")
+                        continue
+                    metrics.merge(worker_metrics)
+                    yield ticker, df
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
     @staticmethod
     def read_local_data_in_chunks(directory_name, chunk_size=5):
         """
@@ -20,16 +269,9 @@ class ReadLocalData:
         Yields:
             tuple: (dict: {filename_without_ext: pandas.DataFrame}) for each chunk.
         """
-        base_path = os.getcwd()
-        directory_path = os.path.join(base_path, directory_name)
-
-        if not os.path.exists(directory_path):
-            try:
-                os.makedirs(directory_path)
-                logger.info(f"Directory created at: {directory_path}")
-            except Exception as e:
-                logger.error(f"Failed to create directory: {directory_path}, Error: {e}")
-                return # Exit generator
+        directory_path = ReadLocalData._resolve_directory(directory_name)
+        if directory_path is None:
+            return # Exit generator
 
         csv_files = [f for f in os.listdir(directory_path) if f.endswith(".csv")]
         logger.info(f'Found {len(csv_files)} CSV files in {directory_path}')
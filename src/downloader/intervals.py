@@ -0,0 +1,26 @@
+# Candle intervals of SmartAPI's getCandleData. Kept apart from the API client so that modes which
+# never contact the broker (local, replay, status) do not import SmartApi, pyotp and requests.
+
+# Maximum number of calendar days getCandleData returns per request, by interval
+INTERVAL_MAX_DAYS = {
+    "ONE_MINUTE": 30,
+    "THREE_MINUTE": 60,
+    "FIVE_MINUTE": 100,
+    "TEN_MINUTE": 100,
+    "FIFTEEN_MINUTE": 200,
+    "THIRTY_MINUTE": 200,
+    "ONE_HOUR": 400,
+    "ONE_DAY": 2000,
+}
+
+# Length of one candle in seconds
+INTERVAL_SECONDS = {
+    "ONE_MINUTE": 60,
+    "THREE_MINUTE": 180,
+    "FIVE_MINUTE": 300,
+    "TEN_MINUTE": 600,
+    "FIFTEEN_MINUTE": 900,
+    "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600,
+    "ONE_DAY": 86400,
+}
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import zstandard
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+SPOOL_SUFFIX = '.json.zst'
+
+
+class ResponseSpool:
+    """
+    A compressed on-disk spool of raw getCandleData responses plus a checkpoint of the
+    windows already fetched. A restarted run serves those windows from disk instead of the
+    API, and `iter_responses` replays the whole spool without touching the API at all.
+
+    Layout:
+        <directory>/checkpoint.jsonl                       one line per completed window
+        <directory>/<token>/<interval>_<from>_<to>.json.zst  zstd-compressed response
+                                                           (<exchange>-<token>/ outside NSE)
+    """
+
+    def __init__(self, directory, compression_level=3):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._lock = threading.Lock()
+        self._checkpoint_path = os.path.join(self.directory, CHECKPOINT_FILE)
+        self._completed = self._load_checkpoint()
+        logger.info(f"Response spool at {self.directory} has {len(self._completed)} completed windows.")
+
+    @staticmethod
+    def window_key(token, interval, from_date, to_date, exchange="NSE"):
+        """
+        Returns the key identifying one request window. Tokens are only unique within an
+        exchange, so non-NSE windows live under an exchange-prefixed directory. The ingestor
+        requests windows on a fixed calendar grid, so a later run asks for the same keys.
+        """
+        directory = token if exchange == "NSE" else f"{exchange}-{token}"
+        return f"{directory}/{interval}_{from_date:%Y%m%d%H%M}_{to_date:%Y%m%d%H%M}"
+
+    def _load_checkpoint(self):
+        completed = set()
+        if not os.path.exists(self._checkpoint_path):
+            return completed
+        with open(self._checkpoint_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for line in content.splitlines():
+            try:
+                completed.add(json.loads(line)['key'])
+            except (ValueError, KeyError):
+                # A crash can leave a torn last line behind; that window is simply fetched again
+                continue
+
+        if content and not content.endswith('\n'):
+            # Terminate the torn line so the next append starts on a fresh one
+            with open(self._checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+        return completed
+
+    def is_complete(self, token, interval, from_date, to_date, exchange="NSE"):
+        return self.window_key(token, interval, from_date, to_date, exchange) in self._completed
+
+    def get(self, token, interval, from_date, to_date, exchange="NSE"):
+        """
+        Returns the spooled response of a completed window, or None if it has not been fetched.
+        """
+        key = self.window_key(token, interval, from_date, to_date, exchange)
+        if key not in self._completed:
+            return None
+        try:
+            with open(os.path.join(self.directory, key + SPOOL_SUFFIX), 'rb') as f:
+                return self._read_payload(f.read())['response']
+        except (OSError, ValueError, zstandard.ZstdError) as e:
+            logger.warning(f"Spooled window {key} unreadable, fetching again: {e}")
+            return None
+
+    def put(self, ticker, token, interval, from_date, to_date, response, exchange="NSE"):
+        """
+        Writes a response to the spool and records its window as completed.
+        The file is written under a temporary name and renamed, so a crash never leaves a
+        partial response behind, and the checkpoint line is only appended afterwards.
+        """
+        key = self.window_key(token, interval, from_date, to_date, exchange)
+        path = os.path.join(self.directory, key + SPOOL_SUFFIX)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        payload = {'ticker': ticker, 'token': token, 'exchange': exchange, 'interval': interval,
+                   'response': response}
+        data = self._compressor.compress(json.dumps(payload).encode('utf-8'))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        line = json.dumps({'key': key, 'ticker': ticker, 'rows': len(response.get('data') or [])})
+        with self._lock:
+            with open(self._checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._completed.add(key)
+
+    def iter_responses(self, tickers=None, interval=None):
+        """
+        Replays every completed window from the spool.
+
+        Args:
+            tickers (set): Optionally restrict the replay to these tickers.
+            interval (str): Optionally restrict the replay to windows of this candle interval.
+
+        Yields:
+            tuple: (ticker, list of raw candles) for each non-empty window.
+        """
+        for key in sorted(self._completed):
+            if interval is not None and not key.split('/', 1)[1].startswith(f"{interval}_"):
+                continue
+            try:
+                with open(os.path.join(self.directory, key + SPOOL_SUFFIX), 'rb') as f:
+                    payload = self._read_payload(f.read())
+            except (OSError, ValueError, zstandard.ZstdError) as e:
+                logger.error(f"Skipping unreadable spooled window {key}: {e}")
+                continue
+
+            if tickers is not None and payload['ticker'] not in tickers:
+                continue
+            data = payload['response'].get('data')
+            if data:
+                yield payload['ticker'], data
+
+    @staticmethod
+    def _read_payload(data):
+        return json.loads(zstandard.ZstdDecompressor().decompress(data))
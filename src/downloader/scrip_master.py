@@ -0,0 +1,226 @@
+import codecs
+import json
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# NFO instrument types ingested by default: index and stock futures
+NFO_INSTRUMENT_TYPES = ("FUTIDX", "FUTSTK")
+
+SCRIP_FILE = 'scrip_master.parquet'
+META_FILE = 'scrip_master.meta.json'
+# Size of the HTTP chunks the scrip master JSON is parsed from
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def is_tradable(instrument, nfo_instrument_types=NFO_INSTRUMENT_TYPES):
+    """
+    Returns whether a scrip master entry is an instrument the pipeline ingests: NSE equities
+    ('-EQ' series), BSE equities, or NFO contracts of the given instrument types.
+    Test symbols and ETFs are excluded.
+
+    Args:
+        instrument (dict): One raw scrip master entry.
+        nfo_instrument_types (tuple): Instrument types kept for NFO.
+    """
+    exchange = instrument.get("exch_seg")
+    instrument_type = instrument.get("instrumenttype") or ""
+    if exchange == "NFO":
+        return instrument_type in nfo_instrument_types
+
+    symbol = instrument.get("symbol") or ""
+    if str(instrument.get("lotsize")) != "1" or "NSETEST" in symbol or "BSETEST" in symbol:
+        return False
+    if instrument_type and (instrument.get("name") or "").endswith("ETF"):
+        return False
+    if exchange == "NSE":
+        return symbol.endswith("-EQ")
+    # BSE equities carry no series suffix and no instrument type
+    return exchange == "BSE" and not instrument_type
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally decodes a top-level JSON array of objects from byte chunks, yielding one
+    element at a time, so the full document is never held as Python objects at once.
+
+    Args:
+        chunks (iterable): Bytes chunks of the document, e.g. `response.iter_content()`.
+
+    Yields:
+        dict: Each element of the array.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos = '', 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            # Skip whitespace, the opening bracket and separators between elements
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[':
+                started = started or buffer[pos] == '['
+                pos += 1
+            if pos >= len(buffer) or buffer[pos] == ']':
+                break
+            if not started:
+                raise ValueError("Scrip master is not a JSON array")
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                break
+            pos = end
+            yield element
+
+    buffer = buffer[pos:].strip()
+    if buffer not in ('', ']'):
+        raise ValueError("Scrip master JSON ended inside an element")
+
+
+class ScripMasterCache:
+    """
+    Keeps the filtered scrip master universe on disk as Parquet and refreshes it only when
+    needed: within `ttl_seconds` of the last download the cached copy is used without any
+    request, afterwards the server is asked with a conditional GET (ETag / Last-Modified)
+    and a 304 keeps the cached copy. A full download is parsed element by element and only
+    tradable instruments of the requested exchanges are kept.
+
+    After each `load`, `added` and `removed` hold the instruments that appeared in or
+    disappeared from the universe since the previous snapshot.
+
+    Layout:
+        <directory>/scrip_master.parquet     filtered instruments
+        <directory>/scrip_master.meta.json   validators, fetch time and filter settings
+    """
+
+    def __init__(self, scrip_url, directory=None, ttl_seconds=12 * 3600):
+        """
+        Args:
+            scrip_url (str): URL of the scrip master JSON.
+            directory (str): Cache directory. Without one, every load downloads the master.
+            ttl_seconds (float): How long a download is used without revalidating it.
+        """
+        self.scrip_url = scrip_url
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.added = pd.DataFrame()
+        self.removed = pd.DataFrame()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def load(self, exchanges=("NSE",), nfo_instrument_types=NFO_INSTRUMENT_TYPES):
+        """
+        Returns the tradable instruments of `exchanges`, from the cache when it is still valid.
+
+        Returns:
+            pd.DataFrame: Scrip master rows sorted by exchange and symbol.
+        """
+        settings = {'exchanges': sorted(exchanges), 'nfo_instrument_types': sorted(nfo_instrument_types)}
+        meta, cached = self._read_cache()
+        if meta is not None and meta.get('settings') != settings:
+            # A different universe: neither the validators nor the token diff apply
+            logger.info("Scrip master filter settings changed, ignoring the cached snapshot.")
+            meta, cached = None, None
+
+        if cached is not None and time.time() - meta.get('fetched_at', 0) < self.ttl_seconds:
+            logger.info(f"Using cached scrip master ({len(cached)} instruments).")
+            self._set_diff(cached, cached)
+            return cached
+
+        headers = {}
+        if cached is not None and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if cached is not None and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        logger.info(f"Attempting to fetch scrip master data from: {self.scrip_url}")
+        with requests.get(self.scrip_url, headers=headers, stream=True, timeout=120) as response:
+            if response.status_code == 304 and cached is not None:
+                logger.info(f"Scrip master not modified, keeping {len(cached)} cached instruments.")
+                self._write_meta(dict(meta, fetched_at=time.time()))
+                self._set_diff(cached, cached)
+                return cached
+            response.raise_for_status()
+
+            wanted = set(exchanges)
+            total, rows = 0, []
+            for instrument in iter_json_array(response.iter_content(DOWNLOAD_CHUNK_BYTES)):
+                total += 1
+                if instrument.get("exch_seg") in wanted and is_tradable(instrument, nfo_instrument_types):
+                    rows.append(instrument)
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+
+        scrip = pd.DataFrame(rows)
+        if not scrip.empty:
+            scrip = scrip.astype(str).sort_values(by=['exch_seg', 'symbol']).reset_index(drop=True)
+        logger.info(f"Kept {len(scrip)} tradable instruments out of {total} scrip master entries.")
+
+        self._set_diff(cached, scrip)
+        self._write_cache(scrip, dict(validators, fetched_at=time.time(), settings=settings))
+        return scrip
+
+    def _set_diff(self, previous, current):
+        """
+        Records which instruments were added to / removed from the universe, keyed by
+        (exchange, token) since tokens are only unique within an exchange.
+        """
+        if previous is None:
+            self.added, self.removed = current.iloc[0:0], current.iloc[0:0]
+            logger.info("No previous scrip master snapshot to compare against.")
+            return
+
+        previous_keys, current_keys = self._keys(previous), self._keys(current)
+        self.added = current[~current_keys.isin(previous_keys).to_numpy()] if not current.empty else current
+        self.removed = previous[~previous_keys.isin(current_keys).to_numpy()] if not previous.empty else previous
+        if len(self.added) or len(self.removed):
+            console.info(f"Scrip master: {len(self.added)} new listings, {len(self.removed)} removed since the last run.")
+
+    @staticmethod
+    def _keys(frame):
+        if frame.empty:
+            return pd.Series([], dtype=object)
+        return frame['exch_seg'] + ':' + frame['token']
+
+    def _read_cache(self):
+        """
+        Returns (meta, cached DataFrame), or (None, None) when there is no usable cache.
+        """
+        if not self.directory:
+            return None, None
+        try:
+            with open(os.path.join(self.directory, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            cached = pq.read_table(os.path.join(self.directory, SCRIP_FILE)).to_pandas()
+        except (OSError, ValueError, pa.ArrowException) as e:
+            if os.path.exists(os.path.join(self.directory, META_FILE)):
+                logger.warning(f"Scrip master cache unreadable, downloading again: {e}")
+            return None, None
+        return meta, cached
+
+    def _write_cache(self, scrip, meta):
+        if not self.directory:
+            return
+        # The snapshot is replaced before its metadata, so validators never describe a stale file
+        path = os.path.join(self.directory, SCRIP_FILE)
+        pq.write_table(pa.Table.from_pandas(scrip, preserve_index=False), path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+        self._write_meta(meta)
+
+    def _write_meta(self, meta):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,136 @@
+import os
+from datetime import datetime, timedelta
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+
+class TradingCalendar:
+    """
+    A minimal NSE trading-calendar model: Monday to Friday are sessions, except listed
+    holidays, plus listed extra sessions (e.g. weekend Muhurat or budget-day trading).
+    """
+
+    def __init__(self, holidays=(), extra_sessions=()):
+        self.holidays = set(holidays)
+        self.extra_sessions = set(extra_sessions)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a calendar from a text file with one 'YYYY-MM-DD' date per line.
+        Lines starting with '+' are extra sessions; blank lines and '#' comments are ignored.
+        A missing file yields a weekday-only calendar.
+        """
+        holidays, extra_sessions = set(), set()
+        if not path or not os.path.exists(path):
+            logger.warning(f"Trading holiday file '{path}' not found, assuming every weekday is a session.")
+            return cls()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                target = extra_sessions if line.startswith('+') else holidays
+                target.add(datetime.strptime(line.lstrip('+'), '%Y-%m-%d').date())
+        return cls(holidays, extra_sessions)
+
+    def is_session(self, day):
+        if day in self.extra_sessions:
+            return True
+        return day.weekday() < 5 and day not in self.holidays
+
+    def next_session(self, day):
+        """
+        Returns the first session after `day`.
+        """
+        day += timedelta(days=1)
+        while not self.is_session(day):
+            day += timedelta(days=1)
+        return day
+
+
+class BackfillPlanner:
+    """
+    Plans the minimal set of fetch windows that repairs every hole in the stored history,
+    instead of walking back from the latest timestamp only.
+    """
+
+    def __init__(self, clickhouse_client, calendar, window_days, start_date):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): Used for the coverage query.
+            calendar (TradingCalendar): Expected trading sessions.
+            window_days (int): A window spans at most window_days + 1 calendar days (the API limit).
+            start_date (datetime): Earliest day the pipeline keeps history for.
+        """
+        self.clickhouse_client = clickhouse_client
+        self.calendar = calendar
+        self.window_days = window_days
+        self.start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+
+    def plan(self, end_date=None):
+        """
+        Computes the fetch windows of every ticker that already has stored data.
+
+        Missing days before a ticker's first stored day may predate its listing, or be history an
+        interrupted run never fetched. They are planned as one window with from_date None, which
+        the ingestor starts at the ticker's first daily candle.
+
+        Returns:
+            dict: {ticker: list of (from_date, to_date, days)}. Fully covered tickers map to an empty
+                  list; tickers without data are absent and keep the regular walk from their listing date.
+        """
+        end_date = end_date or datetime.today().date()
+        missing = self.clickhouse_client.get_missing_trading_days(
+            self.start_date, end_date, self.calendar.holidays, self.calendar.extra_sessions
+        )
+        plan = {ticker: self.plan_days(days) for ticker, days in missing.items()}
+
+        windows = sum(len(w) for w in plan.values())
+        gappy = sum(1 for w in plan.values() if w)
+        logger.info(f"Backfill plan: {windows} windows for {gappy} of {len(plan)} tickers with stored data.")
+        return plan
+
+    def plan_days(self, days):
+        """
+        Splits a ticker's missing days into the run before its first stored day and the holes
+        after it, and returns the windows of both.
+
+        Returns:
+            list: (from_date, to_date, days) windows, the first one with from_date and days None if
+                  the ticker's stored history starts after `start_date`.
+        """
+        days = sorted(days)
+        windows = []
+        if days and days[0] == self._first_session():
+            leading = 1
+            while leading < len(days) and days[leading] == self.calendar.next_session(days[leading - 1]):
+                leading += 1
+            windows.append((None, days[leading - 1], None))
+            days = days[leading:]
+        return windows + self.merge_days(days)
+
+    def merge_days(self, days):
+        """
+        Greedily merges sorted missing days into windows that fit within the maximum range, so
+        nearby gaps share one request. Each window carries its missing days: stored days inside
+        it are fetched again but dropped before storing, so rows already in the table are never
+        re-inserted.
+
+        Returns:
+            list: (from_date, to_date, days) windows, days being the set of missing days.
+        """
+        windows = []
+        for day in sorted(days):
+            if windows and (day - windows[-1][0]).days <= self.window_days:
+                from_date, _, window_days = windows[-1]
+                window_days.add(day)
+                windows[-1] = (from_date, day, window_days)
+            else:
+                windows.append((day, day, {day}))
+        return windows
+
+    def _first_session(self):
+        return self.calendar.next_session(self.start_date - timedelta(days=1))
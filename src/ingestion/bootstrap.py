@@ -0,0 +1,58 @@
+import json
+import os
+import threading
+import time
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+# 'always' runs the table DDL on every start, 'auto' skips DDL recorded in the cache, 'never' skips it
+BOOTSTRAP_MODES = ('always', 'auto', 'never')
+CACHE_FILE = 'bootstrap.json'
+
+
+class BootstrapCache:
+    """
+    Remembers which tables were created (or found to exist) with which DDL, so that short runs
+    can skip the table-existence checks and CREATE statements at startup. An entry is keyed by
+    server, database, table and a hash of the DDL templates, so a changed template or rollup
+    set is applied again; entries expire after `ttl_seconds` in case a table was dropped.
+    """
+
+    def __init__(self, directory, ttl_seconds=24 * 3600):
+        """
+        Args:
+            directory (str): Where the cache file is kept.
+            ttl_seconds (float): How long a recorded bootstrap is trusted.
+        """
+        self.path = os.path.join(directory, CACHE_FILE)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def contains(self, key):
+        created_at = self._load().get(key)
+        return created_at is not None and time.time() - created_at < self.ttl_seconds
+
+    def add(self, key):
+        with self._lock:
+            entries = self._load()
+            entries[key] = time.time()
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(self.path + '.tmp', self.path)
+            except OSError as e:
+                logger.warning(f"Could not write the bootstrap cache {self.path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,237 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pyarrow as pa
+from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# 'direct' inserts each partition into the table; 'attach' and 'replace' load it into a staging
+# table, merge it to a single part there and then attach it to the table, or replace the table's
+# partition with it (the archive is authoritative for every month it covers: rows of tickers
+# missing from the archive are removed from those months)
+BULK_MODES = ('direct', 'attach', 'replace')
+STAGING_SUFFIX = '__bulk'
+
+# Rows are spilled per partition in this layout, with plain strings for the ticker so that
+# batches from different files can share one stream
+SPILL_SCHEMA = pa.schema([
+    ('ticker', pa.string()),
+    ('timestamp', pa.timestamp('s')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.uint64()),
+])
+
+# One partition arrives as a single sorted insert; these keep the server from cutting it into
+# parts of max_insert_block_size rows
+BULK_INSERT_SETTINGS = {'max_insert_block_size': 100_000_000, 'min_insert_block_size_rows': 100_000_000,
+                        'min_insert_block_size_bytes': 4 * 1024 * 1024 * 1024}
+
+
+class PartitionBulkLoader:
+    """
+    Loads a large archive partition by partition instead of ticker by ticker. Incoming rows of
+    any ticker are regrouped by monthly partition (toYYYYMM(timestamp)) into compressed Arrow
+    spill files; each partition is then sorted by (ticker, timestamp) and written with one large
+    insert, several partitions in parallel. A backfill therefore creates about one part per
+    partition rather than one per ticker and month, and leaves little for the merges to do.
+    """
+
+    def __init__(self, clickhouse_client, table_name, mode='direct', workers=2, spill_dir=None,
+                 spill_batch_rows=100_000, on_flush=None):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): The connection used for inserts and DDL.
+            table_name (str): The target table (one-minute candles).
+            mode (str): A key of BULK_MODES.
+            workers (int): Partitions sorted and inserted concurrently. Each holds a whole partition
+                           in memory while it is loaded.
+            spill_dir (str): Where the spill files are written (default: the system temp directory).
+            spill_batch_rows (int): Rows buffered per partition before they are written to its spill file.
+            on_flush (callable): Called with {ticker: latest_timestamp} after each loaded partition.
+        """
+        if mode not in BULK_MODES:
+            raise ValueError(f"Invalid bulk load mode: {mode}. Expected one of {BULK_MODES}")
+        self.clickhouse_client = clickhouse_client
+        self.client = clickhouse_client.client
+        self.table_name = table_name
+        self.staging_table = f"{table_name}{STAGING_SUFFIX}"
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.spill_batch_rows = spill_batch_rows
+        self.on_flush = on_flush
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._spill_dir = tempfile.mkdtemp(prefix='bulk-load-', dir=spill_dir or None)
+        self._writers = {}
+        self._pending = {}
+        self._pending_rows = {}
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def add(self, dataframe):
+        """
+        Routes preprocessed rows (FINAL_COLUMNS, any number of tickers) to the spill file of
+        their partition.
+        """
+        if dataframe.empty:
+            return
+        timestamps = dataframe['timestamp']
+        months = (timestamps.dt.year * 100 + timestamps.dt.month).to_numpy()
+        with self._lock:
+            for month, chunk in dataframe.groupby(months, sort=False):
+                partition_id = str(month)
+                batch = pa.Table.from_pandas(chunk, schema=SPILL_SCHEMA, preserve_index=False, safe=False)
+                self._pending.setdefault(partition_id, []).append(batch)
+                self._pending_rows[partition_id] = self._pending_rows.get(partition_id, 0) + len(chunk)
+                self._rows[partition_id] = self._rows.get(partition_id, 0) + len(chunk)
+                if self._pending_rows[partition_id] >= self.spill_batch_rows:
+                    self._spill(partition_id)
+
+    def load(self):
+        """
+        Writes every spilled partition to the table, oldest first and `workers` at a time. After a
+        failure no further partition is started.
+
+        Returns:
+            int: The number of rows loaded.
+
+        Raises:
+            RuntimeError: If a partition could not be loaded. Loaded partitions stay in the table;
+                          re-running the load is safe in 'direct' (deduplicated inserts) and
+                          'replace' mode.
+        """
+        with self._lock:
+            for partition_id in list(self._pending):
+                self._spill(partition_id)
+            for writer in self._writers.values():
+                writer.close()
+            partitions = sorted(self._writers)
+            self._writers = {}
+
+        if not partitions:
+            return 0
+        if self.mode != 'direct':
+            self._command('drop_table', table_name=self.staging_table)
+            # Same columns, codecs, engine and partitioning as the table, as ATTACH/REPLACE PARTITION requires
+            self.client.command(self.clickhouse_client.read_sql('create_staging_table').format(
+                staging_table=self.staging_table, table_name=self.table_name))
+
+        console.info(f"Bulk loading {sum(self._rows.values())} rows in {len(partitions)} partitions into "
+                     f"{self.table_name} ({self.mode}, {self.workers} workers).")
+        loaded, failed, skipped = 0, [], []
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-load')
+        try:
+            futures = {executor.submit(self._load_partition, partition_id): partition_id for partition_id in partitions}
+            for i, future in enumerate(as_completed(futures), 1):
+                partition_id = futures[future]
+                if future.cancelled():
+                    skipped.append(partition_id)
+                    continue
+                try:
+                    rows, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Bulk load of partition {partition_id} into {self.table_name} failed: {e}")
+                    failed.append(partition_id)
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                loaded += rows
+                console.info(f"[{i}/{len(partitions)}] partition {partition_id}: {rows} rows loaded in {seconds:.1f}s")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self.mode != 'direct':
+                self._command('drop_table', table_name=self.staging_table)
+
+        if failed:
+            raise RuntimeError(f"Bulk load into {self.table_name} failed for partitions {sorted(failed)} and did not "
+                               f"start {sorted(skipped)}; {loaded} rows were loaded")
+        return loaded
+
+    def close(self):
+        """
+        Removes the spill files.
+        """
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers, self._pending, self._pending_rows = {}, {}, {}
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _spill_path(self, partition_id):
+        return os.path.join(self._spill_dir, f"{partition_id}.arrows")
+
+    def _spill(self, partition_id):
+        # Called with the lock held
+        batches = self._pending.pop(partition_id, None)
+        self._pending_rows.pop(partition_id, None)
+        if not batches:
+            return
+        writer = self._writers.get(partition_id)
+        if writer is None:
+            writer = pa.ipc.new_stream(self._spill_path(partition_id), SPILL_SCHEMA,
+                                       options=pa.ipc.IpcWriteOptions(compression='zstd'))
+            self._writers[partition_id] = writer
+        writer.write_table(pa.concat_tables(batches).combine_chunks())
+
+    def _load_partition(self, partition_id):
+        start = time.perf_counter()
+        with pa.ipc.open_stream(self._spill_path(partition_id)) as reader:
+            table = reader.read_all()
+        table = table.sort_by([('ticker', 'ascending'), ('timestamp', 'ascending')])
+        dataframe = table.to_pandas()
+        del table
+        dataframe['ticker'] = dataframe['ticker'].astype('category')
+
+        label = f"bulk:{partition_id}"
+        if self.mode == 'direct':
+            if not self.clickhouse_client.push_data_to_database(self.table_name, dataframe, label,
+                                                                settings=BULK_INSERT_SETTINGS):
+                raise RuntimeError(f"Insert of {len(dataframe)} rows failed")
+        else:
+            # The staging partition is scratch space, so a repeated load must not be deduplicated away
+            self._command('drop_partition', table_name=self.staging_table, partition_id=partition_id)
+            if not self.clickhouse_client.push_data_to_database(self.staging_table, dataframe, label,
+                                                                settings={**BULK_INSERT_SETTINGS, 'insert_deduplicate': 0}):
+                raise RuntimeError(f"Insert of {len(dataframe)} rows into {self.staging_table} failed")
+            self._command('optimize_partition', table_name=self.staging_table, partition_id=partition_id)
+            self.client.command(
+                self.clickhouse_client.read_sql(f"{self.mode}_partition").format(
+                    table_name=self.table_name, staging_table=self.staging_table),
+                parameters={'partition_id': partition_id}
+            )
+            self._command('drop_partition', table_name=self.staging_table, partition_id=partition_id)
+            # Parts moved between tables bypass the materialized views, so the rollups are rebuilt
+            for rollup in self.clickhouse_client.rollups:
+                self.clickhouse_client.backfill_rollup_partition(self.table_name, rollup, partition_id)
+            logger.debug(f"Partition {partition_id}: {self.mode} from {self.staging_table}, "
+                         f"{len(self.clickhouse_client.rollups)} rollups rebuilt.")
+
+        os.remove(self._spill_path(partition_id))
+        seconds = time.perf_counter() - start
+        metrics.observe('bulk_load_partition_seconds', seconds, mode=self.mode)
+        # A partition holds many tickers; each is charged its share of the load by row count
+        for ticker, rows in dataframe['ticker'].value_counts(sort=False).items():
+            if rows:
+                metrics.record_ticker(ticker, 'insert', seconds * rows / len(dataframe))
+        if self.on_flush is not None:
+            self.on_flush(dataframe.groupby('ticker', observed=True)['timestamp'].max().to_dict())
+        return len(dataframe), seconds
+
+    def _command(self, sql_name, **parameters):
+        self.client.command(self.clickhouse_client.read_sql(sql_name), parameters=parameters)
@@ -1,21 +1,200 @@
 from clickhouse_connect import get_client
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import hashlib
+import random
+import time
+import pandas as pd
+import pyarrow as pa
+from src.ingestion.bootstrap import BOOTSTRAP_MODES
 from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
 
 logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# Arrow types matching create_table.sql; dictionary-encoded strings map onto LowCardinality(String)
+OHLCV_ARROW_SCHEMA = pa.schema([
+    ('ticker', pa.dictionary(pa.int32(), pa.string())),
+    ('timestamp', pa.timestamp('s', tz='UTC')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.uint64()),
+])
+
+INSERT_FORMATS = ('pandas', 'arrow')
+
+# Table engine variants and the CREATE TABLE template of each. 'replacing' collapses rows with
+# the same (ticker, timestamp) during merges, so re-ingesting an overlapping range never duplicates.
+TABLE_ENGINES = {'mergetree': 'create_table', 'replacing': 'create_table_replacing'}
+
+# MergeTree only honours insert_deduplication_token when this setting is non-zero; templates that
+# declare it also get it added to tables created before they did. The window (1000 inserts) covers
+# retries and recent re-sends only; idempotent re-runs of a backfill rely on the 'replacing' engine.
+DEDUPLICATION_SETTING = 'non_replicated_deduplication_window'
+
+# Low-latency path for small, frequent inserts: the server batches them into few parts and
+# acknowledges once the rows are written, so per-insert latency stays low without part explosion
+ASYNC_INSERT_SETTINGS = {'async_insert': 1, 'wait_for_async_insert': 1, 'async_insert_busy_timeout_ms': 200,
+                         'async_insert_deduplicate': 1}
+
+
+# Materialized-view rollups of the one-minute table: name -> time bucket of each rollup row
+ROLLUP_BUCKETS = {
+    '5m': 'toStartOfFiveMinutes(timestamp)',
+    '15m': 'toStartOfFifteenMinutes(timestamp)',
+    '1h': 'toStartOfHour(timestamp)',
+    '1d': 'toStartOfDay(timestamp)',
+}
+
+
+def rollup_table_name(table_name, rollup):
+    """
+    Returns the AggregatingMergeTree table holding a rollup (e.g. 'stock_ohlcv_5m'); the
+    materialized view feeding it is named '<rollup table>_mv'.
+    """
+    return f"{table_name}_{rollup}"
+
+
+def interval_table_name(table_name, interval):
+    """
+    Returns the table holding candles of `interval`: one-minute candles keep the configured
+    table name, every other interval gets its own table suffixed with the interval
+    (e.g. 'ohlcv' -> 'ohlcv_one_day'), all created from create_table.sql.
+    """
+    return table_name if interval == "ONE_MINUTE" else f"{table_name}_{interval.lower()}"
+
 
 class ClickhouseConnect:
 
-    def __init__(self, host, username, password, database, table_name):
-        
-        self.client = get_client(host=host, username=username, password=password, database=database)
+    def __init__(self, host, username, password, database, table_name, compression=None, insert_format='pandas',
+                 table_engine='mergetree', insert_retries=3, retry_backoff_seconds=0.5, rollups=(),
+                 bootstrap='always', bootstrap_cache=None):
+        """
+        Args:
+            compression (str): Wire compression for requests and inserts ('lz4', 'zstd', 'gzip').
+                               None or 'none' disables it.
+            insert_format (str): 'pandas' to insert with insert_df, 'arrow' to send typed Arrow batches.
+            table_engine (str): A key of TABLE_ENGINES, used when the table has to be created.
+            insert_retries (int): How many times a failed insert is retried. Retries are safe because
+                                  every insert carries a deterministic deduplication token.
+            retry_backoff_seconds (float): Initial retry delay, doubled per attempt (capped at 30s).
+            rollups (iterable): Keys of ROLLUP_BUCKETS to maintain for the table via materialized views.
+            bootstrap (str): A key of BOOTSTRAP_MODES: whether the table DDL runs on every start,
+                             only when `bootstrap_cache` has no record of it, or never.
+            bootstrap_cache (BootstrapCache): Records the tables already bootstrapped.
+        """
+        if insert_format not in INSERT_FORMATS:
+            raise ValueError(f"Invalid insert format: {insert_format}. Expected one of {INSERT_FORMATS}")
+        if table_engine not in TABLE_ENGINES:
+            raise ValueError(f"Invalid table engine: {table_engine}. Expected one of {list(TABLE_ENGINES)}")
+        for rollup in rollups:
+            if rollup not in ROLLUP_BUCKETS:
+                raise ValueError(f"Invalid rollup: {rollup}. Expected one of {list(ROLLUP_BUCKETS)}")
+        if bootstrap not in BOOTSTRAP_MODES:
+            raise ValueError(f"Invalid bootstrap mode: {bootstrap}. Expected one of {BOOTSTRAP_MODES}")
+        self.host = host
+        self.database = database
+        self.bootstrap_mode = bootstrap
+        self.bootstrap_cache = bootstrap_cache
+        self.insert_format = insert_format
+        self.table_engine = table_engine
+        self.rollups = tuple(rollups)
+        self.insert_retries = insert_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+        compress = compression if compression and compression != 'none' else False
+        # Session ids are disabled so that concurrent ingestion workers can share this client
+        self.client = get_client(host=host, username=username, password=password, database=database,
+                                 compress=compress, autogenerate_session_id=False)
         self.sql_mapping = {
             'create_table': 'src/ingestion/query/create_table.sql',
+            'create_table_replacing': 'src/ingestion/query/create_table_replacing.sql',
             'latest_timestamp': 'src/ingestion/query/latest_timestamp.sql',
+            'latest_timestamps': 'src/ingestion/query/latest_timestamps.sql',
+            'coverage_gaps': 'src/ingestion/query/coverage_gaps.sql',
             'validate_table': 'src/ingestion/query/validate_table.sql',
             'table_exists': 'src/ingestion/query/table_exists.sql',
+            'create_shard_table': 'src/ingestion/query/create_shard_table.sql',
+            'shard_status': 'src/ingestion/query/shard_status.sql',
+            'create_rollup_table': 'src/ingestion/query/create_rollup_table.sql',
+            'create_rollup_view': 'src/ingestion/query/create_rollup_view.sql',
+            'backfill_rollup': 'src/ingestion/query/backfill_rollup.sql',
+            'table_partitions': 'src/ingestion/query/table_partitions.sql',
+            'drop_partition': 'src/ingestion/query/drop_partition.sql',
+            'ticker_watermarks': 'src/ingestion/query/ticker_watermarks.sql',
+            'read_ohlcv': 'src/ingestion/query/read_ohlcv.sql',
+            'read_rollup': 'src/ingestion/query/read_rollup.sql',
+            'table_schema': 'src/ingestion/query/table_schema.sql',
+            'partition_rows': 'src/ingestion/query/partition_rows.sql',
+            'partition_keys': 'src/ingestion/query/partition_keys.sql',
+            'copy_partition': 'src/ingestion/query/copy_partition.sql',
+            'exchange_tables': 'src/ingestion/query/exchange_tables.sql',
+            'rename_table': 'src/ingestion/query/rename_table.sql',
+            'table_storage': 'src/ingestion/query/table_storage.sql',
+            'scan_table': 'src/ingestion/query/scan_table.sql',
+            'create_quarantine_table': 'src/ingestion/query/create_quarantine_table.sql',
+            'create_quality_table': 'src/ingestion/query/create_quality_table.sql',
+            'create_staging_table': 'src/ingestion/query/create_staging_table.sql',
+            'drop_table': 'src/ingestion/query/drop_table.sql',
+            'enable_deduplication': 'src/ingestion/query/enable_deduplication.sql',
+            'optimize_partition': 'src/ingestion/query/optimize_partition.sql',
+            'attach_partition': 'src/ingestion/query/attach_partition.sql',
+            'replace_partition': 'src/ingestion/query/replace_partition.sql',
         }
-        self.create_table_from_sql(table_name)
+        self._sql_cache = {}
+        self._table_columns = {}
+        self.table_name = table_name
+        self.bootstrap(table_name, TABLE_ENGINES[table_engine])
+
+    def bootstrap(self, table_name, sql_name='create_table'):
+        """
+        Runs `create_table_from_sql` for a table according to the bootstrap mode. In 'auto' mode
+        the DDL is skipped when the cache records it for this server, table, template and
+        rollups, and recorded after it succeeded.
+
+        Returns:
+            bool: True if the table is known to be in place (or bootstrap is disabled).
+        """
+        if self.bootstrap_mode == 'never':
+            return True
+        cache = self.bootstrap_cache if self.bootstrap_mode == 'auto' else None
+        key = None
+        if cache is not None:
+            templates = [sql_name]
+            if sql_name in TABLE_ENGINES.values() and self.rollups:
+                templates += ['create_rollup_table', 'create_rollup_view']
+            if DEDUPLICATION_SETTING in self.read_sql(sql_name):
+                templates.append('enable_deduplication')
+            digest = hashlib.blake2b(digest_size=8)
+            for template in templates:
+                digest.update(self.read_sql(template).encode('utf-8'))
+            rollups = ','.join(self.rollups) if sql_name in TABLE_ENGINES.values() else ''
+            key = f"{self.host}/{self.database}/{table_name}/{sql_name}/{rollups}/{digest.hexdigest()}"
+            if cache.contains(key):
+                logger.debug(f"Skipping the bootstrap of {table_name}: recorded in {cache.path}.")
+                return True
+
+        created = self.create_table_from_sql(table_name, sql_name)
+        if created and cache is not None:
+            cache.add(key)
+        return created
+
+    def read_sql(self, name):
+        """
+        Returns the SQL template registered under `name`, reading it from disk only once.
+
+        Args:
+            name (str): A key of `sql_mapping`.
+
+        Returns:
+            str: The raw SQL template.
+        """
+        if name not in self._sql_cache:
+            with open(self.sql_mapping[name], 'r') as file:
+                self._sql_cache[name] = file.read()
+        return self._sql_cache[name]
 
     def table_exists(self, table_name):
         """
@@ -29,10 +208,7 @@ class ClickhouseConnect:
             bool: True if the table exists, False otherwise.
         """
         try:
-            with open(self.sql_mapping['table_exists'], 'r') as file:
-                query_template = file.read()
-
-            query = query_template.format(
+            query = self.read_sql('table_exists').format(
                 database=self.client.database,
                 table_name=table_name
             )
@@ -42,64 +218,255 @@ class ClickhouseConnect:
             return count > 0
 
         except Exception as e:
-            print(f"Error checking if table exists: {e}")
+            console.error(f"Error checking if table exists: {e}")
             return False
 
 
-    def create_table_from_sql(self, table_name):
+    def create_table_from_sql(self, table_name, sql_name='create_table'):
         """
         Creates a ClickHouse table by reading a SQL template file and executing the query.
+        For OHLCV tables, the configured rollups and the materialized views feeding them
+        are created as well (also when the table itself already exists). An existing table
+        created before the template enabled insert deduplication gets the setting added, so
+        that deduplication tokens take effect on it too.
 
         Args:
             table_name (str): The name of the table to create.
-            sql_file_path (str): Path to the .sql file containing the CREATE TABLE statement.
+            sql_name (str): The `sql_mapping` key of the CREATE TABLE template.
+
+        Returns:
+            bool: True if the table and its rollups exist afterwards.
         """
         try:
-            with open(self.sql_mapping['create_table'], 'r') as f:
-                sql_template = f.read()
-            
-            create_query = sql_template.format(table_name=table_name)
+            create_query = self.read_sql(sql_name).format(table_name=table_name)
             if not self.table_exists(table_name):
                 self.client.command(create_query)
-                logger.info('Table Created')
-                print(f"Table '{table_name}' created successfully.")
+                console.info(f"Table '{table_name}' created successfully.")
+            elif DEDUPLICATION_SETTING in create_query:
+                self.client.command(self.read_sql('enable_deduplication'), parameters={'table_name': table_name})
         
         except Exception as e:
-            logger.error('Table not created in database')
-            print(f"Error creating table '{table_name}': {e}")
+            console.error(f"Error creating table '{table_name}': {e}")
+            return False
+
+        created = True
+        if sql_name in TABLE_ENGINES.values():
+            for rollup in self.rollups:
+                created &= self.create_rollup(table_name, rollup)
+        return created
+
+    def create_rollup(self, table_name, rollup):
+        """
+        Creates a rollup table (AggregatingMergeTree keeping argMin/argMax states for open and
+        close) and the materialized view that feeds it from every insert into `table_name`.
+        The view only sees rows inserted after it exists; older history is filled with
+        `backfill_rollup_partition`.
+
+        Args:
+            table_name (str): The one-minute source table.
+            rollup (str): A key of ROLLUP_BUCKETS.
+
+        Returns:
+            bool: True if the rollup exists afterwards.
+        """
+        rollup_table = rollup_table_name(table_name, rollup)
+        try:
+            if self.table_exists(f"{rollup_table}_mv"):
+                return True
+            self.client.command(self.read_sql('create_rollup_table').format(rollup_table=rollup_table))
+            self.client.command(self.read_sql('create_rollup_view').format(
+                view_name=f"{rollup_table}_mv", rollup_table=rollup_table,
+                table_name=table_name, bucket=ROLLUP_BUCKETS[rollup]
+            ))
+            console.info(f"Rollup '{rollup_table}' created; run `python -m src.ingestion.rollups` to backfill existing history.")
+            return True
+        except Exception as e:
+            console.error(f"Error creating rollup '{rollup_table}': {e}")
+            return False
+
+    def get_partitions(self, table_name):
+        """
+        Returns the ids of the active partitions of a table, oldest first.
+        """
+        result = self.client.query(self.read_sql('table_partitions'), parameters={'table_name': table_name})
+        return [row[0] for row in result.result_rows]
+
+    def backfill_rollup_partition(self, table_name, rollup, partition_id):
+        """
+        Recomputes one monthly partition of a rollup from the source table: the rollup partition
+        is dropped and rebuilt with a single INSERT ... SELECT over that source partition, so the
+        work is bounded by one month of data and re-running it never double counts.
+
+        Args:
+            table_name (str): The one-minute source table.
+            rollup (str): A key of ROLLUP_BUCKETS.
+            partition_id (str): The partition to rebuild, e.g. '202401'.
+        """
+        rollup_table = rollup_table_name(table_name, rollup)
+        self.client.command(
+            self.read_sql('drop_partition'),
+            parameters={'table_name': rollup_table, 'partition_id': partition_id}
+        )
+        self.client.command(
+            self.read_sql('backfill_rollup').format(
+                rollup_table=rollup_table, table_name=table_name, bucket=ROLLUP_BUCKETS[rollup]
+            ),
+            parameters={'partition_id': partition_id}
+        )
 
 
     def get_last_date_data(self, ticker):
         """
-        Fetches the latest timestamp for a given ticker by reading and executing a SQL file.
+        Fetches the latest timestamp for a given ticker using a parameter-bound query.
 
         Args:
             ticker (str): The stock ticker symbol.
-            sql_file_path (str): Path to the SQL file.
 
         Returns:
             datetime or None: Latest timestamp or None if not found.
         """
-                    # Load SQL query from file
-        with open(self.sql_mapping['latest_timestamp'], 'r') as file:
-            query_template = file.read()
-
-        query = query_template.format(ticker=ticker)
-
-        result = self.client.query(query)
+        result = self.client.query(
+            self.read_sql('latest_timestamp'),
+            parameters={'table_name': self.table_name, 'ticker': ticker}
+        )
         latest_ts = result.result_rows[0][0] if result.result_rows else None
+        latest_ts = self._normalize_watermark(latest_ts)
 
-        # Handle default epoch case
-        if latest_ts is not None and latest_ts == datetime(1970, 1, 1):
+        if latest_ts is None:
             logger.info(f'Empty table for {ticker}')
-            return None
 
         return latest_ts
 
+    def get_latest_timestamps(self, tickers=None, table_name=None):
+        """
+        Fetches the latest timestamp of every ticker in a single GROUP BY query.
+        Only the `ticker` and `timestamp` columns are read, and the aggregation follows
+        the (ticker, timestamp) sort key instead of hashing the whole table.
+
+        Args:
+            tickers (list): Restrict the query to these tickers (pruned by the primary key).
+            table_name (str): The table to read, the configured table by default.
+
+        Returns:
+            dict: {ticker: datetime} for every ticker present in the table.
+        """
+        parameters = {'table_name': table_name or self.table_name}
+        if tickers is not None:
+            parameters['tickers'] = list(tickers)
+        result = self.client.query(
+            self.read_sql('latest_timestamps' if tickers is None else 'ticker_watermarks'),
+            parameters=parameters
+        )
+        watermarks = {}
+        for ticker, latest_ts in result.result_rows:
+            latest_ts = self._normalize_watermark(latest_ts)
+            if latest_ts is not None:
+                watermarks[ticker] = latest_ts
+
+        if tickers is None:
+            logger.info(f'Loaded watermarks for {len(watermarks)} tickers.')
+        return watermarks
+
+    def get_missing_trading_days(self, start_date, end_date, holidays=(), extra_sessions=()):
+        """
+        Finds, per ticker, the trading days without any stored rows between `start_date` and
+        `end_date`, in a single aggregated query. Covered days are collected into
+        a bitmap per ticker and subtracted from the bitmap of expected trading days (weekdays
+        minus holidays, plus extra sessions), so only the missing days come back.
+
+        Args:
+            start_date (date): First day that should be covered (days before a ticker's first
+                               stored day are reported as well).
+            end_date (date): Last day that should be covered.
+            holidays (iterable): Weekdays without a session.
+            extra_sessions (iterable): Weekend days with a session.
+
+        Returns:
+            dict: {ticker: list of missing datetime.date} for every ticker with stored data.
+        """
+        epoch = date(1970, 1, 1)
+        result = self.client.query(
+            self.read_sql('coverage_gaps'),
+            parameters={
+                'table_name': self.table_name,
+                'start_date': start_date,
+                'end_date': end_date,
+                'holidays': sorted((day - epoch).days for day in holidays),
+                'extra_sessions': sorted((day - epoch).days for day in extra_sessions),
+            }
+        )
+        return {
+            ticker: [epoch + timedelta(days=int(day)) for day in missing_days]
+            for ticker, missing_days in result.result_rows
+        }
+
+    def get_shard_status(self, table_name, run_id):
+        """
+        Returns the latest progress row of every shard of a sharded run.
+
+        Args:
+            table_name (str): The shard coordination table.
+            run_id (str): The run to report on.
+
+        Returns:
+            list: One dict per shard that has reported, ordered by shard.
+        """
+        result = self.client.query(
+            self.read_sql('shard_status'),
+            parameters={'table_name': table_name, 'run_id': run_id}
+        )
+        keys = ('shard', 'owner', 'status', 'tickers_total', 'tickers_done', 'tickers_failed',
+                'started_at', 'updated_at')
+        return [dict(zip(keys, row)) for row in result.result_rows]
+
+    def record_shard_progress(self, table_name, progress):
+        """
+        Appends one progress row for a shard; the latest row per (run_id, shard) wins.
+
+        Args:
+            table_name (str): The shard coordination table.
+            progress (dict): Column values of the row.
+        """
+        columns = list(progress)
+        self.client.insert(table_name, [[progress[column] for column in columns]], column_names=columns)
+
+    @staticmethod
+    def _normalize_watermark(latest_ts):
+        """
+        Maps ClickHouse's epoch default to None and drops tz info so watermarks
+        compare directly with the naive timestamps produced by preprocessing.
+        """
+        if latest_ts is None:
+            return None
+        latest_ts = latest_ts.replace(tzinfo=None)
+        if latest_ts == datetime(1970, 1, 1):
+            return None
+        return latest_ts
+
+
+    def get_table_columns(self, table_name):
+        """
+        Returns the column names of a table, querying `system.columns` only the first time.
+
+        Args:
+            table_name (str): The ClickHouse table name.
+
+        Returns:
+            list: Column names in table order.
+        """
+        if table_name not in self._table_columns:
+            query = self.read_sql('validate_table').format(
+                database=self.client.database,
+                table_name=table_name
+            )
+            result = self.client.query(query)
+            self._table_columns[table_name] = [row[0] for row in result.result_rows]
+        return self._table_columns[table_name]
 
     def validate_table(self, table_name, dataframe):
         """
         Validates if the columns in the ClickHouse table match those in the DataFrame.
+        The table schema is fetched once and cached for the lifetime of the connection.
 
         Args:
             table_name (str): The ClickHouse table name.
@@ -109,50 +476,141 @@ class ClickhouseConnect:
             bool: True if column names match, False otherwise.
         """
         try:
-            # Read SQL template from file
-            with open(self.sql_mapping['validate_table'], 'r') as file:
-                query_template = file.read()
-
-            # Replace placeholders
-            query = query_template.format(
-                database=self.client.database,
-                table_name=table_name
-            )
-
-            # Execute query
-            result = self.client.query(query)
-            table_columns = [row[0] for row in result.result_rows]
+            table_columns = self.get_table_columns(table_name)
 
             # Normalize and compare column names
             df_columns = list(dataframe.columns)
             if table_columns == df_columns:
                 return True
             else:
-                logger.error(f"Column mismatch:\nDB: {table_columns}\nDF: {df_columns}")
-                print(f"Column mismatch:\nDB: {table_columns}\nDF: {df_columns}")
+                console.error(f"Column mismatch:\nDB: {table_columns}\nDF: {df_columns}")
                 return False
 
         except Exception as e:
-            logger.error(f"Validation error: {e}")
-            print(f"Validation error: {e}")
+            console.error(f"Validation error: {e}")
             return False
 
 
-    def push_data_to_database(self, table_name, dataframe, ticker):
+    @staticmethod
+    def dataframe_to_arrow(dataframe):
+        """
+        Builds a typed Arrow table from a preprocessed OHLCV DataFrame.
+        Numeric columns are wrapped without copying; the ticker column is dictionary
+        encoded (reusing the codes of a categorical column) so each distinct symbol
+        crosses the wire once per batch, and timestamps
+        are truncated to seconds to match DateTime('UTC').
+
+        Args:
+            dataframe (pd.DataFrame): Columns ['ticker', 'timestamp', 'open', 'high', 'low', 'close', 'volume'].
+
+        Returns:
+            pyarrow.Table: A table with OHLCV_ARROW_SCHEMA.
+        """
+        ticker = dataframe['ticker']
+        if ticker.dtype.name == 'category':
+            ticker_array = pa.DictionaryArray.from_arrays(
+                pa.array(ticker.cat.codes.to_numpy(dtype='int32')),
+                pa.array(ticker.cat.categories.to_numpy(), type=pa.string())
+            )
+        else:
+            ticker_array = pa.array(ticker.to_numpy(), type=pa.string()).dictionary_encode()
+
+        columns = [
+            ticker_array,
+            pa.array(dataframe['timestamp'].to_numpy(dtype='datetime64[s]'), type=pa.timestamp('s', tz='UTC')),
+        ]
+        for name in ('open', 'high', 'low', 'close'):
+            columns.append(pa.array(dataframe[name].to_numpy(dtype='float64', copy=False), type=pa.float64()))
+        columns.append(pa.array(dataframe['volume'].to_numpy(dtype='uint64', copy=False), type=pa.uint64()))
+        return pa.Table.from_arrays(columns, schema=OHLCV_ARROW_SCHEMA)
+
+    @staticmethod
+    def deduplication_token(table_name, dataframe, ticker):
+        """
+        Returns a deterministic insert deduplication token for a chunk: the table, the ticker,
+        the months covered and a hash of the chunk's contents. Re-sending the same chunk (a retry,
+        or a re-run over the same window) produces the same token, so ClickHouse drops the repeat.
+
+        Args:
+            table_name (str): The target table.
+            dataframe (pd.DataFrame): The chunk to insert.
+            ticker (str): The ticker (or batch label) the chunk belongs to.
+
+        Returns:
+            str: The token.
         """
-        Pushes the provided DataFrame to the 'stock_ohlcv' table in ClickHouse.
+        if 'timestamp' in dataframe:
+            timestamps = dataframe['timestamp']
+            months = f"{timestamps.min():%Y%m}-{timestamps.max():%Y%m}"
+        else:
+            months = '-'
+        row_hashes = pd.util.hash_pandas_object(dataframe, index=False).to_numpy()
+        digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+        return f"{table_name}:{ticker}:{months}:{digest}"
+
+    @staticmethod
+    def _payload_bytes(payload):
+        if isinstance(payload, pa.Table):
+            return payload.nbytes
+        return int(payload.memory_usage(index=False).sum())
+
+    def push_data_to_database(self, table_name, dataframe, ticker, settings=None):
+        """
+        Pushes the provided DataFrame to the given table in ClickHouse. The insert carries a
+        deduplication token derived from its contents and is retried with exponential backoff,
+        so a retry after an ambiguous failure (e.g. a timeout after the server committed)
+        never duplicates rows.
 
         Args:
+            table_name (str): The target table.
             dataframe (pd.DataFrame): The data to insert. Expected to have columns:
                 ['ticker', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+            ticker (str): The ticker (or batch label) of the data, used in the token and logs.
+            settings (dict): Optional ClickHouse settings for this insert, e.g. ASYNC_INSERT_SETTINGS.
+
+        Returns:
+            bool: True if the data was inserted, False otherwise.
         """
-        try:
-            if self.validate_table(table_name, dataframe):
-                self.client.insert_df('stock_ohlcv', dataframe)
-                #print(f'Data Inserted to {table_name} for {ticker}')
-                
-            else:
-                logger.error("Data not inserted into ClickHouse. Kindly check dataframe columns and table columns")
+        if not self.validate_table(table_name, dataframe):
+            logger.error("Data not inserted into ClickHouse. Kindly check dataframe columns and table columns")
+            return False
 
-        except Exception as e:
-            logger.error(f"Failed to insert data into ClickHouse: {e}")
\ No newline at end of file
+        payload = self.dataframe_to_arrow(dataframe) if self.insert_format == 'arrow' else dataframe
+        return self._insert(table_name, dataframe, payload, ticker, settings)
+
+    def push_frame(self, table_name, dataframe, label, settings=None):
+        """
+        Inserts a DataFrame whose columns match a non-OHLCV table (e.g. the quarantine and quality
+        tables) as is, with the same deduplication token and retries as `push_data_to_database`.
+
+        Returns:
+            bool: True if the data was inserted, False otherwise.
+        """
+        return self._insert(table_name, dataframe, dataframe, label, settings)
+
+    def _insert(self, table_name, dataframe, payload, ticker, settings=None):
+        settings = {'insert_deduplication_token': self.deduplication_token(table_name, dataframe, ticker),
+                    **(settings or {})}
+        start = time.perf_counter()
+        for attempt in range(self.insert_retries + 1):
+            try:
+                if isinstance(payload, pa.Table):
+                    self.client.insert_arrow(table_name, payload, settings=settings)
+                else:
+                    self.client.insert_df(table_name, payload, settings=settings)
+                #print(f'Data Inserted to {table_name} for {ticker}')
+                metrics.observe('clickhouse_insert_seconds', time.perf_counter() - start, table=table_name)
+                metrics.inc('clickhouse_insert_rows_total', len(dataframe), table=table_name)
+                metrics.inc('clickhouse_insert_bytes_total', self._payload_bytes(payload), table=table_name)
+                return True
+            except Exception as e:
+                if attempt == self.insert_retries:
+                    metrics.inc('clickhouse_insert_failures_total', table=table_name)
+                    logger.error(f"Failed to insert data into ClickHouse after {attempt + 1} attempts: {e}")
+                    break
+                metrics.inc('clickhouse_insert_retries_total', table=table_name)
+                # Full jitter keeps concurrent workers from retrying in lockstep
+                delay = random.uniform(0, min(30.0, self.retry_backoff_seconds * 2 ** attempt))
+                logger.warning(f"Insert of {len(dataframe)} rows for {ticker} failed ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+        return False
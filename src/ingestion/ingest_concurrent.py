@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+
+class ConcurrentTickerIngestor:
+    """
+    Fans single-ticker ingestion out over a pool of worker threads.
+    All workers share the API client (and therefore its rate limiter), so the pool
+    size only controls how many tickers are in flight, not how fast the broker is hit.
+    """
+
+    def __init__(self, single_ingestor, max_workers=4):
+        self.single_ingestor = single_ingestor
+        self.max_workers = max(1, int(max_workers))
+
+    def ingest_tickers(self, angelone_client, tickers, on_ticker_done=None):
+        """
+        Fetches and stores every ticker, isolating failures per ticker.
+
+        Args:
+            angelone_client (AngelOneApiClient): The shared, rate-limited API client.
+            tickers (list): A list of (ticker_token, ticker, exchange) tuples.
+            on_ticker_done (callable): Called with (ticker, exception or None) as each ticker finishes.
+
+        Returns:
+            dict: {ticker: exception} for every ticker that failed. Empty if all succeeded.
+        """
+        failures = {}
+        logger.info(f"Ingesting {len(tickers)} tickers with {self.max_workers} workers.")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest") as executor:
+            futures = {
+                executor.submit(self.single_ingestor.fetch_and_store_single_ticker,
+                                angelone_client, ticker_token, ticker, exchange): ticker
+                for ticker_token, ticker, exchange in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[ticker] = e
+                    logger.error(f"Ingestion failed for {ticker}: {e}", exc_info=True)
+                if on_ticker_done is not None:
+                    on_ticker_done(ticker, failures.get(ticker))
+
+        logger.info(f"Finished ingesting {len(tickers) - len(failures)}/{len(tickers)} tickers.")
+        if failures:
+            console.error(f"{len(failures)} tickers failed: {', '.join(sorted(failures))}")
+        return failures
@@ -1,71 +1,310 @@
 import pandas as pd
-from datetime import datetime, timedelta
+import threading
 import time
+from datetime import datetime, timedelta
+from src.downloader.intervals import INTERVAL_MAX_DAYS
 from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
 
 logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# History starts here for tickers without stored data
+DEFAULT_START_DATE = datetime(2016, 1, 1)
+# Candle interval ingested when none is given
+DEFAULT_INTERVAL = "ONE_MINUTE"
 
 
 class SingleTickerIngestor:
-    def __init__(self, clickhouse_client, preprocess_class, table_name):
+    def __init__(self, clickhouse_client, preprocess_class, table_name, stream_windows=True,
+                 interval=DEFAULT_INTERVAL):
+        """
+        Args:
+            stream_windows (bool): Store each fetched window as soon as it arrives instead of
+                                   collecting a ticker's whole history first.
+            interval (str): Candle interval fetched into `table_name`. Each request window spans
+                            the broker's maximum range for it (window_days + 1 calendar days).
+        """
+        if interval not in INTERVAL_MAX_DAYS:
+            raise ValueError(f"Invalid interval: {interval}. Expected one of {list(INTERVAL_MAX_DAYS)}")
         self.clickhouse_client = clickhouse_client
         self.preprocess_class = preprocess_class
         self.table_name = table_name
+        self.stream_windows = stream_windows
+        self.interval = interval
+        self.window_days = INTERVAL_MAX_DAYS[interval] - 1
+        self.watermarks = None
+        self._watermark_lock = threading.Lock()
+        self.insert_buffer = None
+        self.spool = None
+        self.backfill_plan = None
+        self.quality_gate = None
 
-    def fetch_and_store_single_ticker(self, angelone_client, ticker_token, ticker):
+    def load_watermarks(self):
         """
-        Fetches historical data for a single ticker and stores it in the database.
+        Loads the latest stored timestamp of every ticker with one bulk query, so that
+        per-ticker lookups are served from memory instead of a round trip each.
         """
-        print(f"Ingesting data for {ticker}")
+        self.watermarks = self.clickhouse_client.get_latest_timestamps()
 
-        last_date = self.clickhouse_client.get_last_date_data(ticker)
-        if last_date is None or last_date.year < 1980:
-            last_date = datetime(2016, 1, 1)
+    def get_watermark(self, ticker):
+        """
+        Returns the latest stored timestamp for a ticker, or None if it has no data.
+        Falls back to a single-ticker query when the bulk map has not been loaded.
+        """
+        if self.watermarks is None:
+            return self.clickhouse_client.get_last_date_data(ticker)
+        return self.watermarks.get(ticker)
 
-        all_dataframes = []  
-        empty_chunk_count = 0
-        to_date = datetime.today().date()
+    def update_watermark(self, ticker, latest_ts):
+        """
+        Advances the in-memory watermark for a ticker after a successful insert.
+        """
+        if self.watermarks is None:
+            return
+        with self._watermark_lock:
+            current = self.watermarks.get(ticker)
+            if current is None or latest_ts > current:
+                self.watermarks[ticker] = latest_ts
 
-        while empty_chunk_count < 3:
-            from_date = max(last_date.date() + timedelta(days=1), to_date - timedelta(days=29))
+    def update_watermarks(self, latest_timestamps):
+        """
+        Advances several watermarks at once, e.g. after an InsertBuffer flush.
 
-            if from_date > to_date:
-                print(f"Complete data fetched for {ticker}.")
-                break
+        Args:
+            latest_timestamps (dict): {ticker: latest inserted timestamp}.
+        """
+        for ticker, latest_ts in latest_timestamps.items():
+            self.update_watermark(ticker, pd.Timestamp(latest_ts).to_pydatetime())
 
-            print(f"Fetching from {from_date} to {to_date} for {ticker}")
-            time.sleep(0.5)
-           
-            raw_data = angelone_client.get_historical_data(from_date, to_date, ticker_token)
+    def validate(self, dataframe):
+        """
+        Passes preprocessed rows through the quality gate, if one is attached, and returns the
+        accepted rows; rejected rows go to the quarantine table.
+        """
+        if self.quality_gate is None:
+            return dataframe
+        return self.quality_gate.apply(dataframe)
 
-            if raw_data and raw_data.get('data') is not None and len(raw_data['data']) > 0:
-                processed = self.preprocess_class.preprocess_data(raw_data['data'], ticker)
-                all_dataframes.append(processed) 
-                empty_chunk_count = 0
+    def store(self, dataframe, ticker):
+        """
+        Validates preprocessed data and hands it to the shared insert buffer if one is attached,
+        otherwise inserts it directly in monthly chunks.
+        """
+        with AppLogger.context(ticker=ticker, stage='store'):
+            start = time.perf_counter()
+            dataframe = self.validate(dataframe)
+            metrics.record_ticker(ticker, 'store', time.perf_counter() - start)
+            # Inserts are charged to the ticker as 'insert', also when a buffer flush writes them later
+            if self.insert_buffer is not None:
+                self.insert_buffer.add(dataframe, ticker)
             else:
-                print("Empty data chunk")
-                logger.error(f'Empty data for {ticker} from {from_date} to {to_date}.')
-                empty_chunk_count += 1
+                self.insert_data_monthly_chunks(dataframe, ticker)
+
+    def fetch_window(self, angelone_client, ticker_token, ticker, from_date, to_date, exchange="NSE"):
+        """
+        Returns the raw response of one request window, served from the response spool
+        when that window was already fetched, and spooled after a successful API call.
+        Windows that end today or later are still receiving candles and are never spooled.
+        """
+        interval = self.interval
+        spoolable = self.spool is not None and to_date < datetime.today().date()
+        if spoolable:
+            spooled = self.spool.get(ticker_token, interval, from_date, to_date, exchange)
+            if spooled is not None:
+                logger.info(f'Using spooled window {from_date} to {to_date} for {ticker}.')
+                return spooled
+
+        raw_data = angelone_client.get_historical_data(from_date, to_date, ticker_token, exchange, interval)
+        if raw_data is not None and spoolable:
+            self.spool.put(ticker, ticker_token, interval, from_date, to_date, raw_data, exchange)
+        return raw_data
+
+    def fetch_and_store_single_ticker(self, angelone_client, ticker_token, ticker, exchange="NSE"):
+        """
+        Fetches historical data for a single ticker and stores it in the database.
+        """
+        with AppLogger.context(ticker=ticker):
+            self._fetch_and_store_single_ticker(angelone_client, ticker_token, ticker, exchange)
+
+    def _fetch_and_store_single_ticker(self, angelone_client, ticker_token, ticker, exchange="NSE"):
+        console.info(f"Ingesting data for {ticker}")
 
-            if from_date <= last_date.date():
-                print("Reached known data boundary.")
-                break
+        last_date, known_boundary = self.get_start_boundary(ticker)
 
-            to_date = from_date - timedelta(days=1)
+        if self.stream_windows:
+            self._stream_single_ticker(angelone_client, ticker_token, ticker, last_date, known_boundary, exchange)
+            return
+
+        # Same windows as the streaming path, stored only once the whole walk succeeded
+        all_dataframes = []
+        windows = self.iter_raw_windows(angelone_client, ticker_token, ticker, last_date, known_boundary, exchange)
+        for _, _, raw_data in windows:
+            if raw_data.get('data'):
+                all_dataframes.append(self.preprocess_class.preprocess_data(raw_data['data'], ticker))
 
         if all_dataframes:
             combined_df = pd.concat(all_dataframes)
             combined_df = combined_df.sort_values(by='timestamp')
-            self.insert_data_monthly_chunks(combined_df, ticker)
-            print(f'Data fetched cleaned and pushed for {ticker} in database')
-            logger.info(f'Data fetched cleaned and pushed for {ticker} in database')
+            self.store(combined_df, ticker)
+            console.info(f'Data fetched cleaned and pushed for {ticker} in database')
         else:
-            print(f"No data to insert for {ticker}.")
-            logger.error(f"No data to insert for {ticker}.")
+            console.error(f"No data to insert for {ticker}.")
+
+    def _stream_single_ticker(self, angelone_client, ticker_token, ticker, last_date, known_boundary, exchange="NSE"):
+        """
+        Fetches a ticker window by window and stores each window as soon as it arrives, so memory
+        use per ticker is bounded by one window regardless of how much history is fetched. No
+        global sort is needed because the table's ORDER BY (ticker, timestamp) sorts on insert.
+        """
+        rows = 0
+        windows = self.iter_raw_windows(angelone_client, ticker_token, ticker, last_date, known_boundary, exchange)
+        for _, _, raw_data in windows:
+            if raw_data.get('data'):
+                processed = self.preprocess_class.preprocess_data(raw_data['data'], ticker)
+                self.store(processed, ticker)
+                rows += len(processed)
+
+        if rows:
+            console.info(f'Streamed {rows} rows for {ticker} into the database')
+        else:
+            console.error(f"No data to insert for {ticker}.")
+
+    def get_start_boundary(self, ticker):
+        """
+        Returns (last_date, known_boundary): the ticker's watermark, or DEFAULT_START_DATE and
+        False when it has no stored data yet.
+        """
+        last_date = self.get_watermark(ticker)
+        known_boundary = last_date is not None and last_date.year >= 1980
+        return (last_date if known_boundary else DEFAULT_START_DATE), known_boundary
+
+    def iter_raw_windows(self, angelone_client, ticker_token, ticker, last_date, known_boundary, exchange="NSE"):
+        """
+        Fetches the request windows of one ticker and yields their raw responses. Every window
+        spans the maximum range the broker allows for the ingestor's interval.
+
+        Every ticker is walked oldest-first, so an interrupted run always leaves a gap-free prefix
+        behind and the next run resumes from the watermark. Tickers with stored data start after
+        their watermark; new tickers start on their first daily candle (`find_history_start`).
+        A window that cannot be fetched ends the walk with an error, so no later window is stored
+        past it.
+
+        When a backfill plan covers the ticker, exactly its planned windows are fetched instead,
+        and only the candles of their missing days are yielded.
+
+        Yields:
+            tuple: (from_date, to_date, raw response).
+
+        Raises:
+            RuntimeError: If a request still failed after the client's retries.
+        """
+        planned = self.backfill_plan.get(ticker) if self.backfill_plan is not None else None
+        if planned is not None:
+            for from_date, to_date, days in planned:
+                if from_date is None:
+                    # Days before the first stored one: nothing to fetch if the ticker listed later
+                    from_date = self.find_history_start(angelone_client, ticker_token, ticker, to_date, exchange)
+                    if from_date is None:
+                        logger.info(f'{ticker} has no daily candles up to {to_date}, before its stored history.')
+                        continue
+                    yield from self._walk_forward(angelone_client, ticker_token, ticker, from_date, to_date,
+                                                  exchange, grid=False)
+                    continue
+                raw_data = self._fetch_logged(angelone_client, ticker_token, ticker, from_date, to_date, exchange)
+                wanted = {day.isoformat() for day in days}
+                yield from_date, to_date, {**raw_data, 'data': [row for row in raw_data.get('data') or []
+                                                                if row[0][:10] in wanted]}
+            return
+
+        today = datetime.today().date()
+
+        if known_boundary:
+            from_date = last_date.date() + timedelta(days=1)
+        else:
+            # Walking a new ticker newest-first would move its watermark to today with the first
+            # insert, and an interrupted run would leave the older history behind for good
+            from_date = self.find_history_start(angelone_client, ticker_token, ticker, today, exchange)
+            if from_date is None:
+                logger.error(f'No daily candles for {ticker} up to {today}; its history is not fetched in this run.',
+                             extra={'ticker': ticker, 'stage': 'fetch'})
+                return
+
+        yield from self._walk_forward(angelone_client, ticker_token, ticker, from_date, today, exchange)
+
+    def _walk_forward(self, angelone_client, ticker_token, ticker, from_date, end_date, exchange="NSE", grid=True):
+        """
+        Yields the windows from `from_date` to `end_date`. With `grid`, requests follow a fixed grid
+        of maximum-size windows counted from DEFAULT_START_DATE, so a window is requested (and spooled)
+        with the same range whichever day a run starts in it; candles before `from_date` are dropped.
+        Without it, maximum-size windows start exactly at `from_date`.
+        """
+        span = self.window_days + 1
+        anchor = DEFAULT_START_DATE.date() if grid else from_date
+        while from_date <= end_date:
+            window_start = anchor + timedelta(days=(from_date - anchor).days // span * span)
+            to_date = min(window_start + timedelta(days=self.window_days), end_date)
+            raw_data = self._fetch_logged(angelone_client, ticker_token, ticker, window_start, to_date, exchange)
+            if raw_data and raw_data.get('data') and window_start < from_date:
+                first_day = from_date.isoformat()
+                raw_data = {**raw_data, 'data': [row for row in raw_data['data'] if row[0][:10] >= first_day]}
+            yield from_date, to_date, raw_data
+            from_date = to_date + timedelta(days=1)
+
+    def find_history_start(self, angelone_client, ticker_token, ticker, end_date, exchange="NSE"):
+        """
+        Returns the day of a ticker's first daily candle between DEFAULT_START_DATE and `end_date`,
+        i.e. its listing date or DEFAULT_START_DATE for older listings. A ONE_DAY request covers
+        up to 2000 days, so this costs one or two requests instead of walking minute windows back
+        until they come up empty.
+
+        Returns:
+            date: The first day with data, or None if the broker returned no daily candles.
+
+        Raises:
+            RuntimeError: If a request failed, so that the ticker is not mistaken for one without history.
+        """
+        window_days = INTERVAL_MAX_DAYS["ONE_DAY"] - 1
+        from_date = DEFAULT_START_DATE.date()
+        while from_date <= end_date:
+            to_date = min(from_date + timedelta(days=window_days), end_date)
+            start = time.perf_counter()
+            with AppLogger.context(ticker=ticker, stage='fetch'):
+                console.info(f"Looking up the first daily candle from {from_date} to {to_date} for {ticker}")
+                raw_data = angelone_client.get_historical_data(from_date, to_date, ticker_token, exchange, "ONE_DAY")
+            metrics.record_ticker(ticker, 'fetch', time.perf_counter() - start)
+            if raw_data is None:
+                raise RuntimeError(f"Daily candles of {ticker} from {from_date} to {to_date} could not be fetched")
+            candles = raw_data.get('data') or []
+            if candles:
+                return max(from_date, min(datetime.fromisoformat(row[0]).date() for row in candles))
+            from_date = to_date + timedelta(days=1)
+        return None
+
+    def _fetch_logged(self, angelone_client, ticker_token, ticker, from_date, to_date, exchange="NSE"):
+        start = time.perf_counter()
+        with AppLogger.context(ticker=ticker, stage='fetch'):
+            console.info(f"Fetching {self.interval} from {from_date} to {to_date} for {ticker}")
+            raw_data = self.fetch_window(angelone_client, ticker_token, ticker, from_date, to_date, exchange)
+        rows = len(raw_data.get('data') or []) if raw_data else 0
+        metrics.record_ticker(ticker, 'fetch', time.perf_counter() - start, rows=rows)
+        if raw_data is None:
+            # Storing later windows would move the watermark past this one for good
+            raise RuntimeError(f"Fetching {ticker} from {from_date} to {to_date} failed; stopping its walk here")
+        if not rows:
+            logger.error(f'Empty data for {ticker} from {from_date} to {to_date}.', extra={'ticker': ticker, 'stage': 'fetch'})
+        return raw_data
 
     def insert_data_monthly_chunks(self, dataframe, ticker):
         """
-        Inserts data into the database in monthly chunks.
+        Inserts data into the database in monthly chunks, oldest first. Each chunk carries a
+        deduplication token derived from (ticker, month, contents), so a re-run over the same
+        range is dropped by ClickHouse instead of duplicating candles.
+
+        Raises:
+            RuntimeError: If a chunk still fails after the client's retries. Later months are not
+                          inserted, so the ticker's watermark stays before the missing month and
+                          the next run picks it up again.
         """
         dataframe['ch_partition_key'] = dataframe['timestamp'].dt.to_period('M')
         for partition_name, chunk_df in dataframe.groupby('ch_partition_key'):
@@ -73,10 +312,12 @@ class SingleTickerIngestor:
             logger.info(f"  - Pushing {len(chunk_df)} rows for partition '{partition_str}' of ticker '{ticker}'.")
 
             df_to_push = chunk_df.drop(columns=['ch_partition_key'])
-            try:
-                self.clickhouse_client.push_data_to_database(self.table_name, df_to_push, ticker)
-                logger.debug(f"  - Successfully pushed {len(df_to_push)} rows for partition '{partition_str}'.")
-            except Exception as e:
-                logger.error(f"  - Failed to push data for partition '{partition_str}' for ticker '{ticker}': {e}", exc_info=True)
+            start = time.perf_counter()
+            pushed = self.clickhouse_client.push_data_to_database(self.table_name, df_to_push, ticker)
+            metrics.record_ticker(ticker, 'insert', time.perf_counter() - start)
+            if not pushed:
+                raise RuntimeError(f"Failed to push partition '{partition_str}' for ticker '{ticker}'")
+            self.update_watermarks(df_to_push.groupby('ticker', observed=True)['timestamp'].max().to_dict())
+            logger.debug(f"  - Successfully pushed {len(df_to_push)} rows for partition '{partition_str}'.")
         
         logger.info(f"Finished pushing all monthly chunks for {ticker}.")
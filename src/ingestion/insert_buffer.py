@@ -0,0 +1,171 @@
+import threading
+import time
+import pandas as pd
+from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
+
+logger = AppLogger.get_logger()
+
+
+class InsertBuffer:
+    """
+    Collects preprocessed rows from many tickers and writes them to ClickHouse in large
+    batches, so that a backfill produces one part per monthly partition and flush instead of
+    one small insert per ticker and month. A batch is flushed when it reaches `max_rows` or
+    `max_bytes`, when its oldest row is older than `max_age_seconds`, or when the buffer is
+    closed.
+    """
+
+    def __init__(self, clickhouse_client, table_name, max_rows=500_000, max_bytes=256 * 1024 * 1024,
+                 max_age_seconds=30, on_flush=None):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): The connection used for inserts.
+            table_name (str): The target table.
+            max_rows (int): Flush once this many rows are buffered.
+            max_bytes (int): Flush once the buffered frames reach roughly this many bytes.
+            max_age_seconds (float): Flush once the oldest buffered row has waited this long.
+            on_flush (callable): Called with {ticker: latest_timestamp} of the rows each flush inserted.
+        """
+        self.clickhouse_client = clickhouse_client
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.on_flush = on_flush
+
+        self._frames = []
+        self._rows = 0
+        self._bytes = 0
+        self._first_added_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self._timer = threading.Thread(target=self._flush_on_age, name="insert-buffer", daemon=True)
+        self._timer.start()
+
+    def add(self, dataframe, ticker):
+        """
+        Buffers a preprocessed DataFrame and flushes if any threshold is exceeded.
+
+        Args:
+            dataframe (pd.DataFrame): Rows in table column order.
+            ticker (str): The ticker the rows belong to (used for logging only).
+        """
+        if dataframe.empty:
+            return
+
+        with self._lock:
+            self._frames.append(dataframe)
+            self._rows += len(dataframe)
+            self._bytes += int(dataframe.memory_usage(index=False).sum())
+            if self._first_added_at is None:
+                self._first_added_at = time.monotonic()
+            full = self._rows >= self.max_rows or self._bytes >= self.max_bytes
+
+        logger.debug(f"Buffered {len(dataframe)} rows for {ticker} ({self._rows} rows pending).")
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes everything buffered so far as one insert per monthly partition, covering every
+        buffered ticker and sorted by (ticker, timestamp) like the table, oldest month first. No
+        insert touches more than one partition, so max_partitions_per_insert_block is never hit.
+        The deduplication token hashes the whole partition chunk: it drops a retried insert, while
+        re-runs that batch rows differently rely on the ReplacingMergeTree engine.
+
+        Months after a failed insert are not attempted, so no ticker's stored history moves past
+        a missing month. The unwritten months go back into the buffer and are retried by the next
+        flush.
+
+        Returns:
+            bool: True if every month was inserted or there was nothing to write.
+        """
+        with self._flush_lock:
+            with self._lock:
+                frames, rows = self._frames, self._rows
+                self._frames, self._rows, self._bytes, self._first_added_at = [], 0, 0, None
+
+            if not frames:
+                return True
+
+            batch = pd.concat(frames, ignore_index=True)
+            start = time.monotonic()
+            months = (batch['timestamp'].dt.year * 100 + batch['timestamp'].dt.month).to_numpy()
+            chunks = [
+                (month, chunk.sort_values(['ticker', 'timestamp'], kind='stable', ignore_index=True))
+                for month, chunk in batch.groupby(months, sort=True)
+            ]
+
+            latest, unwritten = {}, []
+            for i, (month, chunk) in enumerate(chunks):
+                if not self._insert_partition(month, chunk):
+                    unwritten = [c for _, c in chunks[i:]]
+                    break
+                for ticker, latest_ts in chunk.groupby('ticker', observed=True)['timestamp'].max().items():
+                    latest[ticker] = latest_ts
+            if self.on_flush is not None and latest:
+                self.on_flush(latest)
+
+            if unwritten:
+                failed_rows = sum(len(chunk) for chunk in unwritten)
+                logger.error(f"Buffered insert of {failed_rows} of {rows} rows into {self.table_name} failed at "
+                             f"partition {chunks[len(chunks) - len(unwritten)][0]}; they stay buffered for the next flush.")
+                with self._lock:
+                    self._frames = unwritten + self._frames
+                    self._rows += failed_rows
+                    self._bytes += sum(int(chunk.memory_usage(index=False).sum()) for chunk in unwritten)
+                    self._first_added_at = time.monotonic()
+                return False
+
+            logger.info(f"Flushed {rows} buffered rows in {len(chunks)} partition inserts "
+                        f"to {self.table_name} in {time.monotonic() - start:.2f}s.")
+            return True
+
+    def _insert_partition(self, month, chunk):
+        start = time.perf_counter()
+        pushed = self.clickhouse_client.push_data_to_database(self.table_name, chunk, f"buffer:{month}")
+        seconds = time.perf_counter() - start
+        # The insert holds many tickers; each is charged its share by row count
+        for ticker, ticker_rows in chunk['ticker'].value_counts(sort=False).items():
+            if ticker_rows:
+                metrics.record_ticker(ticker, 'insert', seconds * ticker_rows / len(chunk))
+        if not pushed:
+            logger.error(f"Insert of {len(chunk)} buffered rows of partition {month} failed.")
+        return pushed
+
+    def close(self):
+        """
+        Stops the age-based flusher and writes any remaining rows.
+
+        Raises:
+            RuntimeError: If rows could still not be inserted, so that the run fails instead of
+                          silently dropping them.
+        """
+        self._closed.set()
+        self._timer.join()
+        if not self.flush():
+            with self._lock:
+                rows, self._frames, self._rows, self._bytes = self._rows, [], 0, 0
+            raise RuntimeError(f"{rows} buffered rows could not be inserted into {self.table_name}")
+        return True
+
+    def _flush_on_age(self):
+        interval = max(0.5, self.max_age_seconds / 4)
+        while not self._closed.wait(interval):
+            with self._lock:
+                expired = (self._first_added_at is not None
+                           and time.monotonic() - self._first_added_at >= self.max_age_seconds)
+            if expired:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Age-based flush failed: {e}", exc_info=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,251 @@
+"""
+Versioned schema migrations of the OHLCV tables. A migration builds the current layout in a
+staging table next to the live one, copies the history into it one monthly partition at a
+time while the live table stays readable, and swaps the two tables at cutover.
+
+Usage:
+    python -m src.ingestion.migrations status
+    python -m src.ingestion.migrations migrate [--since 202401]   # build and fill <table>__migrating
+    python -m src.ingestion.migrations cutover                    # re-sync changed partitions, swap tables
+    python -m src.ingestion.migrations report                     # bytes on disk and scan time, old vs new
+
+`migrate` is resumable: partitions whose row count already matches are skipped. Stop ingestion
+before `cutover`, so that no rows land in the old table after its final sync. The previous table
+is kept as <table>__v<old version> until it is dropped by hand.
+"""
+import argparse
+import re
+import time
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# Layouts of the OHLCV tables. The version is recorded in the table comment by the CREATE TABLE
+# templates; tables created before versioning carry no comment and are version 1.
+SCHEMA_VERSION = 2
+SCHEMA_VERSIONS = {
+    1: "Float64 prices and UInt64 volume with the default LZ4 compression",
+    2: "Column codecs: DoubleDelta timestamps, Delta prices and T64 volumes, each followed by ZSTD(1)",
+}
+SCHEMA_COMMENT = re.compile(r"ohlcv schema v(\d+)")
+STAGING_SUFFIX = '__migrating'
+
+
+class SchemaMigration:
+    """
+    Migrates one OHLCV table to SCHEMA_VERSION, keeping its engine (MergeTree or
+    ReplacingMergeTree). Materialized views reading the table follow the name, so rollups
+    keep being fed by the new table after the swap.
+    """
+
+    def __init__(self, clickhouse_client, table_name):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): Connection to the database holding the table.
+            table_name (str): The table to migrate.
+        """
+        self.clickhouse_client = clickhouse_client
+        self.client = clickhouse_client.client
+        self.table_name = table_name
+        self.staging_table = f"{table_name}{STAGING_SUFFIX}"
+        self._engine = None
+
+    def version(self, table_name=None):
+        """
+        Returns the schema version of a table, or None when the table does not exist.
+        """
+        result = self._query('table_schema', table_name=table_name or self.table_name)
+        if not result:
+            return None
+        match = SCHEMA_COMMENT.search(result[0][1] or '')
+        return int(match.group(1)) if match else 1
+
+    def migrate(self, since=None):
+        """
+        Creates the staging table with the current layout, if needed, and copies every
+        partition of the live table that the staging table does not hold yet.
+
+        Args:
+            since (str): Skip partitions before this one ('YYYYMM').
+
+        Returns:
+            int: The number of partitions copied.
+        """
+        current = self.version()
+        if current is None:
+            raise ValueError(f"Table '{self.table_name}' does not exist")
+        if current >= SCHEMA_VERSION:
+            console.info(f"Table '{self.table_name}' is already at schema v{current}, nothing to migrate.")
+            return 0
+
+        if self.version(self.staging_table) is None:
+            engine = self._query('table_schema', table_name=self.table_name)[0][0]
+            template = 'create_table_replacing' if engine.startswith('Replacing') else 'create_table'
+            self.client.command(self.clickhouse_client.read_sql(template).format(table_name=self.staging_table))
+            logger.info(f"Created {self.staging_table} (schema v{SCHEMA_VERSION}) for {self.table_name} (v{current}).")
+        return self.sync(since)
+
+    def sync(self, since=None):
+        """
+        Brings the staging table in line with the live table partition by partition: a partition
+        whose row count differs is dropped and copied again, so a repeated or interrupted run
+        never duplicates rows. Staging partitions that no longer exist in the live table are dropped.
+
+        Returns:
+            int: The number of partitions copied.
+        """
+        source = self._partition_rows(self.table_name)
+        target = self._partition_rows(self.staging_table)
+        stale = [p for p in source if source[p] != target.get(p) and (since is None or p >= since)]
+        for partition_id in set(target) - set(source):
+            self._drop_partition(partition_id)
+
+        logger.info(f"Copying {len(stale)} of {len(source)} partitions of {self.table_name} into {self.staging_table}.")
+        for i, partition_id in enumerate(stale, 1):
+            start = time.perf_counter()
+            if partition_id in target:
+                self._drop_partition(partition_id)
+            self.client.command(
+                self.clickhouse_client.read_sql('copy_partition'),
+                parameters={'target_table': self.staging_table, 'table_name': self.table_name,
+                            'partition_id': partition_id}
+            )
+            console.info(f"[{i}/{len(stale)}] partition {partition_id}: {source[partition_id]} rows copied "
+                  f"in {time.perf_counter() - start:.1f}s")
+        return len(stale)
+
+    def cutover(self):
+        """
+        Re-syncs partitions changed since the copy, checks that both tables hold the same
+        rows per partition and atomically swaps them.
+
+        Returns:
+            str: The name the previous table is kept under.
+        """
+        previous = self.version()
+        if self.version(self.staging_table) is None:
+            raise ValueError(f"No staging table '{self.staging_table}': run `migrate` first")
+        self.sync()
+        source, target = self._partition_rows(self.table_name), self._partition_rows(self.staging_table)
+        if source != target:
+            mismatched = sorted(p for p in set(source) | set(target) if source.get(p) != target.get(p))
+            raise RuntimeError(f"Partitions still differ after the final sync (is ingestion running?): {mismatched}")
+
+        backup_table = f"{self.table_name}__v{previous}"
+        self.client.command(self.clickhouse_client.read_sql('exchange_tables'),
+                            parameters={'table_name': self.table_name, 'other_table': self.staging_table})
+        self.client.command(self.clickhouse_client.read_sql('rename_table'),
+                            parameters={'table_name': self.staging_table, 'new_name': backup_table})
+        logger.info(f"Cut {self.table_name} over to schema v{SCHEMA_VERSION}; v{previous} kept as {backup_table}.")
+        return backup_table
+
+    def storage(self, table_name):
+        """
+        Returns the size of a table's active parts from system.parts: rows, parts,
+        bytes_on_disk, compressed_bytes and uncompressed_bytes.
+        """
+        keys = ('rows', 'parts', 'bytes_on_disk', 'compressed_bytes', 'uncompressed_bytes')
+        return dict(zip(keys, self._query('table_storage', table_name=table_name)[0]))
+
+    def scan_seconds(self, table_name, repeats=3):
+        """
+        Returns the best wall time of a full scan that decompresses every column.
+        """
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            self._query('scan_table', table_name=table_name)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def report(self, old_table, new_table):
+        """
+        Compares storage and scan time of the old and the new layout.
+
+        Returns:
+            dict: {table_name: storage dict plus 'version' and 'scan_seconds'}
+        """
+        report = {}
+        for table_name in (old_table, new_table):
+            report[table_name] = dict(self.storage(table_name), version=self.version(table_name),
+                                      scan_seconds=self.scan_seconds(table_name))
+        return report
+
+    def _partition_rows(self, table_name):
+        # A ReplacingMergeTree collapses duplicates whenever its parts merge, so the live table and
+        # the copy hold different raw row counts for the same candles; compare distinct candles instead
+        if self._replacing():
+            return dict(self._query('partition_keys', table_name=table_name))
+        return dict(self._query('partition_rows', table_name=table_name))
+
+    def _replacing(self):
+        if self._engine is None:
+            result = self._query('table_schema', table_name=self.table_name)
+            self._engine = result[0][0] if result else ''
+        return self._engine.startswith('Replacing')
+
+    def _drop_partition(self, partition_id):
+        self.client.command(self.clickhouse_client.read_sql('drop_partition'),
+                            parameters={'table_name': self.staging_table, 'partition_id': partition_id})
+
+    def _query(self, sql_name, **parameters):
+        return self.client.query(self.clickhouse_client.read_sql(sql_name), parameters=parameters).result_rows
+
+
+def print_report(report):
+    AppLogger.flush()
+    (old_table, old), (new_table, new) = report.items()
+    print(f"{'':<22}{old_table + ' (v' + str(old['version']) + ')':>28}{new_table + ' (v' + str(new['version']) + ')':>28}")
+    for key in ('rows', 'parts', 'bytes_on_disk', 'compressed_bytes', 'uncompressed_bytes'):
+        print(f"{key:<22}{old[key]:>28,}{new[key]:>28,}")
+    print(f"{'scan_seconds':<22}{old['scan_seconds']:>28.3f}{new['scan_seconds']:>28.3f}")
+    if new['bytes_on_disk']:
+        print(f"Bytes on disk: {old['bytes_on_disk'] / new['bytes_on_disk']:.2f}x smaller, "
+              f"scan: {old['scan_seconds'] / max(new['scan_seconds'], 1e-9):.2f}x faster.")
+
+
+if __name__ == '__main__':
+    from config.settings import Config
+    from src.ingestion.clickhouse import ClickhouseConnect
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['status', 'migrate', 'cutover', 'report'])
+    parser.add_argument('--table', default=None, help="table to migrate (default: CLICKHOUSE_TABLE)")
+    parser.add_argument('--since', default=None, help="first partition to copy, e.g. 202401")
+    args = parser.parse_args()
+
+    config = Config()
+    table_name = args.table or config.CLICKHOUSE_TABLE
+    migration = SchemaMigration(
+        ClickhouseConnect(config.CLICKHOUSE_HOST, config.CLICKHOUSE_USERNAME, config.CLICKHOUSE_PASSWORD,
+                          config.CLICKHOUSE_DATABASE, table_name),
+        table_name
+    )
+
+    if args.command == 'status':
+        for name in (table_name, migration.staging_table):
+            version = migration.version(name)
+            print(f"{name}: " + (f"schema v{version} ({SCHEMA_VERSIONS.get(version, 'unknown')})"
+                                 if version else "absent"))
+        print(f"Current schema: v{SCHEMA_VERSION}")
+    elif args.command == 'migrate':
+        migration.migrate(since=args.since)
+        if migration.version(migration.staging_table) is not None:
+            print_report(migration.report(table_name, migration.staging_table))
+    elif args.command == 'cutover':
+        backup_table = migration.cutover()
+        AppLogger.flush()
+        print(f"'{table_name}' now uses schema v{SCHEMA_VERSION}; the previous table is kept as '{backup_table}'.")
+        print_report(migration.report(backup_table, table_name))
+    else:
+        # After a cutover the old layout lives in the backup table, before it the new one is staged
+        candidates = [name for name in (migration.staging_table, *(f"{table_name}__v{v}" for v in SCHEMA_VERSIONS))
+                      if migration.version(name) is not None]
+        if not candidates:
+            raise SystemExit(f"Nothing to compare '{table_name}' with: run `migrate` first.")
+        other = candidates[0]
+        if other == migration.staging_table:
+            print_report(migration.report(table_name, other))
+        else:
+            print_report(migration.report(other, table_name))
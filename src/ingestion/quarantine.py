@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timezone
+import pandas as pd
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+
+def quarantine_table_name(table_name):
+    return f"{table_name}_quarantine"
+
+
+def quality_table_name(table_name):
+    return f"{table_name}_quality"
+
+
+class QuarantineWriter:
+    """
+    Writes the rows rejected by a QualityGate to <table>_quarantine in large batches, and the
+    per-ticker statistics of each run to <table>_quality. Both tables are created if missing.
+    """
+
+    def __init__(self, clickhouse_client, table_name, run_id, max_rows=100_000):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): The connection used for inserts.
+            table_name (str): The OHLCV table the checked rows were meant for.
+            run_id (str): Identifies the run in both tables.
+            max_rows (int): Flush once this many rejected rows are buffered.
+        """
+        self.clickhouse_client = clickhouse_client
+        self.quarantine_table = quarantine_table_name(table_name)
+        self.quality_table = quality_table_name(table_name)
+        self.run_id = run_id
+        self.max_rows = max_rows
+        self._frames = []
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        clickhouse_client.bootstrap(self.quarantine_table, 'create_quarantine_table')
+        clickhouse_client.bootstrap(self.quality_table, 'create_quality_table')
+
+    def add(self, rejected):
+        """
+        Buffers rejected rows (with 'reason_mask' and 'reasons' columns) and flushes when full.
+        """
+        with self._lock:
+            self._frames.append(rejected)
+            self._rows += len(rejected)
+            full = self._rows >= self.max_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows as a single insert.
+
+        Returns:
+            bool: True if the insert succeeded or there was nothing to write.
+        """
+        with self._flush_lock:
+            with self._lock:
+                frames, rows = self._frames, self._rows
+                self._frames, self._rows = [], 0
+            if not frames:
+                return True
+
+            batch = pd.concat(frames, ignore_index=True)
+            batch['run_id'] = self.run_id
+            if not self.clickhouse_client.push_frame(self.quarantine_table, batch, 'quarantine'):
+                logger.error(f"Quarantine insert of {rows} rejected rows into {self.quarantine_table} failed.")
+                return False
+            logger.info(f"Quarantined {rows} rows in {self.quarantine_table}.")
+            return True
+
+    def write_stats(self, report):
+        """
+        Writes a QualityGate report (one row of counters per ticker) for this run.
+        """
+        if report.empty:
+            return True
+        stats = report.copy()
+        stats.insert(0, 'checked_at', pd.Timestamp(datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)))
+        stats.insert(0, 'run_id', self.run_id)
+        stats = stats[['run_id', 'checked_at', 'ticker', *report.columns.drop('ticker')]]
+        if not self.clickhouse_client.push_frame(self.quality_table, stats, 'quality'):
+            logger.error(f"Writing quality statistics for {len(stats)} tickers to {self.quality_table} failed.")
+            return False
+        return True
@@ -0,0 +1 @@
+ALTER TABLE {table_name} ATTACH PARTITION ID {{partition_id:String}} FROM {staging_table}
@@ -0,0 +1,12 @@
+INSERT INTO {rollup_table}
+SELECT
+    ticker,
+    {bucket} AS bucket,
+    argMinState(open, timestamp) AS open,
+    max(high) AS high,
+    min(low) AS low,
+    argMaxState(close, timestamp) AS close,
+    sum(volume) AS volume
+FROM {table_name}
+WHERE _partition_id = {{partition_id:String}}
+GROUP BY ticker, bucket
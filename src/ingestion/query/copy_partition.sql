@@ -0,0 +1,5 @@
+INSERT INTO {target_table:Identifier}
+SELECT ticker, timestamp, open, high, low, close, volume
+FROM {table_name:Identifier}
+WHERE _partition_id = {partition_id:String}
+SETTINGS insert_deduplicate = 0
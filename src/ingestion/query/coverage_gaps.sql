@@ -0,0 +1,19 @@
+SELECT
+    ticker,
+    bitmapToArray(bitmapAndnot(
+        bitmapBuild(arrayFilter(
+            d -> (toDayOfWeek(toDate('1970-01-01') + d) <= 5 AND NOT has({holidays:Array(UInt32)}, d))
+                 OR has({extra_sessions:Array(UInt32)}, d),
+            range(toUInt32({start_date:Date}), toUInt32(toUInt32({end_date:Date}) + 1))
+        )),
+        covered_days
+    )) AS missing_days
+FROM
+(
+    SELECT
+        ticker,
+        groupBitmapState(toUInt32(toDate(timestamp))) AS covered_days
+    FROM {table_name:Identifier}
+    WHERE timestamp >= {start_date:Date}
+    GROUP BY ticker
+)
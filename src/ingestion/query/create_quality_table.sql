@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS {table_name}
+(
+    run_id LowCardinality(String),
+    checked_at DateTime('UTC'),
+    ticker LowCardinality(String),
+    rows UInt64,
+    accepted UInt64,
+    duplicate UInt64,
+    out_of_session UInt64,
+    misaligned UInt64,
+    ohlc_inconsistent UInt64,
+    non_positive_price UInt64,
+    zero_volume_padding UInt64,
+    out_of_order UInt64
+)
+ENGINE = MergeTree
+ORDER BY (run_id, ticker)
+SETTINGS non_replicated_deduplication_window = 1000;
@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS {table_name}
+(
+    ticker LowCardinality(String),
+    timestamp DateTime('UTC'),
+    open Float64,
+    high Float64,
+    low Float64,
+    close Float64,
+    volume UInt64,
+    reason_mask UInt16,
+    reasons LowCardinality(String),
+    run_id LowCardinality(String)
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(timestamp)
+ORDER BY (ticker, timestamp)
+SETTINGS non_replicated_deduplication_window = 1000;
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS {rollup_table}
+(
+    ticker LowCardinality(String),
+    bucket DateTime('UTC'),
+    open AggregateFunction(argMin, Float64, DateTime('UTC')),
+    high SimpleAggregateFunction(max, Float64),
+    low SimpleAggregateFunction(min, Float64),
+    close AggregateFunction(argMax, Float64, DateTime('UTC')),
+    volume SimpleAggregateFunction(sum, UInt64)
+)
+ENGINE = AggregatingMergeTree
+PARTITION BY toYYYYMM(bucket)
+ORDER BY (ticker, bucket);
@@ -0,0 +1,11 @@
+CREATE MATERIALIZED VIEW IF NOT EXISTS {view_name} TO {rollup_table} AS
+SELECT
+    ticker,
+    {bucket} AS bucket,
+    argMinState(open, timestamp) AS open,
+    max(high) AS high,
+    min(low) AS low,
+    argMaxState(close, timestamp) AS close,
+    sum(volume) AS volume
+FROM {table_name}
+GROUP BY ticker, bucket;
@@ -0,0 +1,16 @@
+CREATE TABLE IF NOT EXISTS {table_name}
+(
+    run_id String,
+    shard UInt16,
+    shard_count UInt16,
+    owner String,
+    status LowCardinality(String),
+    tickers_total UInt32,
+    tickers_done UInt32,
+    tickers_failed UInt32,
+    started_at DateTime64(3, 'UTC'),
+    updated_at DateTime64(3, 'UTC')
+)
+ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY (run_id, shard)
+TTL toDateTime(updated_at) + INTERVAL 30 DAY;
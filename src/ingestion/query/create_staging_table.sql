@@ -0,0 +1 @@
+CREATE TABLE IF NOT EXISTS {staging_table} AS {table_name}
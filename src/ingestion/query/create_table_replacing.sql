@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS {table_name}
+(
+    ticker LowCardinality(String),
+    timestamp DateTime('UTC') CODEC(DoubleDelta, ZSTD(1)),
+    open Float64 CODEC(Delta, ZSTD(1)),
+    high Float64 CODEC(Delta, ZSTD(1)),
+    low Float64 CODEC(Delta, ZSTD(1)),
+    close Float64 CODEC(Delta, ZSTD(1)),
+    volume UInt64 CODEC(T64, ZSTD(1))
+)
+ENGINE = ReplacingMergeTree
+PARTITION BY toYYYYMM(timestamp)
+ORDER BY (ticker, timestamp)
+SETTINGS index_granularity = 8192, non_replicated_deduplication_window = 1000
+COMMENT 'ohlcv schema v2';
@@ -0,0 +1 @@
+ALTER TABLE {table_name:Identifier} DROP PARTITION ID {partition_id:String}
@@ -0,0 +1 @@
+DROP TABLE IF EXISTS {table_name:Identifier}
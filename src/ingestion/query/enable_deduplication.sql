@@ -0,0 +1 @@
+ALTER TABLE {table_name:Identifier} MODIFY SETTING non_replicated_deduplication_window = 1000
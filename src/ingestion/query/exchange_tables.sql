@@ -0,0 +1 @@
+EXCHANGE TABLES {table_name:Identifier} AND {other_table:Identifier}
@@ -1,3 +1,3 @@
 SELECT max(timestamp) AS latest_timestamp
-FROM stock_ohlcv
-WHERE ticker = '{ticker}'
+FROM {table_name:Identifier}
+WHERE ticker = {ticker:String}
@@ -0,0 +1,4 @@
+SELECT ticker, max(timestamp) AS latest_timestamp
+FROM {table_name:Identifier}
+GROUP BY ticker
+SETTINGS optimize_aggregation_in_order = 1
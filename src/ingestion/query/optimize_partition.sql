@@ -0,0 +1 @@
+OPTIMIZE TABLE {table_name:Identifier} PARTITION ID {partition_id:String} FINAL
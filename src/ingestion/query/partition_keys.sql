@@ -0,0 +1,4 @@
+SELECT _partition_id AS partition_id, uniqExact(ticker, timestamp) AS rows
+FROM {table_name:Identifier}
+GROUP BY partition_id
+ORDER BY partition_id
@@ -0,0 +1,7 @@
+SELECT partition_id, sum(rows) AS rows
+FROM system.parts
+WHERE database = currentDatabase()
+  AND table = {table_name:String}
+  AND active
+GROUP BY partition_id
+ORDER BY partition_id
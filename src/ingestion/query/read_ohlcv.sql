@@ -0,0 +1,8 @@
+SELECT ticker, timestamp, open, high, low, close, volume
+FROM {table_name:Identifier}
+WHERE ticker IN {tickers:Array(String)}
+  AND timestamp >= {start:DateTime('UTC')}
+  AND timestamp < {end:DateTime('UTC')}
+  AND timestamp >= {starts:Array(DateTime('UTC'))}[indexOf({tickers:Array(String)}, ticker)]
+ORDER BY ticker, timestamp
+SETTINGS optimize_read_in_order = 1
@@ -0,0 +1,16 @@
+SELECT
+    ticker,
+    bucket AS timestamp,
+    argMinMerge(open) AS open,
+    max(high) AS high,
+    min(low) AS low,
+    argMaxMerge(close) AS close,
+    sum(volume) AS volume
+FROM {table_name:Identifier}
+WHERE ticker IN {tickers:Array(String)}
+  AND bucket >= {start:DateTime('UTC')}
+  AND bucket < {end:DateTime('UTC')}
+  AND bucket >= {starts:Array(DateTime('UTC'))}[indexOf({tickers:Array(String)}, ticker)]
+GROUP BY ticker, bucket
+ORDER BY ticker, bucket
+SETTINGS optimize_aggregation_in_order = 1
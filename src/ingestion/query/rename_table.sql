@@ -0,0 +1 @@
+RENAME TABLE {table_name:Identifier} TO {new_name:Identifier}
@@ -0,0 +1 @@
+ALTER TABLE {table_name} REPLACE PARTITION ID {{partition_id:String}} FROM {staging_table}
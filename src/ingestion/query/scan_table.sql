@@ -0,0 +1,3 @@
+SELECT count(), max(timestamp), sum(open + high + low + close), sum(volume)
+FROM {table_name:Identifier}
+SETTINGS use_query_cache = 0
@@ -0,0 +1,13 @@
+SELECT
+    shard,
+    argMax(owner, updated_at) AS latest_owner,
+    argMax(status, updated_at) AS latest_status,
+    argMax(tickers_total, updated_at) AS latest_tickers_total,
+    argMax(tickers_done, updated_at) AS latest_tickers_done,
+    argMax(tickers_failed, updated_at) AS latest_tickers_failed,
+    argMax(started_at, updated_at) AS latest_started_at,
+    max(updated_at) AS last_update
+FROM {table_name:Identifier}
+WHERE run_id = {run_id:String}
+GROUP BY shard
+ORDER BY shard
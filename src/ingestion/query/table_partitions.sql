@@ -0,0 +1,6 @@
+SELECT DISTINCT partition_id
+FROM system.parts
+WHERE database = currentDatabase()
+  AND table = {table_name:String}
+  AND active
+ORDER BY partition_id
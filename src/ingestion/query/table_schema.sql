@@ -0,0 +1,4 @@
+SELECT engine, comment
+FROM system.tables
+WHERE database = currentDatabase()
+  AND name = {table_name:String}
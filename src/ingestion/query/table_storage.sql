@@ -0,0 +1,10 @@
+SELECT
+    sum(rows) AS rows,
+    count() AS parts,
+    sum(bytes_on_disk) AS bytes_on_disk,
+    sum(data_compressed_bytes) AS compressed_bytes,
+    sum(data_uncompressed_bytes) AS uncompressed_bytes
+FROM system.parts
+WHERE database = currentDatabase()
+  AND table = {table_name:String}
+  AND active
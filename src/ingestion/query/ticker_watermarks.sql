@@ -0,0 +1,4 @@
+SELECT ticker, max(timestamp) AS latest_timestamp
+FROM {table_name:Identifier}
+WHERE ticker IN {tickers:Array(String)}
+GROUP BY ticker
@@ -0,0 +1,311 @@
+"""
+Read API for stored candles: streams (tickers, time range, interval) queries back out as Arrow
+record batches or NumPy arrays, and builds multi-ticker panels in a single query.
+
+    from src.ingestion.reader import OhlcvReader
+    reader = OhlcvReader(clickhouse_client)
+    for batch in reader.stream(['reliance', 'tcs'], '2024-01-01', '2024-07-01'):
+        ...
+    panel = reader.read_panel(['reliance', 'tcs'], '2024-01-01', '2024-07-01', interval='1d')
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.ingestion.clickhouse import ROLLUP_BUCKETS, interval_table_name, rollup_table_name
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+# Schema of everything the reader returns. ClickHouse sends DateTime as UInt32 seconds in Arrow,
+# so timestamps are re-typed on arrival (a zero-copy cast).
+READ_ARROW_SCHEMA = pa.schema([
+    ('ticker', pa.string()),
+    ('timestamp', pa.timestamp('s', tz='UTC')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.uint64()),
+])
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+class PartitionCache:
+    """
+    A thread-safe LRU of past-month slices (one Arrow table per table, ticker and month),
+    bounded by the Arrow buffer size of its entries.
+
+    A month is only cached once the ticker's ingestion watermark has moved past it, after which
+    the regular pipeline never writes to it again. Each entry remembers the watermark it was
+    cached under and is dropped when the current watermark no longer covers the month, or
+    moved backwards (the table was truncated or rebuilt). Holes repaired later by a gap
+    backfill do not move the watermark; call `invalidate` after such a backfill.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, watermark):
+        """
+        Returns the cached table of `key` = (table, ticker, month), or None when it is absent or
+        no longer valid for the ticker's current `watermark`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                table, cached_watermark = entry
+                if watermark is not None and watermark >= cached_watermark and next_month(key[2]) <= watermark:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return table
+                self._pop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, table, watermark):
+        if table.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (table, watermark)
+            self.bytes += table.nbytes
+            while self.bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, table_name=None, tickers=None):
+        """
+        Drops the cached months of the given table and/or tickers (everything by default).
+        """
+        tickers = set(tickers) if tickers is not None else None
+        with self._lock:
+            for key in list(self._entries):
+                if (table_name is None or key[0] == table_name) and (tickers is None or key[1] in tickers):
+                    self._pop(key)
+
+    def _pop(self, key):
+        table, _ = self._entries.pop(key)
+        self.bytes -= table.nbytes
+
+
+class OhlcvReader:
+    """
+    Reads candles of the one-minute table, its interval tables (e.g. 'ONE_DAY') and its rollups
+    (e.g. '5m'). Queries filter on the (ticker, timestamp) primary key, so only the granules of
+    the requested tickers and range are read, and several tickers are fetched in one query.
+
+    Months before the month of a ticker's latest stored candle are immutable; they are served
+    from a local `PartitionCache` and only the uncached months and the recent tail are queried.
+    """
+
+    def __init__(self, clickhouse_client, cache_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            clickhouse_client (ClickhouseConnect): Connection to the database of the one-minute table.
+            cache_bytes (int): Size of the past-month cache; 0 disables caching.
+        """
+        self.clickhouse_client = clickhouse_client
+        self.table_name = clickhouse_client.table_name
+        self.cache = PartitionCache(cache_bytes) if cache_bytes else None
+
+    def stream(self, tickers, start, end, interval='ONE_MINUTE'):
+        """
+        Streams the candles of `tickers` in [start, end) as Arrow record batches with
+        READ_ARROW_SCHEMA. Cached and newly cached past months come first, then the recent rows;
+        each part is ordered by (ticker, timestamp).
+
+        Args:
+            tickers (str | list): One ticker or several.
+            start (datetime | date | str): First timestamp (inclusive).
+            end (datetime | date | str): Last timestamp (exclusive).
+            interval (str): An API interval ('ONE_MINUTE', 'ONE_DAY', ...) or a rollup ('5m', '1h', ...).
+
+        Yields:
+            pyarrow.RecordBatch: The candles, block by block.
+        """
+        tickers = [tickers] if isinstance(tickers, str) else list(dict.fromkeys(tickers))
+        start, end = self._as_datetime(start), self._as_datetime(end)
+        if not tickers or start >= end:
+            return
+        table_name, sql_name = self._resolve(interval)
+
+        # Rows before a ticker's horizon are immutable and go through the cache
+        watermarks, horizons = {}, {}
+        if self.cache is not None:
+            watermark_table = self.table_name if sql_name == 'read_rollup' else table_name
+            watermarks = self.clickhouse_client.get_latest_timestamps(tickers, watermark_table)
+            horizons = {ticker: min(month_start(watermark), end) for ticker, watermark in watermarks.items()}
+
+        missing = {}
+        for ticker in tickers:
+            month = month_start(start)
+            while month < horizons.get(ticker, start):
+                cached = self.cache.get((table_name, ticker, month), watermarks[ticker])
+                if cached is None:
+                    missing.setdefault(ticker, []).append(month)
+                else:
+                    yield from self._trim(cached, start, end).to_batches()
+                month = next_month(month)
+
+        if missing:
+            yield from self._fetch_months(table_name, sql_name, missing, watermarks, start, end).to_batches()
+
+        live = {ticker: max(start, horizons.get(ticker, start)) for ticker in tickers}
+        live = {ticker: ticker_start for ticker, ticker_start in live.items() if ticker_start < end}
+        if live:
+            yield from self._query(table_name, sql_name, live, end)
+
+    def read_arrow(self, tickers, start, end, interval='ONE_MINUTE'):
+        """
+        Returns the candles of `tickers` in [start, end) as one Arrow table sorted by
+        (ticker, timestamp). See `stream` for the arguments.
+        """
+        table = pa.Table.from_batches(list(self.stream(tickers, start, end, interval)), schema=READ_ARROW_SCHEMA)
+        return table.sort_by([('ticker', 'ascending'), ('timestamp', 'ascending')])
+
+    def read_numpy(self, tickers, start, end, interval='ONE_MINUTE'):
+        """
+        Returns the candles of `tickers` in [start, end) as NumPy columns sorted by
+        (ticker, timestamp): 'ticker' (object), 'timestamp' (datetime64[s], UTC), 'open',
+        'high', 'low', 'close' (float64) and 'volume' (uint64).
+
+        Returns:
+            dict: {column: np.ndarray}
+        """
+        table = self.read_arrow(tickers, start, end, interval)
+        return {name: table.column(name).to_numpy() for name in READ_ARROW_SCHEMA.names}
+
+    def read_panel(self, tickers, start, end, interval='ONE_MINUTE', fields=('close',)):
+        """
+        Fetches several tickers in one query and aligns them on a shared time axis.
+
+        Args:
+            fields (tuple): Columns to pivot ('open', 'high', 'low', 'close', 'volume').
+
+        Returns:
+            dict: 'timestamps' (datetime64[s], the union of all candle times), 'tickers' (the column
+                  order) and, per field, a float64 array of shape (len(timestamps), len(tickers))
+                  with NaN where a ticker has no candle.
+        """
+        tickers = [tickers] if isinstance(tickers, str) else list(dict.fromkeys(tickers))
+        for field in fields:
+            if field not in READ_ARROW_SCHEMA.names[2:]:
+                raise ValueError(f"Invalid panel field: {field}. Expected one of {READ_ARROW_SCHEMA.names[2:]}")
+        table = pa.Table.from_batches(list(self.stream(tickers, start, end, interval)), schema=READ_ARROW_SCHEMA)
+
+        times = table.column('timestamp').to_numpy()
+        timestamps = np.unique(times)
+        rows = np.searchsorted(timestamps, times)
+        columns = pc.index_in(table.column('ticker'), value_set=pa.array(tickers, pa.string())).to_numpy()
+        panel = {'timestamps': timestamps, 'tickers': tickers}
+        for field in fields:
+            matrix = np.full((len(timestamps), len(tickers)), np.nan)
+            matrix[rows, columns] = table.column(field).to_numpy()
+            panel[field] = matrix
+        return panel
+
+    def invalidate(self, tickers=None, interval=None):
+        """
+        Drops cached months, e.g. after a gap backfill rewrote history of `tickers`.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self._resolve(interval)[0] if interval else None, tickers)
+
+    def _resolve(self, interval):
+        """
+        Returns the table and the read query of an API interval or a rollup.
+        """
+        if interval in ROLLUP_BUCKETS:
+            return rollup_table_name(self.table_name, interval), 'read_rollup'
+        return interval_table_name(self.table_name, interval.upper()), 'read_ohlcv'
+
+    def _query(self, table_name, sql_name, starts, end):
+        """
+        Streams one range query over several tickers, each from its own start time.
+        """
+        tickers = list(starts)
+        parameters = {
+            'table_name': table_name,
+            'tickers': tickers,
+            'starts': [starts[ticker] for ticker in tickers],
+            'start': min(starts.values()),
+            'end': end,
+        }
+        stream = self.clickhouse_client.client.query_arrow_stream(
+            self.clickhouse_client.read_sql(sql_name), parameters=parameters, use_strings=True
+        )
+        with stream:
+            for batch in stream:
+                yield self._normalize(batch)
+
+    def _fetch_months(self, table_name, sql_name, missing, watermarks, start, end):
+        """
+        Fetches the uncached past months of several tickers in one query, caches every
+        requested (ticker, month), including empty ones, and returns the rows within [start, end).
+        """
+        first = min(months[0] for months in missing.values())
+        last = next_month(max(months[-1] for months in missing.values()))
+        table = pa.Table.from_batches(
+            list(self._query(table_name, sql_name, {ticker: first for ticker in missing}, last)),
+            schema=READ_ARROW_SCHEMA
+        )
+        tickers = table.column('ticker').to_numpy()
+        times = table.column('timestamp').to_numpy()
+
+        parts = []
+        for ticker, months in missing.items():
+            lo, hi = np.searchsorted(tickers, ticker, 'left'), np.searchsorted(tickers, ticker, 'right')
+            bounds = np.array([months[0], *map(next_month, months)], dtype='datetime64[s]')
+            offsets = lo + np.searchsorted(times[lo:hi], bounds)
+            for month, begin, stop in zip(months, offsets[:-1], offsets[1:]):
+                part = table.slice(begin, stop - begin)
+                self.cache.put((table_name, ticker, month), part, watermarks[ticker])
+                parts.append(self._trim(part, start, end))
+        logger.debug(f"Cached {sum(map(len, missing.values()))} months of {len(missing)} tickers from {table_name}.")
+        return pa.concat_tables(parts) if parts else table.slice(0, 0)
+
+    @staticmethod
+    def _normalize(batch):
+        columns = [
+            batch.column(0).cast(pa.string()),
+            batch.column(1).cast(pa.int64()).cast(pa.timestamp('s', tz='UTC')),
+            *(batch.column(i).cast(READ_ARROW_SCHEMA.field(i).type) for i in range(2, 7)),
+        ]
+        return pa.RecordBatch.from_arrays(columns, schema=READ_ARROW_SCHEMA)
+
+    @staticmethod
+    def _trim(table, start, end):
+        """
+        Returns the rows of a (ticker-sorted, then time-sorted) month slice inside [start, end).
+        """
+        times = table.column('timestamp').to_numpy()
+        lo, hi = np.searchsorted(times, np.array([start, end], dtype='datetime64[s]'))
+        return table.slice(lo, hi - lo)
+
+    @staticmethod
+    def _as_datetime(value):
+        """
+        Returns a naive UTC datetime, the form candle timestamps are stored and compared in.
+        """
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
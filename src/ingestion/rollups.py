@@ -0,0 +1,68 @@
+"""
+Fills the materialized-view rollups of the one-minute table for history stored before the
+views existed, one monthly partition at a time.
+
+Usage:
+    python -m src.ingestion.rollups                  # every rollup, every partition
+    python -m src.ingestion.rollups --rollups 5m 1d --since 202401
+
+Each partition is rebuilt from scratch (drop + INSERT ... SELECT), so the command can be
+re-run safely. Run it while no ingestion is writing into the months being rebuilt, otherwise
+rows inserted during a rebuild may be counted twice.
+"""
+import argparse
+import time
+from src.ingestion.clickhouse import ROLLUP_BUCKETS
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+
+def backfill_rollups(clickhouse_client, table_name, rollups=tuple(ROLLUP_BUCKETS), since=None):
+    """
+    Rebuilds the given rollups partition by partition from `table_name`.
+
+    Args:
+        clickhouse_client (ClickhouseConnect): Connection to the database holding the tables.
+        table_name (str): The one-minute source table.
+        rollups (iterable): Keys of ROLLUP_BUCKETS to rebuild.
+        since (str): Skip partitions before this one ('YYYYMM').
+
+    Returns:
+        int: The number of partitions rebuilt.
+    """
+    for rollup in rollups:
+        clickhouse_client.create_rollup(table_name, rollup)
+
+    partitions = [p for p in clickhouse_client.get_partitions(table_name) if since is None or p >= since]
+    logger.info(f"Backfilling rollups {', '.join(rollups)} of {table_name} over {len(partitions)} partitions.")
+    for i, partition_id in enumerate(partitions, 1):
+        start = time.perf_counter()
+        for rollup in rollups:
+            clickhouse_client.backfill_rollup_partition(table_name, rollup, partition_id)
+        console.info(f"[{i}/{len(partitions)}] partition {partition_id} rolled up in {time.perf_counter() - start:.1f}s")
+    return len(partitions)
+
+
+if __name__ == '__main__':
+    from config.settings import Config
+    from src.ingestion.clickhouse import ClickhouseConnect
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rollups', nargs='+', choices=list(ROLLUP_BUCKETS), default=None)
+    parser.add_argument('--since', default=None, help="first partition to rebuild, e.g. 202401")
+    args = parser.parse_args()
+
+    config = Config()
+    rollups = args.rollups or config.CLICKHOUSE_ROLLUPS
+    clickhouse = ClickhouseConnect(
+        host=config.CLICKHOUSE_HOST,
+        username=config.CLICKHOUSE_USERNAME,
+        password=config.CLICKHOUSE_PASSWORD,
+        database=config.CLICKHOUSE_DATABASE,
+        table_name=config.CLICKHOUSE_TABLE,
+        table_engine=config.CLICKHOUSE_TABLE_ENGINE,
+        rollups=rollups
+    )
+    backfill_rollups(clickhouse, config.CLICKHOUSE_TABLE, rollups, since=args.since)
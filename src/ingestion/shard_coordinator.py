@@ -0,0 +1,221 @@
+"""
+Sharded API ingestion: every shard owns the tickers whose scrip token hashes onto it and
+reports its progress to a small ClickHouse coordination table.
+
+Report on a sharded run (dead shards can be restarted anywhere, or picked up with
+`python main.py --shard auto/<n> --run-id <run_id>`):
+    python -m src.ingestion.shard_coordinator --run-id 20250101 --shards 8
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+
+def shard_of(exchange, token, shard_count):
+    """
+    Returns the 1-based shard owning a scrip token. CRC32 is stable across processes and
+    hosts (unlike Python's salted hash), so every worker computes the same assignment.
+    """
+    return zlib.crc32(f"{exchange}:{token}".encode('utf-8')) % shard_count + 1
+
+
+class ShardSpec:
+    """
+    A parsed `--shard k/n` argument: shard k (1-based) of n, or `auto/n` to claim the first
+    shard that is pending or whose worker has died.
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or (index is not None and not 1 <= index <= count):
+            raise ValueError(f"Invalid shard {index}/{count}: expected 1 <= k <= n")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value):
+        try:
+            index, count = value.split('/')
+            return cls(None if index == 'auto' else int(index), int(count))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{value}': expected 'k/n' or 'auto/n'") from None
+
+    def owns(self, exchange, token):
+        return shard_of(exchange, token, self.count) == self.index
+
+    def __str__(self):
+        return f"{self.index or 'auto'}/{self.count}"
+
+
+class ShardCoordinator:
+    """
+    Tracks shards of one run in a ReplacingMergeTree coordination table. A running shard
+    writes a heartbeat row every `heartbeat_seconds` with its ticker counters; a running shard
+    whose last heartbeat is older than `stale_seconds` is reported as dead and may be claimed
+    by another worker. Work is resumable, so a re-assigned shard continues from the stored
+    watermarks of its tickers.
+    """
+
+    def __init__(self, clickhouse_client, run_id, shard_count, table_name='ingest_shards',
+                 stale_seconds=300, heartbeat_seconds=30):
+        self.clickhouse_client = clickhouse_client
+        self.run_id = run_id
+        self.shard_count = shard_count
+        self.table_name = table_name
+        self.stale_seconds = stale_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.shard = None
+        self._counters = {'tickers_total': 0, 'tickers_done': 0, 'tickers_failed': 0}
+        self._started_at = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = None
+
+        self.clickhouse_client.bootstrap(table_name, 'create_shard_table')
+
+    def status(self):
+        """
+        Returns the state of every shard of the run, including shards that never reported
+        ('pending') and running shards without a recent heartbeat ('dead').
+
+        Returns:
+            list: One dict per shard with shard, owner, status, ticker counters and timestamps.
+        """
+        reported = {row['shard']: row for row in self.clickhouse_client.get_shard_status(self.table_name, self.run_id)}
+        now = datetime.now(timezone.utc)
+        shards = []
+        for shard in range(1, self.shard_count + 1):
+            row = reported.get(shard)
+            if row is None:
+                shards.append({'shard': shard, 'owner': '', 'status': 'pending', 'tickers_total': 0,
+                               'tickers_done': 0, 'tickers_failed': 0, 'started_at': None, 'updated_at': None})
+                continue
+            row = dict(row, updated_at=self._utc(row['updated_at']), started_at=self._utc(row['started_at']))
+            if row['status'] == 'running' and (now - row['updated_at']).total_seconds() > self.stale_seconds:
+                row['status'] = 'dead'
+            shards.append(row)
+        return shards
+
+    def claim(self, shard=None, settle_seconds=2.0):
+        """
+        Claims a shard for this worker. Without an explicit shard, the first pending, dead or
+        failed shard is claimed. Concurrent claims are resolved by re-reading the table after
+        `settle_seconds`: the latest claim row wins and the other workers try the next shard.
+
+        Returns:
+            int: The claimed shard.
+
+        Raises:
+            RuntimeError: If no shard is available.
+        """
+        if shard is not None:
+            self._write('running', shard)
+            self.shard = shard
+            return shard
+
+        for candidate in self.status():
+            if candidate['status'] not in ('pending', 'dead', 'failed'):
+                continue
+            self._write('running', candidate['shard'])
+            time.sleep(settle_seconds)
+            current = next(s for s in self.status() if s['shard'] == candidate['shard'])
+            if current['owner'] == self.owner:
+                logger.info(f"Claimed shard {candidate['shard']}/{self.shard_count} of run {self.run_id} "
+                            f"(was {candidate['status']}).")
+                self.shard = candidate['shard']
+                return self.shard
+            logger.info(f"Shard {candidate['shard']} was claimed by {current['owner']}, trying the next one.")
+        raise RuntimeError(f"No pending or dead shard left in run {self.run_id}")
+
+    def start(self, tickers_total):
+        """
+        Records the size of the claimed shard and starts the heartbeat thread.
+        """
+        with self._lock:
+            self._counters = {'tickers_total': tickers_total, 'tickers_done': 0, 'tickers_failed': 0}
+        self._write('running', self.shard)
+        self._heartbeat = threading.Thread(target=self._beat, name="shard-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def record(self, ticker, error=None):
+        """
+        Counts one finished ticker. Passed to the ingestors as their completion callback.
+        """
+        with self._lock:
+            self._counters['tickers_failed' if error is not None else 'tickers_done'] += 1
+
+    def finish(self, failed=False):
+        """
+        Stops the heartbeat and records the final state of the shard.
+        """
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        self._write('failed' if failed else 'finished', self.shard)
+
+    def _beat(self):
+        while not self._stopped.wait(self.heartbeat_seconds):
+            try:
+                self._write('running', self.shard)
+            except Exception as e:
+                logger.warning(f"Shard heartbeat failed: {e}")
+
+    def _write(self, status, shard):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            if self._started_at is None or self.shard != shard:
+                self._started_at = now
+            progress = dict(self._counters)
+        progress.update({
+            'run_id': self.run_id,
+            'shard': shard,
+            'shard_count': self.shard_count,
+            'owner': self.owner,
+            'status': status,
+            'started_at': self._started_at,
+            'updated_at': now,
+        })
+        self.clickhouse_client.record_shard_progress(self.table_name, progress)
+
+    @staticmethod
+    def _utc(value):
+        if value is None or value.tzinfo is not None:
+            return value
+        return value.replace(tzinfo=timezone.utc)
+
+
+if __name__ == '__main__':
+    from config.settings import Config
+    from src.ingestion.clickhouse import ClickhouseConnect
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--run-id', required=True)
+    parser.add_argument('--shards', type=int, required=True)
+    args = parser.parse_args()
+
+    config = Config()
+    coordinator = ShardCoordinator(
+        ClickhouseConnect(config.CLICKHOUSE_HOST, config.CLICKHOUSE_USERNAME, config.CLICKHOUSE_PASSWORD,
+                          config.CLICKHOUSE_DATABASE, config.CLICKHOUSE_TABLE),
+        args.run_id, args.shards, table_name=config.CLICKHOUSE_SHARD_TABLE,
+        stale_seconds=config.SHARD_STALE_SECONDS
+    )
+    shards = coordinator.status()
+    total = sum(s['tickers_total'] for s in shards)
+    done = sum(s['tickers_done'] + s['tickers_failed'] for s in shards)
+    for s in shards:
+        print(f"shard {s['shard']:>3}/{args.shards}  {s['status']:<8}  "
+              f"{s['tickers_done']}/{s['tickers_total']} done, {s['tickers_failed']} failed  "
+              f"{s['owner']}  last update {s['updated_at'] or '-'}")
+    print(f"Run {args.run_id}: {done}/{total} tickers processed across {args.shards} shards.")
+    dead = [str(s['shard']) for s in shards if s['status'] in ('dead', 'pending', 'failed')]
+    if dead:
+        print(f"Shards to (re)assign: {', '.join(dead)}")
@@ -0,0 +1,216 @@
+import queue
+import threading
+import time
+import zlib
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+console = AppLogger.get_console()
+
+# Marks the end of a stage's input
+_STOP = object()
+
+
+class StagedPipeline:
+    """
+    Runs API ingestion as three overlapping stages connected by bounded queues:
+
+        fetch (N threads) -> raw queue -> preprocess (M threads) -> frame queue -> insert (K threads)
+
+    Fetchers walk each ticker's request windows through the shared rate-limited client while
+    earlier windows are being preprocessed and inserted. When the database falls behind, the
+    frame queue fills up, preprocessors block on it, the raw queue fills up and fetchers
+    block in turn, so memory in flight is capped by the two queue sizes.
+
+    Each preprocess and insert thread reads its own queue, and a ticker always goes through the
+    same lane (crc32 of the ticker), so its windows are preprocessed and stored in fetch order.
+    Once a window of a ticker fails, its later windows are dropped, so nothing is stored past
+    the failed window.
+
+    On KeyboardInterrupt or a stage error, fetchers stop picking up new tickers and windows,
+    and everything already queued is still preprocessed and inserted before `run` returns.
+    """
+
+    def __init__(self, single_ingestor, fetch_workers=4, preprocess_workers=2, insert_workers=1, queue_size=64):
+        self.single_ingestor = single_ingestor
+        self.fetch_workers = max(1, int(fetch_workers))
+        self.preprocess_workers = max(1, int(preprocess_workers))
+        self.insert_workers = max(1, int(insert_workers))
+        self.queue_size = queue_size
+
+        self._stop = threading.Event()
+        self._failures = {}
+        self._failures_lock = threading.Lock()
+        self._stage_seconds = {'fetch': 0.0, 'preprocess': 0.0, 'insert': 0.0}
+        self._on_ticker_done = None
+        self._stats_lock = threading.Lock()
+
+    def run(self, angelone_client, tickers, on_ticker_done=None):
+        """
+        Ingests every ticker through the staged pipeline.
+
+        Args:
+            angelone_client (AngelOneApiClient): The shared, rate-limited API client.
+            tickers (list): A list of (ticker_token, ticker, exchange) tuples.
+            on_ticker_done (callable): Called with (ticker, exception or None) once all windows of a
+                                       ticker have been fetched and queued.
+
+        Returns:
+            dict: {ticker: exception} for every ticker that failed. Empty if all succeeded.
+        """
+        self._on_ticker_done = on_ticker_done
+        ticker_queue = queue.Queue()
+        for item in tickers:
+            ticker_queue.put(item)
+        raw_queues = self._lanes(self.preprocess_workers)
+        frame_queues = self._lanes(self.insert_workers)
+
+        fetchers = self._start('fetch', self.fetch_workers, self._fetch_worker, angelone_client, ticker_queue, raw_queues)
+        preprocessors = self._start_lanes('preprocess', self._preprocess_worker, raw_queues, frame_queues)
+        inserters = self._start_lanes('insert', self._insert_worker, frame_queues)
+
+        logger.info(f"Staged pipeline started for {len(tickers)} tickers "
+                    f"({self.fetch_workers} fetch / {self.preprocess_workers} preprocess / {self.insert_workers} insert).")
+        try:
+            self._join(fetchers)
+        finally:
+            # Drain: every queued window still flows through the remaining stages
+            for raw_queue in raw_queues:
+                raw_queue.put(_STOP)
+            self._join(preprocessors)
+            for frame_queue in frame_queues:
+                frame_queue.put(_STOP)
+            self._join(inserters)
+
+        logger.info(f"Staged pipeline finished: {len(tickers) - len(self._failures)}/{len(tickers)} tickers, "
+                    f"stage seconds {', '.join(f'{k}={v:.1f}' for k, v in self._stage_seconds.items())}.")
+        if self._failures:
+            console.error(f"{len(self._failures)} tickers failed: {', '.join(sorted(self._failures))}")
+        return dict(self._failures)
+
+    def stop(self):
+        """
+        Asks the fetch stage to stop; queued work is still drained.
+        """
+        self._stop.set()
+
+    def _start(self, stage, count, target, *args):
+        threads = [
+            threading.Thread(target=self._guard, args=(stage, target, *args), name=f"{stage}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _start_lanes(self, stage, target, lanes, *args):
+        threads = [
+            threading.Thread(target=self._guard, args=(stage, target, lane, *args), name=f"{stage}-{i}", daemon=True)
+            for i, lane in enumerate(lanes)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _lanes(self, count):
+        # The queue size is shared by the lanes of a stage, keeping memory in flight unchanged
+        return [queue.Queue(maxsize=max(1, self.queue_size // count)) for _ in range(count)]
+
+    @staticmethod
+    def _lane(lanes, ticker):
+        return lanes[zlib.crc32(ticker.encode()) % len(lanes)]
+
+    def _failed(self, ticker):
+        with self._failures_lock:
+            return ticker in self._failures
+
+    def _join(self, threads):
+        # Joining with a timeout keeps the main thread responsive to KeyboardInterrupt
+        for thread in threads:
+            while thread.is_alive():
+                try:
+                    thread.join(timeout=0.5)
+                except KeyboardInterrupt:
+                    console.warning("Interrupted, draining queued work before shutdown...")
+                    self.stop()
+
+    def _guard(self, stage, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            logger.error(f"{stage} stage crashed, stopping pipeline: {e}", exc_info=True)
+            self.stop()
+
+    def _record_failure(self, ticker, error):
+        with self._failures_lock:
+            self._failures.setdefault(ticker, error)
+
+    def _add_time(self, stage, seconds):
+        with self._stats_lock:
+            self._stage_seconds[stage] += seconds
+
+    def _fetch_worker(self, angelone_client, ticker_queue, raw_queues):
+        while not self._stop.is_set():
+            try:
+                ticker_token, ticker, exchange = ticker_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                last_date, known_boundary = self.single_ingestor.get_start_boundary(ticker)
+                windows = self.single_ingestor.iter_raw_windows(
+                    angelone_client, ticker_token, ticker, last_date, known_boundary, exchange
+                )
+                raw_queue = self._lane(raw_queues, ticker)
+                start = time.perf_counter()
+                for _, _, raw_data in windows:
+                    self._add_time('fetch', time.perf_counter() - start)
+                    if raw_data.get('data'):
+                        raw_queue.put((ticker, raw_data['data']))  # Blocks while preprocessing is behind
+                    if self._stop.is_set() or self._failed(ticker):
+                        break
+                    start = time.perf_counter()
+                with self._failures_lock:
+                    error = self._failures.get(ticker)
+            except Exception as e:
+                error = e
+                self._record_failure(ticker, e)
+                logger.error(f"Fetching failed for {ticker}: {e}", exc_info=True)
+            if self._on_ticker_done is not None:
+                self._on_ticker_done(ticker, error)
+
+    def _preprocess_worker(self, raw_queue, frame_queues):
+        while True:
+            item = raw_queue.get()
+            if item is _STOP:
+                return
+            ticker, data = item
+            if self._failed(ticker):
+                continue
+            start = time.perf_counter()
+            try:
+                processed = self.single_ingestor.preprocess_class.preprocess_data(data, ticker)
+            except Exception as e:
+                self._record_failure(ticker, e)
+                logger.error(f"Preprocessing failed for {ticker}: {e}", exc_info=True)
+                continue
+            finally:
+                self._add_time('preprocess', time.perf_counter() - start)
+            self._lane(frame_queues, ticker).put((ticker, processed))  # Blocks while inserts are behind
+
+    def _insert_worker(self, frame_queue):
+        while True:
+            item = frame_queue.get()
+            if item is _STOP:
+                return
+            ticker, processed = item
+            if self._failed(ticker):
+                continue
+            start = time.perf_counter()
+            try:
+                self.single_ingestor.store(processed, ticker)
+            except Exception as e:
+                self._record_failure(ticker, e)
+                logger.error(f"Insert failed for {ticker}: {e}", exc_info=True)
+            finally:
+                self._add_time('insert', time.perf_counter() - start)
@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from datetime import time as dtime
+from src.ingestion.clickhouse import ASYNC_INSERT_SETTINGS
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+# Broker candles are stamped in exchange-local wall time
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+# Keep sweeping briefly after the close so the last candle of the day is picked up
+CLOSE_GRACE = timedelta(minutes=2)
+
+
+class IntradayTailer:
+    """
+    Keeps one-minute tables current during market hours from a single resident process.
+
+    Every `cadence_seconds` a sweep requests, for each ticker, only the completed candles after
+    its in-memory watermark (loaded once with a single query, then advanced by every insert),
+    so a sweep usually asks for the last few minutes and a slow sweep never leaves a gap. The
+    API session is reused across sweeps and renewed with the refresh token before it expires.
+    Deltas are written every `flush_seconds` through ClickHouse async inserts, which batch
+    the many small inserts server-side.
+    """
+
+    def __init__(self, single_ingestor, angelone_client, calendar, cadence_seconds=60, flush_seconds=5,
+                 max_workers=4, session_refresh_seconds=6 * 3600):
+        """
+        Args:
+            single_ingestor (SingleTickerIngestor): Ingestor of the one-minute table.
+            angelone_client (AngelOneApiClient): The shared, rate-limited API client.
+            calendar (TradingCalendar): Trading days; sweeps only run on sessions.
+            cadence_seconds (float): Time between the starts of two sweeps.
+            flush_seconds (float): Longest time fetched candles wait before they are inserted.
+            max_workers (int): Tickers requested concurrently (the rate limiter still applies).
+            session_refresh_seconds (float): Session age at which the JWT is renewed.
+        """
+        self.single_ingestor = single_ingestor
+        self.angelone_client = angelone_client
+        self.calendar = calendar
+        self.cadence_seconds = cadence_seconds
+        self.flush_seconds = flush_seconds
+        self.max_workers = max(1, int(max_workers))
+        self.session_refresh_seconds = session_refresh_seconds
+        self._stop = threading.Event()
+
+    def run(self, tickers, max_sweeps=None):
+        """
+        Sweeps the universe on every cadence tick of every trading session until stopped.
+
+        Args:
+            tickers (list): A list of (ticker_token, ticker, exchange) tuples.
+            max_sweeps (int): Stop after this many sweeps (runs indefinitely when None).
+        """
+        if self.single_ingestor.watermarks is None:
+            self.single_ingestor.load_watermarks()
+        logger.info(f"Tailing {len(tickers)} tickers every {self.cadence_seconds}s during market hours.")
+
+        sweeps = 0
+        while not self._stop.is_set() and (max_sweeps is None or sweeps < max_sweeps):
+            now = self.now()
+            if not self.in_session(now):
+                wait = (self.next_open(now) - now).total_seconds()
+                logger.info(f"Market closed, next sweep at {now + timedelta(seconds=wait):%Y-%m-%d %H:%M} IST.")
+                # Wake up at least hourly so that a stop request or a clock change is noticed
+                self._stop.wait(min(max(wait, 1), 3600))
+                continue
+
+            started = time.monotonic()
+            self.angelone_client.ensure_session(self.session_refresh_seconds)
+            rows = self.sweep(tickers, now)
+            sweeps += 1
+            elapsed = time.monotonic() - started
+            logger.info(f"Tail sweep {sweeps} stored {rows} rows in {elapsed:.1f}s.")
+            if elapsed > self.cadence_seconds:
+                logger.warning(f"Tail sweep took {elapsed:.0f}s, longer than the {self.cadence_seconds}s cadence.")
+            self._stop.wait(max(0.0, self.cadence_seconds - elapsed))
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def now():
+        return datetime.now(IST).replace(tzinfo=None)
+
+    def in_session(self, now):
+        session_open = datetime.combine(now.date(), MARKET_OPEN)
+        session_close = datetime.combine(now.date(), MARKET_CLOSE) + CLOSE_GRACE
+        return self.calendar.is_session(now.date()) and session_open <= now < session_close
+
+    def next_open(self, now):
+        day = now.date()
+        if now >= datetime.combine(day, MARKET_OPEN):
+            day += timedelta(days=1)
+        while not self.calendar.is_session(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, MARKET_OPEN)
+
+    def sweep(self, tickers, now):
+        """
+        Fetches every ticker's completed candles since its watermark and inserts them.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        # The candle of the current minute is still forming
+        last_candle = min(now.replace(second=0, microsecond=0),
+                          datetime.combine(now.date(), MARKET_CLOSE)) - timedelta(minutes=1)
+        session_open = datetime.combine(now.date(), MARKET_OPEN)
+
+        pending, rows = {}, 0
+        last_flush = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tail") as executor:
+            futures = {}
+            for ticker_token, ticker, exchange in tickers:
+                watermark = self.single_ingestor.get_watermark(ticker)
+                from_date = session_open if watermark is None else max(session_open, watermark + timedelta(minutes=1))
+                if from_date > last_candle:
+                    continue
+                future = executor.submit(
+                    self.angelone_client.get_historical_data, from_date, last_candle, ticker_token,
+                    exchange, self.single_ingestor.interval, exact_times=True
+                )
+                futures[future] = ticker
+
+            try:
+                for future in as_completed(futures):
+                    if self._stop.is_set():
+                        break
+                    ticker = futures[future]
+                    try:
+                        raw_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Tail fetch failed for {ticker}: {e}", exc_info=True)
+                        continue
+                    if raw_data and raw_data.get('data'):
+                        pending[ticker] = raw_data['data']
+                    if pending and time.monotonic() - last_flush >= self.flush_seconds:
+                        rows += self._insert(pending)
+                        pending, last_flush = {}, time.monotonic()
+            finally:
+                # A stopped or interrupted sweep drops the requests that have not started yet
+                for future in futures:
+                    future.cancel()
+
+        if pending:
+            rows += self._insert(pending)
+        return rows
+
+    def _insert(self, responses):
+        """
+        Preprocesses the candles of several tickers as one batch and writes them with an
+        async insert, advancing the watermarks once the server has acknowledged them.
+        """
+        batch = self.single_ingestor.validate(self.single_ingestor.preprocess_class.preprocess_batch(responses))
+        if batch.empty:
+            return 0
+        inserted = self.single_ingestor.clickhouse_client.push_data_to_database(
+            self.single_ingestor.table_name, batch, 'tail', settings=ASYNC_INSERT_SETTINGS
+        )
+        if not inserted:
+            logger.error(f"Tail insert of {len(batch)} rows for {len(responses)} tickers failed; they are retried next sweep.")
+            return 0
+        self.single_ingestor.update_watermarks(batch.groupby('ticker', observed=True)['timestamp'].max().to_dict())
+        return len(batch)
@@ -1,70 +1,346 @@
-from config.settings import Config
-from src.downloader.fetch_local_data import ReadLocalData
-from src.downloader.angelone_api_client import AngelOneApiClient
+from datetime import datetime, timezone
+from src.downloader.intervals import INTERVAL_MAX_DAYS
 from src.preprocess.preprocess import PreprocessData
-from src.ingestion.clickhouse import ClickhouseConnect
-from src.ingestion.ingest_single import SingleTickerIngestor
+from src.preprocess.quality import QualityGate, parse_session, summarize
+from src.ingestion.bootstrap import BootstrapCache
+from src.ingestion.clickhouse import ClickhouseConnect, interval_table_name
+from src.ingestion.ingest_single import SingleTickerIngestor, DEFAULT_START_DATE
+from src.ingestion.insert_buffer import InsertBuffer
+from src.ingestion.quarantine import QuarantineWriter
+from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
+
+# Mode-specific dependencies (SmartApi, pyotp and requests for the broker, the pyarrow readers for
+# local files, zstandard for the spool) are imported where a mode first needs them, so short
+# local, replay and status runs do not pay for the others at startup.
+
+console = AppLogger.get_console()
 
 
 class PipelineRunner:
-    def __init__(self, config):
+    def __init__(self, config, shard=None, run_id=None):
+        """
+        Args:
+            config (type or Config): The settings class to load, or loaded settings.
+            shard (ShardSpec): Ingest only this shard of the ticker universe (API mode only).
+            run_id (str): Identifies the sharded run the shard belongs to.
+        """
         # Load configuration
-        self.config = config()
-
-        # Initialize ClickHouse client
-        self.clickhouse_client = ClickhouseConnect(
-            host=self.config.CLICKHOUSE_HOST,
-            username=self.config.CLICKHOUSE_USERNAME,
-            password=self.config.CLICKHOUSE_PASSWORD,
-            database=self.config.CLICKHOUSE_DATABASE,
-            table_name=self.config.CLICKHOUSE_TABLE
+        self.config = config() if isinstance(config, type) else config
+        AppLogger.configure(
+            level=self.config.LOG_LEVEL,
+            max_bytes=self.config.LOG_MAX_BYTES,
+            backup_count=self.config.LOG_BACKUP_COUNT,
+            sample_per_second=self.config.LOG_SAMPLE_PER_SECOND,
+            log_format=self.config.LOG_FORMAT,
+            console=self.config.LOG_CONSOLE
         )
 
-        # Create ingestor for single ticker ingestion
-        self.single_ingestor = SingleTickerIngestor(
-            self.clickhouse_client, PreprocessData, self.config.CLICKHOUSE_TABLE
-        )
+        # Tags the rows this run quarantines and its quality statistics
+        self.run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+        # Tables found or created by an earlier run are not checked again (CLICKHOUSE_BOOTSTRAP=auto)
+        self.bootstrap_cache = None
+        if self.config.BOOTSTRAP_CACHE_DIR:
+            self.bootstrap_cache = BootstrapCache(self.config.BOOTSTRAP_CACHE_DIR,
+                                                  ttl_seconds=self.config.BOOTSTRAP_CACHE_TTL_SECONDS)
+
+        # One ingestor (and target table) per candle interval; local files and the tail hold one-minute candles
+        intervals = ["ONE_MINUTE"] if self.config.DATA_SOURCE_MODE in ("local", "tail") else self.config.INTERVALS
+        self.ingestors = {interval: self._build_ingestor(interval) for interval in intervals}
+        self.single_ingestor = self.ingestors[intervals[0]]
+        self.clickhouse_client = self.single_ingestor.clickhouse_client
+
+        # Raw API responses are spooled to disk so interrupted runs resume and can be replayed
+        if self.config.SPOOL_DIR:
+            from src.downloader.response_spool import ResponseSpool
+            spool = ResponseSpool(self.config.SPOOL_DIR)
+            for ingestor in self.ingestors.values():
+                ingestor.spool = spool
+
+        # A shard claims its slot in the coordination table before logging in with its own credentials
+        self.shard, self.coordinator = None, None
+        if shard is not None:
+            self._setup_shard(shard, run_id)
 
         # Determine data source mode
-        if self.config.DATA_SOURCE_MODE == "api":
+        if self.config.DATA_SOURCE_MODE in ("api", "tail"):
             self._setup_api_client()
         elif self.config.DATA_SOURCE_MODE == "local":
             self.local_data_dir = self.config.LOCAL_DATA_FOLDER
+            # REPLACE PARTITION swaps whole months, so every ticker of a month must be in the load
+            if self.config.LOCAL_BULK_LOAD == "replace" and (self.config.TICKERS or self.config.LOCAL_INCREMENTAL):
+                raise ValueError("LOCAL_BULK_LOAD=replace replaces every ticker of each month it loads and cannot "
+                                 "be combined with TICKERS/--tickers or LOCAL_INCREMENTAL; use 'attach' or 'direct'")
+        elif self.config.DATA_SOURCE_MODE == "replay":
+            if self.single_ingestor.spool is None:
+                raise ValueError("DATA_SOURCE_MODE=replay requires SPOOL_DIR to be set")
         else:
             raise ValueError(f"Invalid DATA_SOURCE_MODE: {self.config.DATA_SOURCE_MODE}")
 
+    def _build_ingestor(self, interval):
+        # Each interval gets its own ClickHouse client bound to its table, created if missing
+        if interval not in INTERVAL_MAX_DAYS:
+            raise ValueError(f"Invalid interval: {interval}. Expected one of {list(INTERVAL_MAX_DAYS)}")
+        table_name = interval_table_name(self.config.CLICKHOUSE_TABLE, interval)
+        clickhouse_client = ClickhouseConnect(
+            host=self.config.CLICKHOUSE_HOST,
+            username=self.config.CLICKHOUSE_USERNAME,
+            password=self.config.CLICKHOUSE_PASSWORD,
+            database=self.config.CLICKHOUSE_DATABASE,
+            table_name=table_name,
+            compression=self.config.CLICKHOUSE_COMPRESSION,
+            insert_format=self.config.CLICKHOUSE_INSERT_FORMAT,
+            table_engine=self.config.CLICKHOUSE_TABLE_ENGINE,
+            insert_retries=self.config.CLICKHOUSE_INSERT_RETRIES,
+            retry_backoff_seconds=self.config.CLICKHOUSE_RETRY_BACKOFF_SECONDS,
+            # Rollups aggregate one-minute candles; coarser interval tables have none
+            rollups=self.config.CLICKHOUSE_ROLLUPS if interval == "ONE_MINUTE" else (),
+            bootstrap=self.config.CLICKHOUSE_BOOTSTRAP,
+            bootstrap_cache=self.bootstrap_cache
+        )
+        ingestor = SingleTickerIngestor(
+            clickhouse_client, PreprocessData, table_name,
+            stream_windows=self.config.STREAM_WINDOWS,
+            interval=interval
+        )
+        if self.config.QUALITY_GATE:
+            ingestor.quality_gate = QualityGate(
+                interval,
+                session=parse_session(self.config.QUALITY_SESSION),
+                reject=self.config.QUALITY_REJECT,
+                quarantine=QuarantineWriter(clickhouse_client, table_name, self.run_id,
+                                            max_rows=self.config.QUARANTINE_BUFFER_ROWS)
+            )
+        return ingestor
+
+    def _setup_shard(self, shard, run_id):
+        from src.ingestion.shard_coordinator import ShardCoordinator, ShardSpec
+
+        if self.config.DATA_SOURCE_MODE != "api":
+            raise ValueError("Sharding is only supported with DATA_SOURCE_MODE=api")
+        self.coordinator = ShardCoordinator(
+            self.clickhouse_client,
+            run_id or datetime.now(timezone.utc).strftime('%Y%m%d'),
+            shard.count,
+            table_name=self.config.CLICKHOUSE_SHARD_TABLE,
+            stale_seconds=self.config.SHARD_STALE_SECONDS,
+            heartbeat_seconds=self.config.SHARD_HEARTBEAT_SECONDS
+        )
+        self.shard = ShardSpec(self.coordinator.claim(shard.index), shard.count)
+        self.config.apply_shard(self.shard.index)
+        console.info(f"Running shard {self.shard} of run {self.coordinator.run_id}")
+
     def _setup_api_client(self):
+        from src.downloader.angelone_api_client import AngelOneApiClient
+        from src.downloader.scrip_master import ScripMasterCache
+        from src.utils.rate_limiter import AdaptiveRateLimiter
+
         # Initialize Angel One API client
         self.api_client = AngelOneApiClient(
             api_key=self.config.ANGELONE_API,
             username=self.config.ANGEL_ONE_USER_ID,
             pin=self.config.ANGEL_ONE_PIN,
             token=self.config.ANGEL_ONE_TOKEN,
-            scrip_url=self.config.ANGEL_ONE_API_SCRIP_LINK
+            scrip_url=self.config.ANGEL_ONE_API_SCRIP_LINK,
+            rate_limiter=AdaptiveRateLimiter(self.config.ANGEL_ONE_MAX_RPS),
+            scrip_cache=ScripMasterCache(
+                self.config.ANGEL_ONE_API_SCRIP_LINK,
+                directory=self.config.SCRIP_CACHE_DIR or None,
+                ttl_seconds=self.config.SCRIP_CACHE_TTL_SECONDS
+            )
         )
 
     def run(self):
+        # Rows from all tickers are batched into large inserts per table and flushed on shutdown
+        for ingestor in self.ingestors.values():
+            ingestor.insert_buffer = InsertBuffer(
+                ingestor.clickhouse_client,
+                ingestor.table_name,
+                max_rows=self.config.INSERT_BUFFER_ROWS,
+                max_bytes=self.config.INSERT_BUFFER_BYTES,
+                max_age_seconds=self.config.INSERT_BUFFER_SECONDS,
+                on_flush=ingestor.update_watermarks
+            )
+
+        # Hot-path metrics are scraped over HTTP and/or written for the textfile collector while the run lasts
+        metrics.start_exporter(self.config.METRICS_PORT, self.config.METRICS_FILE)
+
         # Execute pipeline based on data source
-        if self.config.DATA_SOURCE_MODE == "api":
-            self._run_api_mode()
-        elif self.config.DATA_SOURCE_MODE == "local":
-            self._run_local_mode()
+        failed = True
+        try:
+            if self.config.DATA_SOURCE_MODE == "api":
+                self._run_api_mode()
+            elif self.config.DATA_SOURCE_MODE == "local":
+                self._run_local_mode()
+            elif self.config.DATA_SOURCE_MODE == "replay":
+                self._run_replay_mode()
+            elif self.config.DATA_SOURCE_MODE == "tail":
+                self._run_tail_mode()
+            failed = False
+        finally:
+            # Rows that never reached ClickHouse fail the run, after every buffer had its chance to flush
+            unflushed = []
+            for ingestor in self.ingestors.values():
+                try:
+                    ingestor.insert_buffer.close()
+                except RuntimeError as e:
+                    console.error(str(e))
+                    unflushed.append(str(e))
+                ingestor.insert_buffer = None
+                if ingestor.quality_gate is not None:
+                    console.info(f"{ingestor.table_name}: {summarize(ingestor.quality_gate.close())}")
+            if self.coordinator is not None:
+                self.coordinator.finish(failed=failed or bool(unflushed))
+            metrics.stop_exporter(self.config.METRICS_FILE)
+            console.info(metrics.summary(top=self.config.METRICS_SUMMARY_TICKERS))
+            AppLogger.flush()
+        if unflushed:
+            raise RuntimeError('; '.join(unflushed))
 
     def _run_api_mode(self):
-        # Ingest data from Angel One API
-        print("Running API ingestion...")
-        scrip_df = self.api_client.get_latest_scrip()
+        # Ingest data from Angel One API, one candle interval after another
+        console.info("Running API ingestion...")
+        tickers = self._load_tickers()
+        # New listings need their whole history walked; starting them first keeps them off the tail
+        added = self.api_client.scrip_cache.added
+        if not added.empty:
+            new_listings = set(zip(added['exch_seg'], added['token']))
+            tickers.sort(key=lambda item: (item[2], item[0]) not in new_listings)
+
+        on_ticker_done = None
+        if self.shard is not None:
+            tickers = [item for item in tickers if self.shard.owns(item[2], item[0])]
+            self.coordinator.start(len(tickers) * len(self.ingestors))
+            on_ticker_done = self.coordinator.record
+            console.info(f"Shard {self.shard} owns {len(tickers)} tickers.")
+
+        for interval, ingestor in self.ingestors.items():
+            console.info(f"Ingesting {interval} candles into {ingestor.table_name}...")
+            self._ingest_interval(ingestor, tickers, on_ticker_done)
 
-        for _, row in scrip_df.iterrows():
-            ticker_token = row['token']
-            ticker = row['symbol'].replace("-EQ", "").lower()
-            self.single_ingestor.fetch_and_store_single_ticker(self.api_client, ticker_token, ticker)
+    def _load_tickers(self):
+        # (token, ticker, exchange) for every tradable instrument of the configured exchanges,
+        # restricted to TICKERS when set
+        from src.downloader.angelone_api_client import AngelOneApiClient
+
+        scrip_df = self.api_client.get_latest_scrip(self.config.EXCHANGES, self.config.NFO_INSTRUMENT_TYPES)
+        tickers = [
+            (ticker_token, AngelOneApiClient.ticker_name(symbol, exchange), exchange)
+            for ticker_token, symbol, exchange in zip(scrip_df['token'], scrip_df['symbol'], scrip_df['exch_seg'])
+        ]
+        if self.config.TICKERS:
+            wanted = set(self.config.TICKERS)
+            tickers = [item for item in tickers if item[1] in wanted]
+            missing = wanted - {item[1] for item in tickers}
+            if missing:
+                console.warning(f"Not in the scrip master: {', '.join(sorted(missing))}")
+        return tickers
+
+    def _ingest_interval(self, ingestor, tickers, on_ticker_done=None):
+        from src.ingestion.backfill_planner import BackfillPlanner, TradingCalendar
+        from src.ingestion.ingest_concurrent import ConcurrentTickerIngestor
+        from src.ingestion.staged_pipeline import StagedPipeline
+
+        ingestor.load_watermarks()
+        if self.config.BACKFILL_MODE == "gaps":
+            planner = BackfillPlanner(
+                ingestor.clickhouse_client,
+                TradingCalendar.from_file(self.config.NSE_HOLIDAYS_FILE),
+                window_days=ingestor.window_days,
+                start_date=DEFAULT_START_DATE
+            )
+            ingestor.backfill_plan = planner.plan()
+
+        if self.config.API_PIPELINE == "staged":
+            pipeline = StagedPipeline(
+                ingestor,
+                fetch_workers=self.config.INGEST_WORKERS,
+                preprocess_workers=self.config.PREPROCESS_WORKERS,
+                insert_workers=self.config.INSERT_WORKERS,
+                queue_size=self.config.PIPELINE_QUEUE_SIZE
+            )
+            pipeline.run(self.api_client, tickers, on_ticker_done)
+        else:
+            concurrent_ingestor = ConcurrentTickerIngestor(ingestor, self.config.INGEST_WORKERS)
+            concurrent_ingestor.ingest_tickers(self.api_client, tickers, on_ticker_done)
 
     def _run_local_mode(self):
-        # Ingest data from local CSV files
-        for data in ReadLocalData.read_local_data_in_chunks(self.local_data_dir):
-            for ticker, df in data.items():
-                processed_data = PreprocessData.preprocess_data(df, ticker)
-                print(f'Processing {ticker}, shape : {df.shape}')
-                self.single_ingestor.insert_data_monthly_chunks(processed_data, ticker)
-                print(f'Data Inserted for {ticker}')
\ No newline at end of file
+        # Ingest data from local CSV/Parquet/Arrow files, parsed in a process pool while this thread inserts
+        from src.downloader.fetch_local_data import ReadLocalData
+
+        console.info("Running local ingestion...")
+        watermarks = None
+        if self.config.LOCAL_INCREMENTAL:
+            self.single_ingestor.load_watermarks()
+            watermarks = self.single_ingestor.watermarks
+
+        stream = ReadLocalData.stream_local_data(
+            self.local_data_dir,
+            workers=self.config.LOCAL_PARSE_WORKERS,
+            chunk_bytes=self.config.LOCAL_CHUNK_BYTES,
+            max_inflight_bytes=self.config.LOCAL_MAX_INFLIGHT_BYTES,
+            engine=self.config.LOCAL_CSV_ENGINE,
+            watermarks=watermarks,
+            tickers=self.config.TICKERS or None
+        )
+        if self.config.LOCAL_BULK_LOAD:
+            self._bulk_load(stream)
+            return
+
+        rows = 0
+        for ticker, processed_data in stream:
+            self.single_ingestor.store(processed_data, ticker)
+            rows += len(processed_data)
+        console.info(f'Data Inserted: {rows} rows')
+
+    def _bulk_load(self, stream):
+        # Regroup the whole archive by monthly partition, then write one sorted insert per partition
+        from src.ingestion.bulk_load import PartitionBulkLoader
+
+        ingestor = self.single_ingestor
+        with PartitionBulkLoader(
+            ingestor.clickhouse_client, ingestor.table_name,
+            mode=self.config.LOCAL_BULK_LOAD,
+            workers=self.config.LOCAL_BULK_WORKERS,
+            spill_dir=self.config.LOCAL_BULK_SPILL_DIR or None,
+            on_flush=ingestor.update_watermarks
+        ) as loader:
+            for ticker, processed_data in stream:
+                with AppLogger.context(ticker=ticker, stage='store'):
+                    loader.add(ingestor.validate(processed_data))
+            rows = loader.load()
+        console.info(f'Data Inserted: {rows} rows')
+
+    def _run_replay_mode(self):
+        # Re-ingest every spooled API response without contacting the broker
+        console.info("Replaying spooled API responses...")
+        rows = 0
+        for interval, ingestor in self.ingestors.items():
+            for ticker, data in ingestor.spool.iter_responses(tickers=set(self.config.TICKERS) or None,
+                                                              interval=interval):
+                processed_data = PreprocessData.preprocess_data(data, ticker)
+                ingestor.store(processed_data, ticker)
+                rows += len(processed_data)
+        console.info(f'Data Inserted: {rows} rows')
+
+    def _run_tail_mode(self):
+        # Keep the one-minute table current during market hours with one resident session
+        from src.ingestion.backfill_planner import TradingCalendar
+        from src.ingestion.tail import IntradayTailer
+
+        console.info("Running intraday tail...")
+        tailer = IntradayTailer(
+            self.single_ingestor,
+            self.api_client,
+            TradingCalendar.from_file(self.config.NSE_HOLIDAYS_FILE),
+            cadence_seconds=self.config.TAIL_CADENCE_SECONDS,
+            flush_seconds=self.config.TAIL_FLUSH_SECONDS,
+            max_workers=self.config.INGEST_WORKERS,
+            session_refresh_seconds=self.config.SESSION_REFRESH_SECONDS
+        )
+        try:
+            tailer.run(self._load_tickers())
+        except KeyboardInterrupt:
+            tailer.stop()
+            console.info("Tail stopped.")
@@ -0,0 +1,210 @@
+import threading
+from datetime import time as dt_time
+import numpy as np
+import pandas as pd
+from src.downloader.intervals import INTERVAL_SECONDS
+from src.preprocess.preprocess import FINAL_COLUMNS
+from src.utils.logger import AppLogger
+from src.utils.metrics import metrics
+
+logger = AppLogger.get_logger()
+
+# Reason codes, one bit each; a row can fail several checks at once
+REASONS = {
+    'duplicate': 1,              # same ticker and timestamp as an earlier row (e.g. overlapping windows)
+    'out_of_session': 2,         # intraday candle outside the trading session
+    'misaligned': 4,             # timestamp not on the interval grid (daily candles: not at midnight)
+    'ohlc_inconsistent': 8,      # high < max(open, close), low > min(open, close) or high < low
+    'non_positive_price': 16,    # a price of zero (negatives are clipped by preprocessing)
+    'zero_volume_padding': 32,   # flat candle (open == high == low == close) without volume
+}
+# Counters kept per ticker; 'out_of_order' counts rows that arrived before an earlier timestamp
+# of the same ticker. They are reordered, not rejected.
+STAT_COLUMNS = ['rows', 'accepted', *REASONS, 'out_of_order']
+
+# NSE, BSE and NFO trade from 09:15 to 15:30 exchange time, which is the wall time the pipeline stores
+DEFAULT_SESSION = (dt_time(9, 15), dt_time(15, 30))
+
+
+def parse_session(text):
+    """
+    Parses 'HH:MM-HH:MM' into a (start, end) pair of datetime.time.
+    """
+    start, end = (dt_time.fromisoformat(part.strip()) for part in text.split('-'))
+    if start >= end:
+        raise ValueError(f"Invalid session '{text}': the start must be before the end")
+    return start, end
+
+
+class QualityGate:
+    """
+    Validates preprocessed candles between preprocessing and insert. All checks run over the
+    columns of a batch at once: duplicates, monotonic order per ticker, session bounds, grid
+    alignment, OHLC consistency, non-positive prices and zero-volume padding.
+
+    Rejected rows are handed in bulk to a quarantine writer together with their reason codes,
+    and per-ticker counters are kept for the run's quality report.
+    """
+
+    def __init__(self, interval="ONE_MINUTE", session=DEFAULT_SESSION, reject=tuple(REASONS), quarantine=None):
+        """
+        Args:
+            interval (str): Candle interval of the checked data (a key of INTERVAL_SECONDS).
+            session (tuple): (start, end) datetime.time of the trading session; intraday candles
+                             must start at or after `start` and before `end`.
+            reject (iterable): Reasons that reject a row; the others are only counted.
+            quarantine (QuarantineWriter): Receives rejected rows and the run's statistics.
+        """
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Invalid interval: {interval}. Expected one of {list(INTERVAL_SECONDS)}")
+        unknown = set(reject) - set(REASONS)
+        if unknown:
+            raise ValueError(f"Unknown quality checks: {sorted(unknown)}. Expected some of {list(REASONS)}")
+        self.interval = interval
+        self.step = INTERVAL_SECONDS[interval]
+        self.session_start = session[0].hour * 3600 + session[0].minute * 60 + session[0].second
+        self.session_end = session[1].hour * 3600 + session[1].minute * 60 + session[1].second
+        self.reject_mask = np.uint16(sum(REASONS[reason] for reason in reject))
+        self.quarantine = quarantine
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def apply(self, dataframe):
+        """
+        Checks a batch, quarantines the rejected rows, records the statistics and returns the
+        accepted rows, sorted by ticker and timestamp if they arrived out of order.
+        """
+        accepted, rejected, stats = self.check(dataframe)
+        self._record(stats)
+        if len(rejected):
+            for reason, bit in REASONS.items():
+                count = int(np.count_nonzero(rejected['reason_mask'].to_numpy() & bit))
+                if count:
+                    metrics.inc('quality_rejected_rows_total', count, reason=reason)
+            logger.warning(f"Quality gate rejected {len(rejected)} of {len(dataframe)} rows: "
+                           f"{', '.join(f'{r}={n}' for r, n in rejected['reasons'].value_counts().items())}.")
+            if self.quarantine is not None:
+                self.quarantine.add(rejected)
+        return accepted
+
+    def check(self, dataframe):
+        """
+        Runs every check over a batch of preprocessed rows (FINAL_COLUMNS, any number of tickers).
+
+        Returns:
+            tuple: (accepted rows, rejected rows with 'reason_mask' and 'reasons' columns,
+                    {ticker: counters in STAT_COLUMNS order})
+        """
+        n = len(dataframe)
+        if n == 0:
+            return dataframe, self._rejected(dataframe, np.zeros(0, dtype=np.uint16)), {}
+
+        ticker = dataframe['ticker']
+        if isinstance(ticker.dtype, pd.CategoricalDtype):
+            codes, names = ticker.cat.codes.to_numpy(), ticker.cat.categories
+        else:
+            codes, names = pd.factorize(ticker.to_numpy())
+        ts = dataframe['timestamp'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+        # Monotonicity: rows going back in time within a ticker are counted, then everything is
+        # sorted (stably, so the first of several duplicates is kept) if the batch is not sorted
+        same = codes[1:] == codes[:-1]
+        backwards = same & (ts[1:] < ts[:-1])
+        out_of_order = np.zeros(n, dtype=bool)
+        out_of_order[1:] = backwards
+        arrival_codes, order = codes, None
+        if not np.all(np.where(same, ts[1:] >= ts[:-1], codes[1:] > codes[:-1])):
+            order = np.lexsort((ts, codes))
+            codes, ts = codes[order], ts[order]
+        frame = dataframe.take(order) if order is not None else dataframe
+
+        o, h, l, c = (frame[name].to_numpy(dtype=np.float64) for name in ('open', 'high', 'low', 'close'))
+        volume = frame['volume'].to_numpy()
+
+        mask = np.zeros(n, dtype=np.uint16)
+        duplicate = np.zeros(n, dtype=bool)
+        duplicate[1:] = (codes[1:] == codes[:-1]) & (ts[1:] == ts[:-1])
+        mask[duplicate] |= REASONS['duplicate']
+
+        seconds_of_day = ts % 86400
+        if self.step < 86400:
+            mask[(seconds_of_day < self.session_start) | (seconds_of_day >= self.session_end)] |= REASONS['out_of_session']
+            mask[(seconds_of_day - self.session_start) % self.step != 0] |= REASONS['misaligned']
+        else:
+            mask[seconds_of_day != 0] |= REASONS['misaligned']
+
+        mask[(h < np.maximum(o, c)) | (l > np.minimum(o, c)) | (h < l)] |= REASONS['ohlc_inconsistent']
+        mask[(o <= 0) | (h <= 0) | (l <= 0) | (c <= 0)] |= REASONS['non_positive_price']
+        mask[(volume == 0) & (o == h) & (h == l) & (l == c)] |= REASONS['zero_volume_padding']
+
+        reject = (mask & self.reject_mask) != 0
+        stats = self._count(codes, names, mask, reject, arrival_codes[out_of_order])
+
+        if not reject.any():
+            return frame, self._rejected(frame.iloc[:0], mask[:0]), stats
+        return frame.take(np.flatnonzero(~reject)), self._rejected(frame.take(np.flatnonzero(reject)), mask[reject]), stats
+
+    def report(self):
+        """
+        Returns the per-ticker counters of everything checked so far, one row per ticker.
+        """
+        with self._lock:
+            stats = {ticker: counts.copy() for ticker, counts in self._stats.items()}
+        report = pd.DataFrame.from_dict(stats, orient='index', columns=STAT_COLUMNS).astype(np.uint64)
+        return report.rename_axis('ticker').reset_index()
+
+    def close(self):
+        """
+        Flushes the quarantined rows and writes the run's per-ticker statistics.
+
+        Returns:
+            pd.DataFrame: The per-ticker report.
+        """
+        report = self.report()
+        if self.quarantine is not None:
+            self.quarantine.flush()
+            self.quarantine.write_stats(report)
+        return report
+
+    def _count(self, codes, names, mask, reject, out_of_order_codes):
+        # Per-ticker counters via bincount, so the cost does not grow with the number of tickers
+        size = len(names)
+        columns = [np.bincount(codes, minlength=size), np.bincount(codes[~reject], minlength=size)]
+        columns += [np.bincount(codes[(mask & bit) != 0], minlength=size) for bit in REASONS.values()]
+        columns.append(np.bincount(out_of_order_codes, minlength=size))
+        counts = np.stack(columns, axis=1)
+        present = np.flatnonzero(counts[:, 0])
+        return {names[i]: counts[i] for i in present}
+
+    def _record(self, stats):
+        with self._lock:
+            for ticker, counts in stats.items():
+                current = self._stats.get(ticker)
+                self._stats[ticker] = counts if current is None else current + counts
+
+    @staticmethod
+    def _rejected(frame, mask):
+        """
+        Rejected rows in quarantine column order: the candle, the reason bitmask and the
+        reasons spelled out (e.g. 'duplicate,zero_volume_padding').
+        """
+        rejected = frame[FINAL_COLUMNS].reset_index(drop=True)
+        rejected['ticker'] = rejected['ticker'].astype(str)
+        rejected['reason_mask'] = mask
+        labels = {int(value): ','.join(reason for reason, bit in REASONS.items() if value & bit)
+                  for value in np.unique(mask)}
+        rejected['reasons'] = pd.Series(mask, dtype=np.int64).map(labels).astype(object)
+        return rejected
+
+
+def summarize(report):
+    """
+    Returns a one-line summary of a quality report.
+    """
+    if report.empty:
+        return "Quality gate: no rows checked."
+    totals = report[STAT_COLUMNS].sum()
+    issues = ', '.join(f"{name}={int(totals[name])}" for name in (*REASONS, 'out_of_order') if totals[name])
+    return (f"Quality gate: {int(totals['rows'] - totals['accepted'])} of {int(totals['rows'])} rows rejected "
+            f"across {len(report)} tickers" + (f" ({issues})." if issues else "."))
+
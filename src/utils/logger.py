@@ -1,19 +1,141 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Fields attached to every record; set with AppLogger.context() or passed through `extra`
+CONTEXT_FIELDS = ('ticker', 'stage')
+# Attributes every LogRecord has; anything else on a record came from `extra` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'suppressed'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line: time, level, logger, source location,
+    thread, message, the context fields and any `extra` fields.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'where': f"{record.module}:{record.lineno}",
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies the calling thread's context fields onto each record. Runs in the logging thread,
+    before the record is handed to the queue.
+    """
+
+    def filter(self, record):
+        context = AppLogger._context.__dict__
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits INFO and DEBUG records per call site (token bucket of `per_second`, with a burst of
+    the same size), so that per-window and per-chunk messages cannot flood the queue. Warnings and
+    errors always pass. The next record that passes from a call site carries the number of records
+    suppressed there since the last one.
+    """
+
+    def __init__(self, per_second):
+        super().__init__()
+        self.per_second = per_second
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.per_second or record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._sites.get(site, (self.per_second, now, 0))
+            tokens = min(self.per_second, tokens + (now - last) * self.per_second)
+            if tokens < 1:
+                self._sites[site] = (tokens, now, suppressed + 1)
+                return False
+            self._sites[site] = (tokens - 1, now, 0)
+        record.suppressed = suppressed
+        return True
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Writes the messages of the console logger to whatever sys.stdout is at emit time, so that
+    redirecting stdout (e.g. in benchmarks) also silences the pipeline's progress output.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.addFilter(lambda record: record.name == AppLogger.CONSOLE_NAME)
+        self.setFormatter(logging.Formatter('%(message)s'))
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
 
 
 class AppLogger:
     """
     A static utility class to configure and provide a named logger instance
     for each module/component of the application.
-    Each logger will write to a dedicated log file in the 'logs' directory.
+
+    Loggers only put records on a shared queue; a background listener thread formats them and
+    writes them to a size-rotated JSON-lines file in the 'logs' directory and, for the console
+    logger, to stdout. Logging therefore never blocks an ingest worker on disk or console I/O.
+
+    Worker processes have no listener of their own: process pools are started with
+    `worker_initializer()`, which sends their records through a multiprocessing queue to the
+    parent's writer.
     """
+    CONSOLE_NAME = 'AppLogger.console'
+
+    _queue = queue.Queue(-1)
+    _listener = None
+    _process_queue = None
+    _process_listener = None
+    _worker_queue = None
+    _sampler = SamplingFilter(per_second=20)
+    _context = threading.local()
+    _lock = threading.Lock()
 
     @staticmethod
     def get_logger(name = 'AppLogger', log_dir = 'logs', level=logging.INFO):
         """
-        Retrieves or creates a named logger instance, configuring it to write
-        to a specific log file in the 'logs' directory.
+        Retrieves or creates a named logger instance, configuring it to hand its
+        records to the background writer, which appends them to a specific log file
+        in the 'logs' directory.
 
         Args:
             name (str): The name of the logger (e.g., '__name__' of the module).
@@ -28,6 +150,111 @@ class AppLogger:
         logger.setLevel(level)
         logger.propagate = False # Crucial: Prevent messages from going to the root logger
 
+        # Add handlers only if they don't already exist for this logger
+        # This prevents duplicate log entries if get_logger is called multiple times for the same name
+        if not logger.handlers:
+            queue_handler = logging.handlers.QueueHandler(AppLogger._worker_queue or AppLogger._queue)
+            queue_handler.addFilter(AppLogger._sampler)
+            queue_handler.addFilter(ContextFilter())
+            logger.addHandler(queue_handler)
+            if AppLogger._worker_queue is None:
+                AppLogger._start(AppLogger._log_file_path(name, log_dir))
+
+        return logger
+
+    @staticmethod
+    def get_console():
+        """
+        Returns the logger that replaces `print` for progress messages: its records are written to
+        stdout (message only) and, like every other record, to the JSON log file.
+        """
+        AppLogger.get_logger()
+        console = logging.getLogger(AppLogger.CONSOLE_NAME)
+        console.propagate = True
+        return console
+
+    @staticmethod
+    def configure(level=logging.INFO, max_bytes=50 * 1024 * 1024, backup_count=5, sample_per_second=20,
+                  log_format='json', console=True, log_dir='logs'):
+        """
+        Replaces the writer's handlers; loggers created before keep working.
+
+        Args:
+            level (int or str): Minimum level of the application logger.
+            max_bytes (int): Size at which the log file is rotated (0 never rotates).
+            backup_count (int): Number of rotated files kept.
+            sample_per_second (float): INFO/DEBUG records allowed per call site and second (0 disables sampling).
+            log_format (str): 'json' (one object per line) or 'text'.
+            console (bool): Write the console logger's messages to stdout.
+        """
+        AppLogger.get_logger(level=level)
+        AppLogger._sampler.per_second = sample_per_second
+        with AppLogger._lock:
+            AppLogger._stop()
+            AppLogger._listener = AppLogger._build_listener(
+                AppLogger._log_file_path('AppLogger', log_dir), max_bytes, backup_count, log_format, console
+            )
+            AppLogger._listener.start()
+
+    @staticmethod
+    def worker_initializer():
+        """
+        Returns the (initializer, initargs) that a ProcessPoolExecutor needs for its workers'
+        records to reach the log file and console, e.g.
+        `ProcessPoolExecutor(workers, initializer=init, initargs=args)`.
+        """
+        with AppLogger._lock:
+            if AppLogger._process_queue is None:
+                AppLogger._process_queue = multiprocessing.JoinableQueue(-1)
+                # Records arrive formatted and picklable; they are passed on to the writer's queue
+                AppLogger._process_listener = logging.handlers.QueueListener(
+                    AppLogger._process_queue, logging.handlers.QueueHandler(AppLogger._queue)
+                )
+                AppLogger._process_listener.start()
+        return AppLogger._init_worker, (AppLogger._process_queue,)
+
+    @staticmethod
+    def _init_worker(process_queue):
+        # Runs first in every pool worker. Forked workers inherit the parent's loggers, whose queue
+        # nobody reads in this process; spawned ones may have started a writer of their own while
+        # importing the main module, which is stopped so that only the parent writes the files
+        AppLogger._worker_queue = process_queue
+        with AppLogger._lock:
+            thread = getattr(AppLogger._listener, '_thread', None)
+            if thread is not None and thread.is_alive():
+                AppLogger._stop()
+            AppLogger._listener = None
+        for logger in [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]:
+            for handler in getattr(logger, 'handlers', ()):
+                if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is AppLogger._queue:
+                    handler.queue = process_queue
+
+    @staticmethod
+    @contextmanager
+    def context(**fields):
+        """
+        Attaches fields such as ticker or stage to every record logged by this thread inside the block.
+        """
+        context = AppLogger._context.__dict__
+        previous = {key: context.get(key) for key in fields}
+        context.update(fields)
+        try:
+            yield
+        finally:
+            context.update(previous)
+
+    @staticmethod
+    def flush():
+        """
+        Blocks until every queued record has been written, including those worker processes sent.
+        """
+        if AppLogger._process_queue is not None:
+            AppLogger._process_queue.join()
+        if AppLogger._listener is not None:
+            AppLogger._queue.join()
+
+    @staticmethod
+    def _log_file_path(name, log_dir):
         # Determine the project root dynamically
         current_file_dir = os.path.dirname(os.path.abspath(__file__))
         src_dir = os.path.dirname(current_file_dir)
@@ -40,25 +267,43 @@ class AppLogger:
             os.makedirs(full_log_dir_path)
 
         log_file_name = f"{name.replace('.', '_')}.log"
-        log_file_path = os.path.join(full_log_dir_path, log_file_name)
+        return os.path.join(full_log_dir_path, log_file_name)
 
-        # Add handlers only if they don't already exist for this logger
-        # This prevents duplicate log entries if get_logger is called multiple times for the same name
-        if not logger.handlers:
-            # File handler
-            file_handler = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
-            file_handler.setLevel(level)
-            # Use '%(name)s' in the formatter to show the logger's name in the log file
-            file_formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(name)s:%(lineno)d - %(message)s')
-
-            file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
-
-            # Console handler (optional, but good for real-time feedback)
-            #console_handler = logging.StreamHandler()
-            #console_handler.setLevel(level)
-            #console_formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(name)s:%(lineno)d - %(message)s')
-            #console_handler.setFormatter(console_formatter)
-            #logger.addHandler(console_handler)
+    @staticmethod
+    def _build_listener(log_file_path, max_bytes, backup_count, log_format, console):
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file_path, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        if log_format == 'json':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(
+                logging.Formatter('[%(asctime)s] %(levelname)s - %(name)s:%(lineno)d - %(message)s')
+            )
+        handlers = [file_handler, ConsoleHandler()] if console else [file_handler]
+        return logging.handlers.QueueListener(AppLogger._queue, *handlers, respect_handler_level=True)
 
-        return logger
+    @staticmethod
+    def _start(log_file_path):
+        with AppLogger._lock:
+            if AppLogger._listener is None:
+                AppLogger._listener = AppLogger._build_listener(log_file_path, 50 * 1024 * 1024, 5, 'json', True)
+                AppLogger._listener.start()
+                atexit.register(AppLogger._shutdown)
+
+    @staticmethod
+    def _stop():
+        # Drains the queue, then closes the files
+        if AppLogger._listener is not None:
+            AppLogger._listener.stop()
+            for handler in AppLogger._listener.handlers:
+                handler.close()
+            AppLogger._listener = None
+
+    @staticmethod
+    def _shutdown():
+        with AppLogger._lock:
+            if AppLogger._process_listener is not None:
+                AppLogger._process_listener.stop()
+                AppLogger._process_listener = None
+            AppLogger._stop()
@@ -0,0 +1,274 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+# Latency buckets in seconds, from a fast insert to a throttled, retried API call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every metric the pipeline records: name -> (type, help)
+METRIC_DEFINITIONS = {
+    'angelone_api_calls_total': ('counter', 'getCandleData calls by interval and outcome.'),
+    'angelone_api_latency_seconds': ('histogram', 'Latency of getCandleData calls, excluding rate-limiter waits.'),
+    'angelone_api_retries_total': ('counter', 'getCandleData calls retried, by reason.'),
+    'angelone_rows_fetched_total': ('counter', 'Candles returned by getCandleData.'),
+    'preprocess_seconds': ('histogram', 'Time spent preprocessing one batch of raw candles.'),
+    'preprocess_rows_total': ('counter', 'Rows produced by preprocessing.'),
+    'ingest_ticker_seconds': ('histogram', 'Time per ticker and stage (fetch, preprocess, store, insert).'),
+    'clickhouse_insert_seconds': ('histogram', 'Latency of successful inserts, including retries.'),
+    'clickhouse_insert_rows_total': ('counter', 'Rows inserted.'),
+    'clickhouse_insert_bytes_total': ('counter', 'In-memory bytes of the inserted payloads.'),
+    'clickhouse_insert_retries_total': ('counter', 'Insert attempts that failed and were retried.'),
+    'clickhouse_insert_failures_total': ('counter', 'Inserts that failed after every retry.'),
+    'quality_rejected_rows_total': ('counter', 'Rows rejected by the quality gate, by reason.'),
+    'bulk_load_partition_seconds': ('histogram', 'Time to sort and load one monthly partition in a bulk load, by mode.'),
+}
+
+
+class Metrics:
+    """
+    A small, thread-safe registry of labelled counters and histograms for the ingestion hot
+    paths. It renders the Prometheus text exposition format, which can be scraped from an HTTP
+    endpoint or written to a file for node_exporter's textfile collector, and keeps per-ticker
+    stage times for the end-of-run summary.
+    """
+
+    def __init__(self, definitions=METRIC_DEFINITIONS, buckets=LATENCY_BUCKETS):
+        self.definitions = dict(definitions)
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._tickers = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._writer = None
+        self._stopped = threading.Event()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observes the wall time of the enclosed block, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_ticker(self, ticker, stage, seconds, rows=0):
+        """
+        Adds time spent on one ticker in one stage, for the per-stage histogram and the
+        slowest-tickers summary.
+        """
+        self.observe('ingest_ticker_seconds', seconds, stage=stage)
+        with self._lock:
+            entry = self._tickers.setdefault(ticker, {'rows': 0, 'stages': {}})
+            entry['stages'][stage] = entry['stages'].get(stage, 0.0) + seconds
+            entry['rows'] += rows
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._tickers.clear()
+
+    def drain(self):
+        """
+        Returns everything recorded so far as plain, picklable data and starts over. Worker
+        processes return this with their results so that the parent can `merge` it.
+        """
+        with self._lock:
+            state = {'counters': self._counters, 'histograms': self._histograms, 'tickers': self._tickers}
+            self._counters, self._histograms, self._tickers = {}, {}, {}
+        return state
+
+    def merge(self, state):
+        """
+        Adds the metrics drained from another registry (e.g. a worker process) to this one.
+        """
+        with self._lock:
+            for key, value in state['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, value in state['histograms'].items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+                histogram['counts'] = [a + b for a, b in zip(histogram['counts'], value['counts'])]
+                histogram['sum'] += value['sum']
+                histogram['count'] += value['count']
+            for ticker, value in state['tickers'].items():
+                entry = self._tickers.setdefault(ticker, {'rows': 0, 'stages': {}})
+                entry['rows'] += value['rows']
+                for stage, seconds in value['stages'].items():
+                    entry['stages'][stage] = entry['stages'].get(stage, 0.0) + seconds
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in self.definitions.items():
+            series = [(labels, value) for (n, labels), value in (counters if kind == 'counter' else histograms).items()
+                      if n == name]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series):
+                if kind == 'counter':
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), value['counts']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {value['sum']:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Atomically writes the current metrics to `path` (a '.prom' file for the textfile collector).
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(path + '.tmp', path)
+
+    def start_exporter(self, port=None, path=None, interval_seconds=15.0):
+        """
+        Serves the metrics on http://0.0.0.0:<port>/metrics and/or rewrites them to `path`
+        every `interval_seconds` until `stop_exporter` is called.
+        """
+        self._stopped.clear()
+        if port and self._server is None:
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = metrics.render().encode('utf-8')
+                    self.send_response(200 if self.path in ('/', '/metrics') else 404)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer(('0.0.0.0', int(port)), Handler)
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Serving metrics on port {port}.")
+
+        if path and self._writer is None:
+            def write_periodically():
+                while not self._stopped.wait(interval_seconds):
+                    try:
+                        self.write(path)
+                    except OSError as e:
+                        logger.warning(f"Writing metrics to {path} failed: {e}")
+
+            self._writer = threading.Thread(target=write_periodically, name="metrics-file", daemon=True)
+            self._writer.start()
+
+    def stop_exporter(self, path=None):
+        """
+        Stops the exporters; the metrics file (if any) is written one last time.
+        """
+        self._stopped.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if path:
+            self.write(path)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def summary(self, top=10):
+        """
+        Returns an end-of-run report: time per stage (count, total, mean, approximate p95) and
+        the `top` slowest tickers with their per-stage breakdown.
+        """
+        with self._lock:
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self._histograms.items()}
+            tickers = {ticker: {'rows': entry['rows'], 'stages': dict(entry['stages'])}
+                       for ticker, entry in self._tickers.items()}
+            counters = dict(self._counters)
+
+        lines = [f"{'stage':<52}{'count':>9}{'total s':>11}{'mean ms':>10}{'p95 ms':>10}"]
+        for (name, labels), value in sorted(histograms.items()):
+            if not value['count']:
+                continue
+            label = name + ''.join(f" {k}={v}" for k, v in labels)
+            lines.append(f"{label:<52}{value['count']:>9}{value['sum']:>11.2f}"
+                         f"{value['sum'] / value['count'] * 1000:>10.1f}{self._quantile(value, 0.95) * 1000:>10.1f}")
+
+        # One line per label set, e.g. retries of each endpoint
+        retries = [(name + ''.join(f" {k}={v}" for k, v in labels), value)
+                   for (name, labels), value in sorted(counters.items())
+                   if value and name.endswith(('retries_total', 'failures_total'))]
+        if retries:
+            lines.append('')
+            lines.extend(f"{label}: {value}" for label, value in retries)
+
+        if tickers:
+            stages = sorted({stage for entry in tickers.values() for stage in entry['stages']})
+            slowest = sorted(tickers.items(), key=lambda item: sum(item[1]['stages'].values()), reverse=True)[:top]
+            lines.append('')
+            lines.append(f"{'slowest tickers':<28}{'rows':>10}{'total s':>10}" + ''.join(f"{s + ' s':>14}" for s in stages))
+            for ticker, entry in slowest:
+                lines.append(f"{ticker:<28}{entry['rows']:>10}{sum(entry['stages'].values()):>10.2f}"
+                             + ''.join(f"{entry['stages'].get(s, 0.0):>14.2f}" for s in stages))
+        return '\n'.join(lines)
+
+    def _quantile(self, histogram, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+        rank = q * histogram['count']
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), histogram['counts']):
+            cumulative += count
+            if cumulative >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+# The process-wide registry used by every instrumented component
+metrics = Metrics()
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from src.utils.logger import AppLogger
+
+logger = AppLogger.get_logger()
+
+
+class AdaptiveRateLimiter:
+    """
+    A thread-safe token-bucket rate limiter shared by every worker that talks to the broker.
+    The refill rate adapts with AIMD: it is cut multiplicatively whenever the broker reports
+    a rate-limit error and ramps back up additively on every successful call.
+    """
+
+    def __init__(self, max_rate, burst=None, min_rate=0.2, decrease_factor=0.5, increase_step=0.05):
+        """
+        Initializes the limiter with a full bucket.
+
+        Args:
+            max_rate (float): The broker's documented requests-per-second ceiling.
+            burst (int): Bucket capacity. Defaults to max_rate rounded up.
+            min_rate (float): Floor for the refill rate after repeated back-offs.
+            decrease_factor (float): Multiplier applied to the rate on a rate-limit error.
+            increase_step (float): Requests-per-second added back after each successful call.
+        """
+        if max_rate <= 0:
+            raise ValueError(f"max_rate must be positive, got {max_rate}")
+
+        self.max_rate = float(max_rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.capacity = float(burst) if burst else float(max(1, int(round(max_rate))))
+
+        self.rate = self.max_rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self):
+        """
+        Blocks until a token is available and consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """
+        Additive increase: nudges the rate back towards max_rate after a successful call.
+        """
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_rate_limited(self):
+        """
+        Multiplicative decrease: cuts the rate and drains the bucket so that every worker
+        pauses before the next request.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0.0
+            logger.warning(f"Rate limit hit, backing off to {self.rate:.2f} requests/sec.")
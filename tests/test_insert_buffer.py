@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from src.ingestion.clickhouse import ClickhouseConnect
+from src.ingestion.insert_buffer import InsertBuffer
+
+
+class RecordingClient:
+    """
+    Stands in for ClickhouseConnect: records every insert with its deduplication token and fails
+    the inserts of the months ('YYYYMM') listed in `fail`.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.inserts = []
+
+    def push_data_to_database(self, table_name, dataframe, ticker, settings=None):
+        month = dataframe['timestamp'].iloc[0].strftime('%Y%m')
+        if month in self.fail:
+            return False
+        self.inserts.append((month, dataframe, ClickhouseConnect.deduplication_token(table_name, dataframe, ticker)))
+        return True
+
+
+def candles(ticker, start, periods, freq='1D'):
+    return pd.DataFrame({
+        'ticker': ticker,
+        'timestamp': pd.date_range(start, periods=periods, freq=freq),
+        'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 100,
+    })
+
+
+def make_buffer(client, flushed):
+    return InsertBuffer(client, 'stock_ohlcv', max_rows=10**9, max_age_seconds=3600, on_flush=flushed.append)
+
+
+def test_flush_writes_every_row_and_reports_watermarks():
+    client, flushed = RecordingClient(), []
+    buffer = make_buffer(client, flushed)
+    buffer.add(candles('AAA', '2024-01-10', 5), 'AAA')
+    buffer.add(candles('BBB', '2024-01-03', 3), 'BBB')
+
+    assert buffer.close()
+    assert len(client.inserts) == 1
+    assert sum(len(df) for _, df, _ in client.inserts) == 8
+    assert flushed == [{'AAA': pd.Timestamp('2024-01-14'), 'BBB': pd.Timestamp('2024-01-05')}]
+
+
+def test_flush_writes_one_sorted_insert_per_partition():
+    client, flushed = RecordingClient(), []
+    buffer = make_buffer(client, flushed)
+    buffer.add(candles('BBB', '2024-02-28', 3), 'BBB')
+    buffer.add(candles('AAA', '2024-01-30', 4), 'AAA')
+    buffer.close()
+
+    assert [(month, len(df)) for month, df, _ in client.inserts] == [('202401', 2), ('202402', 4), ('202403', 1)]
+    for _, df, _ in client.inserts:
+        assert df['timestamp'].dt.to_period('M').nunique() == 1
+        assert df.equals(df.sort_values(['ticker', 'timestamp'], ignore_index=True))
+    february = client.inserts[1][1]
+    assert list(february['ticker']) == ['AAA', 'AAA', 'BBB', 'BBB']
+
+
+def test_tokens_do_not_depend_on_arrival_order():
+    first, second = RecordingClient(), RecordingClient()
+    aaa, bbb = candles('AAA', '2024-01-01', 20), candles('BBB', '2024-01-01', 20)
+
+    buffer = make_buffer(first, [])
+    buffer.add(aaa, 'AAA')
+    buffer.add(bbb, 'BBB')
+    buffer.close()
+
+    buffer = make_buffer(second, [])
+    buffer.add(bbb.iloc[10:], 'BBB')
+    buffer.add(aaa, 'AAA')
+    buffer.add(bbb.iloc[:10], 'BBB')
+    buffer.close()
+
+    assert [token for *_, token in first.inserts] == [token for *_, token in second.inserts]
+
+
+def test_failed_partition_stays_buffered_and_holds_back_the_watermark():
+    client, flushed = RecordingClient(fail={'202402'}), []
+    buffer = make_buffer(client, flushed)
+    buffer.add(candles('AAA', '2024-01-30', 35), 'AAA')
+    buffer.add(candles('BBB', '2024-01-10', 2), 'BBB')
+
+    assert not buffer.flush()
+    assert [month for month, _, _ in client.inserts] == ['202401']
+    # No watermark passes the failed month; February and March wait for a retry
+    assert flushed == [{'AAA': pd.Timestamp('2024-01-31'), 'BBB': pd.Timestamp('2024-01-11')}]
+    assert buffer._rows == 33
+
+    client.fail.clear()
+    assert buffer.close()
+    assert [month for month, _, _ in client.inserts] == ['202401', '202402', '202403']
+    assert sum(len(df) for _, df, _ in client.inserts) == 37
+    assert flushed[-1] == {'AAA': pd.Timestamp('2024-03-04')}
+
+
+def test_close_raises_when_rows_cannot_be_written():
+    client, flushed = RecordingClient(fail={'202401'}), []
+    buffer = make_buffer(client, flushed)
+    buffer.add(candles('AAA', '2024-01-10', 3), 'AAA')
+
+    with pytest.raises(RuntimeError, match='3 buffered rows'):
+        buffer.close()
+    assert flushed == []